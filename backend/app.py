@@ -1,48 +1,471 @@
+import itertools
 import json
+import os
 import secrets
 import time
-from typing import Dict, Optional
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Union
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, PlainTextResponse
 import asyncio
 
-app = FastAPI()
+import metrics
+from registry import (create_registry, ExpiryIndex, REAPER_INTERVAL, CLIENT_PARK_TIMEOUT,
+                      KEYFRAME_REQUEST)
+
+# Xonalar jadvali: bitta jarayonda — xotirada; DESKWEB_BROKER o'rnatilsa —
+# broker orqali barcha worker/host'lar bilan umumiy (qarang: registry.py)
+registry = create_registry()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await registry.start(deliver_local, reap_local)
+    reaper = asyncio.create_task(idle_reaper())
+    reporter = asyncio.create_task(stats_reporter())
+    yield
+    reporter.cancel()
+    reaper.cancel()
+    await registry.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
 )
 
-# room -> {"client": WebSocket|None, "operator": WebSocket|None, "created_at": timestamp, "operator_ready": bool}
+# Har bir peer uchun navbatda saqlanadigan eng yangi kadrlar soni.
+# Sekin tomon ortda qolsa eski kadrlar tashlanadi (latest-frame-wins).
+FRAME_QUEUE_SIZE = 2
+
+# Hech qanday xabar o'tmagan xona shu vaqtdan keyin yopiladi (soniya).
+# Bo'sh va yarim ochiq xonalar muddatlari registry.py'da (TTL_UNCLAIMED, TTL_WAITING).
+TTL_IDLE = float(os.environ.get("DESKWEB_TTL_IDLE", 1800))
+
+# Client'ga "relay_stats" (yetkazilgan/tashlangan kadrlar) yuborish oralig'i (soniya).
+# Client shu asosida kadr tezligini pasaytiradi yoki oshiradi.
+# Shu oraliqda operatorga "relay_timing" ham yuboriladi: xabarlar relay'da qancha turgani
+# (qabul qilingandan yuborilgunicha, ms) — input_ms: operator -> client buyruqlari,
+# frame_ms: client -> operator kadrlari. Operator motion-to-photon kechikishini shu bilan
+# bosqichlarga ajratadi. Client boshqa worker'da bo'lsa input_ms broker orqali keladi.
+STATS_INTERVAL = 1.0
+
+# Binary xabarning birinchi bayti — turi. Faqat ekran kadrlari tashlab yuborilishi mumkin.
+# Delta kadrlar (MSG_TILES — o'zgargan plitkalar, MSG_VIDEO_DELTA — video inter-frame)
+# oldingilariga bog'liq: bittasi tashlansa, keyingi to'liq/kalit kadrgacha (MSG_SCREEN,
+# MSG_VIDEO) o'sha peer'ga boshqa delta yuborilmaydi va client'dan kalit kadr so'raladi.
+MSG_SCREEN = 1
+MSG_TILES = 2
+MSG_VIDEO = 3
+MSG_VIDEO_DELTA = 4
+MSG_SCREEN_STRIPES = 5  # to'liq kadr, parallel kodlangan yo'laklarda
+FRAME_KINDS = frozenset({MSG_SCREEN, MSG_TILES, MSG_VIDEO, MSG_VIDEO_DELTA, MSG_SCREEN_STRIPES})
+DELTA_KINDS = frozenset({MSG_TILES, MSG_VIDEO_DELTA})
+
+# Fayl uzatish: bo'laklar (MSG_FILE_CHUNK) va "file_*" boshqaruv xabarlari faqat client va
+# boshqaruvchi operator o'rtasida o'tadi (ko'ruvchilarga emas). Clipboard ham shunday
+# ("clipboard" xabari va katta tarkib bo'laklari — MSG_CLIPBOARD_CHUNK). Bo'laklar tashlanmaydi —
+# alohida "bulk" navbatda; ularning hajmini yuboruvchining oynasi (flow control) cheklaydi.
+# Kadr kutib turganda bulk navbatga yuborish vaqtining BULK_SHARE ulushi beriladi.
+MSG_FILE_CHUNK = 6
+MSG_CLIPBOARD_CHUNK = 7
+BULK_SHARE = float(os.environ.get("DESKWEB_BULK_SHARE", 0.3))
+BULK_CREDIT_MAX = 0.25  # bulk uchun to'planadigan navbat vaqti chegarasi (soniya)
+
+
+def is_frame(data: Union[bytes, str]) -> bool:
+    """Xabar ekran kadrimi? (binary sarlavha yoki eski JSON/base64 formati)"""
+    if isinstance(data, bytes):
+        return len(data) > 0 and data[0] in FRAME_KINDS
+    # Eski formatda "type" birinchi kalit: Python json.dumps va JS JSON.stringify
+    return data.startswith('{"type": "screen"') or data.startswith('{"type":"screen"')
+
+
+def is_delta(data: Union[bytes, str]) -> bool:
+    """Kadr oldingisiga bog'liqmi (plitkalar, video delta)? Eski JSON kadrlar doim to'liq."""
+    return isinstance(data, bytes) and len(data) > 0 and data[0] in DELTA_KINDS
+
+
+def is_bulk(data: Union[bytes, str]) -> bool:
+    """Fayl yoki clipboard bo'lagi (tashlanmaydi, kadrlar bilan navbatlashadi)?"""
+    return isinstance(data, bytes) and len(data) > 0 and data[0] in (MSG_FILE_CHUNK, MSG_CLIPBOARD_CHUNK)
+
+
+def is_transfer(data: Union[bytes, str]) -> bool:
+    """Fayl/clipboard xabari (bo'lak, file_* yoki clipboard) — faqat client <-> operator."""
+    if isinstance(data, bytes):
+        return is_bulk(data)
+    return data.startswith(('{"type": "file_', '{"type":"file_', '{"type": "clipboard"', '{"type":"clipboard"'))
+
+
+def is_keyframe_request(data: Union[bytes, str]) -> bool:
+    """Ko'ruvchi dekoderi zanjirni yo'qotdi — ko'ruvchidan client'ga o'tadigan yagona xabar."""
+    return isinstance(data, str) and (data.startswith('{"type": "keyframe_request"')
+                                       or data.startswith('{"type":"keyframe_request"'))
+
+
+# Peer'ning jarayon ichidagi barqaror raqami (metrikalarda bir xil roldagi peer'larni ajratadi)
+peer_ids = itertools.count(1)
+
+
+class Peer:
+    """
+    Bitta WebSocket ulanishining chiquvchi navbati va alohida yozuvchi task'i.
+    Boshqaruv/holat xabarlari hech qachon tashlanmaydi va kadrlardan oldin yuboriladi;
+    ekran kadrlari esa cheklangan navbatda — to'liq kadr navbatdagi barcha eskilarini almashtiradi.
+    Fayl bo'laklari (bulk) tashlanmaydi; kadr kutayotganda ular BULK_SHARE ulushida yuboriladi.
+    Delta kadrlar zanjirini uzmaslik uchun: navbat to'la bo'lsa yangi delta tashlanadi
+    va peer keyingi to'liq kadrgacha deltalarni olmaydi (yangi peer ham to'liq kadrdan boshlaydi).
+    """
+
+    def __init__(self, socket: WebSocket, role: str):
+        self.socket = socket
+        self.role = role
+        self.id = next(peer_ids)
+        self.control = deque()
+        self.frames = deque(maxlen=FRAME_QUEUE_SIZE)
+        self.bulk = deque()
+        self.bulk_credit = 0.0  # kadr kutayotganda bulk'ka qolgan yuborish vaqti (soniya)
+        self.wakeup = asyncio.Event()
+        self.closed = False
+        self.sent_frames = 0
+        self.dropped_frames = 0
+        self.reported = (0, 0)  # oxirgi relay_stats paytidagi (sent_frames, dropped_frames)
+        self.need_keyframe = True
+        self.keyframe_requested = False  # shu uzilish uchun client'dan kalit kadr so'ralganmi
+        # Relay'da turish vaqti (qabul -> yuborildi): [soniyalar yig'indisi, soni] — relay_timing uchun
+        self.held = {"control": [0.0, 0], "frame": [0.0, 0]}
+        self.task = asyncio.create_task(self._writer())
+
+    # received — relay xabarni qabul qilgan payt (perf_counter); forwarding vaqti uchun.
+    # Relay'ning o'z xabarlarida 0.0 bo'ladi va o'lchanmaydi.
+    def send_control(self, data: Union[bytes, str], received: float = 0.0):
+        if self.closed:
+            return
+        self.control.append((data, received))
+        self.wakeup.set()
+
+    def send_bulk(self, data: bytes, received: float = 0.0):
+        if self.closed:
+            return
+        self.bulk.append((data, received))
+        self.wakeup.set()
+
+    def send_frame(self, data: Union[bytes, str], received: float = 0.0, delta: bool = False) -> bool:
+        """Kadrni navbatga qo'yadi. True — peer kalit kadr kutmoqda va uni client'dan so'rash kerak."""
+        if self.closed:
+            return False
+        if delta:
+            if self.need_keyframe or len(self.frames) == FRAME_QUEUE_SIZE:
+                self.need_keyframe = True
+                self.dropped_frames += 1
+                request, self.keyframe_requested = not self.keyframe_requested, True
+                return request
+        else:
+            self.need_keyframe = False
+            self.keyframe_requested = False
+            # To'liq kadr oldingi hammasini almashtiradi; maxlen'ga qoldirilsa eng eskisi chiqib,
+            # qolgan delta asosisiz (yoki oldingi deltasiz) ketardi
+            self.dropped_frames += len(self.frames)
+            self.frames.clear()
+        self.frames.append((data, received))
+        self.wakeup.set()
+        return False
+
+    def take_held(self, kind: str) -> Optional[float]:
+        """Oxirgi relay_timing'dan beri o'rtacha turish vaqti (ms); namuna bo'lmasa None."""
+        total, count = self.held[kind]
+        self.held[kind] = [0.0, 0]
+        return round(1000 * total / count, 2) if count else None
+
+    def stats(self) -> Dict:
+        return {
+            "control_queue": len(self.control),
+            "frame_queue": len(self.frames),
+            "bulk_queue": len(self.bulk),
+            "sent_frames": self.sent_frames,
+            "dropped_frames": self.dropped_frames,
+        }
+
+    async def _writer(self):
+        try:
+            while True:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                while self.control or self.frames or self.bulk:
+                    lane = None
+                    if self.control:
+                        item = self.control.popleft()
+                        if item is None:  # close() belgisi
+                            return
+                        held = self.held["control"]
+                    elif self.frames and (not self.bulk or self.bulk_credit <= 0):
+                        item = self.frames.popleft()
+                        self.sent_frames += 1
+                        held = self.held["frame"]
+                        lane = "frame"
+                    else:
+                        item = self.bulk.popleft()
+                        held = None
+                        lane = "bulk" if self.frames else None  # kadr kutmasa — cheklanmaydi
+                    data, received = item
+                    started = time.perf_counter()
+                    if isinstance(data, bytes):
+                        await self.socket.send_bytes(data)
+                    else:
+                        await self.socket.send_text(data)
+                    if lane == "frame":
+                        share = min(BULK_SHARE, 0.95)
+                        self.bulk_credit = min(BULK_CREDIT_MAX, self.bulk_credit + (time.perf_counter() - started)
+                                               * share / (1 - share))
+                    elif lane == "bulk":
+                        self.bulk_credit -= time.perf_counter() - started
+                    if received and held is not None:
+                        elapsed = time.perf_counter() - received
+                        metrics.FORWARD_SECONDS.observe(elapsed)
+                        held[0] += elapsed
+                        held[1] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Send to {self.role} error: {e}")
+        finally:
+            self.closed = True
+            self.control.clear()
+            self.frames.clear()
+            self.bulk.clear()
+
+    async def close(self, timeout: float = 1.0):
+        """Navbatdagi boshqaruv xabarlarini yuborib bo'lib, yozuvchi task'ni to'xtatadi."""
+        if not self.closed:
+            self.control.append(None)
+            self.wakeup.set()
+            self.closed = True
+        try:
+            await asyncio.wait_for(self.task, timeout)
+        except Exception:
+            pass
+
+
+# Shu worker'ga ulangan peer'lar:
+# room -> {"client": Peer|None, "operator": Peer|None (boshqaruvchi), "viewers": set[Peer] (faqat ko'ruvchi),
+#          "counters": metrics.RoomCounters, "last_activity": perf_counter}
+# Xona holati (created_at, operator_ready, boshqa worker'lardagi a'zolar) — registry'da.
 rooms: Dict[str, Dict] = {}
 
+# Broker protokolida xona nomi bir baytli uzunlik bilan yoziladi — chegara UTF-8 baytlarda
+MAX_ROOM_LEN = 64
+
+
+def room_too_long(room: str) -> bool:
+    return len(room.encode()) > MAX_ROOM_LEN
+
+# Faol bo'lmagan xonalar indeksi (muddat bo'yicha) va sabab bo'yicha yopilgan xonalar soni
+idle_index = ExpiryIndex()
+reaped_local = Counter()
+
+
+def local_room(room: str) -> Dict:
+    r = rooms.get(room)
+    if r is None:
+        now = time.perf_counter()
+        r = rooms[room] = {"client": None, "operator": None, "viewers": set(),
+                           "counters": metrics.RoomCounters(), "last_activity": now}
+        idle_index.push(now + TTL_IDLE, room)
+        registry.subscribe(room)
+    return r
+
+
+def drop_local_room(room: str):
+    r = rooms.get(room)
+    if r is not None and r["client"] is None and r["operator"] is None and not r["viewers"]:
+        del rooms[room]
+        registry.unsubscribe(room)
+
+
+def watchers(r: Dict):
+    """Client ekranini ko'radigan barcha peer'lar: boshqaruvchi operator + ko'ruvchilar."""
+    if r["operator"] is not None:
+        yield r["operator"]
+    yield from r["viewers"]
+
+
+def deliver_local(room: str, side: str, data: Union[bytes, str],
+                  received: float = 0.0, frame: Optional[bool] = None):
+    """
+    Xabarni shu worker'dagi peer'lar navbatiga qo'yadi. side: "client" yoki "watchers".
+    Kadr bir marta qabul qilinib, barcha ko'ruvchilarga o'sha obyekt (nusxalanmasdan)
+    navbatga qo'yiladi; sekin ko'ruvchi faqat o'z kadrlarini yo'qotadi.
+    """
+    r = rooms.get(room)
+    if r is None:
+        return
+    if frame is None:
+        # Broker orqali kelgan xabar: forwarding vaqti shu worker'ga kelgan paytdan
+        frame = is_frame(data)
+        received = r["last_activity"] = time.perf_counter()
+    if side == "client":
+        target = r["client"]
+        if target:
+            if frame:
+                target.send_frame(data, received, is_delta(data))
+            elif is_bulk(data):
+                target.send_bulk(data, received)
+            else:
+                target.send_control(data, received)
+    elif frame:
+        delta = is_delta(data)
+        wants_keyframe = False
+        for w in watchers(r):
+            wants_keyframe |= w.send_frame(data, received, delta)
+        if wants_keyframe:
+            # Ko'ruvchi delta zanjirini yo'qotdi: kalit kadrni davriy muddatgacha kutmaymiz
+            deliver(room, "client", KEYFRAME_REQUEST)
+    elif is_transfer(data):
+        # Fayllar va clipboard faqat boshqaruvchi operatorga
+        target = r["operator"]
+        if target:
+            if is_bulk(data):
+                target.send_bulk(data, received)
+            else:
+                target.send_control(data, received)
+    else:
+        for w in watchers(r):
+            w.send_control(data, received)
+
+
+def deliver(room: str, side: str, data: Union[bytes, str],
+            received: float = 0.0, frame: Optional[bool] = None):
+    """Shu worker'dagi peer'larga va (broker bo'lsa) boshqa worker'lardagilarga."""
+    if frame is None:
+        frame = is_frame(data)
+    deliver_local(room, side, data, received, frame)
+    if registry.remote:
+        registry.publish(room, side, data, frame, frame and is_delta(data))
+
+
+async def close_peers(peers, message: str):
+    for p in peers:
+        p.send_control(json.dumps({"type": "error", "message": message}))
+    for p in peers:
+        await p.close()
+        try:
+            await p.socket.close()
+        except Exception:
+            pass
+
+
+def reap_local(room: str, reason: str):
+    """Muddati o'tgan xonaning shu worker'dagi peer'larini yopadi (ws() finally tozalaydi)."""
+    r = rooms.get(room)
+    if r is None:
+        return
+    peers = [p for p in (r["client"], r["operator"]) if p is not None] + list(r["viewers"])
+    asyncio.create_task(close_peers(peers, f"Room '{room}' expired ({reason})."))
+
+
+async def idle_reaper():
+    """Fon vazifasi: TTL_IDLE davomida xabar o'tmagan xonalarni yopadi."""
+    while True:
+        await asyncio.sleep(REAPER_INTERVAL)
+        now = time.perf_counter()
+        for _, room in list(idle_index.pop_due(now)):
+            r = rooms.get(room)
+            if r is None:
+                continue
+            deadline = r["last_activity"] + TTL_IDLE
+            if deadline > now:
+                idle_index.push(deadline, room)
+                continue
+            reaped_local["idle"] += 1
+            print(f"Room {room} reaped (idle)")
+            reap_local(room, "idle")
+
+
+async def stats_reporter():
+    """
+    Fon vazifasi: har STATS_INTERVAL'da client'ga ko'ruvchilar kadrlarni qanchalik
+    qabul qila olayotganini yuboradi. Qiymatlar eng tez ko'ruvchi bo'yicha: sekin yoki faol
+    bo'lmagan ko'ruvchi o'z kadrlarini yo'qotadi, lekin client'ni sekinlashtirmaydi.
+    """
+    while True:
+        await asyncio.sleep(STATS_INTERVAL)
+        for room, r in list(rooms.items()):
+            delivered = dropped = queue = count = 0
+            for w in watchers(r):
+                sent, lost = w.sent_frames - w.reported[0], w.dropped_frames - w.reported[1]
+                w.reported = (w.sent_frames, w.dropped_frames)
+                if sent > delivered or (sent == delivered and lost < dropped):
+                    delivered, dropped, queue = sent, lost, len(w.frames)
+                count += 1
+            if delivered or dropped:
+                deliver(room, "client", json.dumps({
+                    "type": "relay_stats",
+                    "interval": STATS_INTERVAL,
+                    "delivered": delivered,
+                    "dropped": dropped,
+                    "queue": queue,
+                    "watchers": count,
+                }))
+            report_timing(room, r)
+
+
+def report_timing(room: str, r: Dict):
+    """Operatorga relay'da turish vaqtlari (relay_timing): shu worker'dagi client/operator bo'yicha."""
+    client, operator = r["client"], r["operator"]
+    input_ms = client.take_held("control") if client is not None else None
+    frame_ms = operator.take_held("frame") if operator is not None else None
+    if input_ms is None and frame_ms is None:
+        return
+    timing = json.dumps({
+        "type": "relay_timing",
+        "interval": STATS_INTERVAL,
+        "input_ms": input_ms,
+        "frame_ms": frame_ms,
+    })
+    if operator is not None:
+        operator.send_control(timing)
+    elif registry.remote:
+        # Operator boshqa worker'da: client tomonidagi qism broker orqali yetkaziladi
+        registry.publish(room, "watchers", timing, False)
+
+
+@app.exception_handler(ConnectionError)
+async def registry_unavailable(request, exc: ConnectionError):
+    """Broker ulanishi yo'q yoki javob bermadi: so'rov osilib qolmaydi, 503 qaytadi."""
+    return JSONResponse({"error": "Registry unavailable", "message": str(exc)}, status_code=503)
+
+
 @app.get("/")
 def root():
     return RedirectResponse(url="/static/index.html")
 
 @app.get("/create-room")
-def create_room(custom_room: Optional[str] = None):
+async def create_room(custom_room: Optional[str] = None):
     """Operator xona yaratadi"""
     if custom_room:
-        if custom_room in rooms and rooms[custom_room]["operator"] is not None:
+        if room_too_long(custom_room):
             return JSONResponse(
-                {"error": "Room already exists", 
+                {"error": "Room ID too long",
+                 "message": f"Room ID must be at most {MAX_ROOM_LEN} bytes (UTF-8)."},
+                status_code=400
+            )
+        if not await registry.create(custom_room):
+            return JSONResponse(
+                {"error": "Room already exists",
                  "message": f"Room '{custom_room}' is already in use. Please choose another ID."},
                 status_code=409
             )
         room = custom_room
     else:
         room = secrets.token_urlsafe(6)
-    
-    rooms[room] = {
-        "client": None, 
-        "operator": None, 
-        "created_at": time.time(),
-        "operator_ready": False
-    }
-    
+        await registry.create(room)
+
     return JSONResponse({
         "room": room,
         "client_url": f"/static/client.html?room={room}",
@@ -50,154 +473,210 @@ def create_room(custom_room: Optional[str] = None):
     })
 
 @app.get("/check-room/{room}")
-def check_room(room: str):
+async def check_room(room: str):
     """Xona mavjudligini tekshirish"""
-    if room not in rooms:
+    info = await registry.info(room)
+    if info is None:
         return JSONResponse({"exists": False, "message": "Room not found"}, status_code=404)
-    
+
     return JSONResponse({
         "exists": True,
-        "has_operator": rooms[room]["operator"] is not None and rooms[room]["operator_ready"],
-        "has_client": rooms[room]["client"] is not None
+        "has_operator": info["operator"] > 0 and info["operator_ready"],
+        "has_client": info["client"] > 0,
+        "viewers": info["viewers"]
+    })
+
+@app.get("/room-stats/{room}")
+def room_stats(room: str):
+    """Shu worker'dagi har bir peer navbati: chuqurlik va tashlangan kadrlar soni"""
+    if room not in rooms:
+        return JSONResponse({"exists": False, "message": "Room not found"}, status_code=404)
+
+    r = rooms[room]
+    return JSONResponse({
+        "client": r["client"].stats() if r["client"] else None,
+        "operator": r["operator"].stats() if r["operator"] else None,
+        "viewers": [v.stats() for v in r["viewers"]]
     })
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text formatidagi relay metrikalari (shu worker bo'yicha)"""
+    reaped = Counter(await registry.reaped())
+    reaped.update(reaped_local)
+    return PlainTextResponse(metrics.render(rooms, registry, reaped),
+                             media_type="text/plain; version=0.0.4")
+
 @app.websocket("/ws/{room}/{role}")
 async def ws(room: str, role: str, socket: WebSocket):
     await socket.accept()
-    
-    if role not in ("client", "operator"):
+
+    if role not in ("client", "operator", "viewer"):
         await socket.send_text(json.dumps({"type": "error", "message": "Invalid role"}))
         await socket.close()
         return
-    
+
+    # Bu socket'ga barcha yozuvlar shu peer navbati orqali o'tadi
+    peer = Peer(socket, role)
+
+    async def reject(message: str):
+        peer.send_control(json.dumps({"type": "error", "message": message}))
+        await peer.close()
+        await socket.close()
+
+    if room_too_long(room):
+        await reject(f"Room ID is too long (at most {MAX_ROOM_LEN} bytes in UTF-8).")
+        return
+
+    # Qabul qilish qoidalari registry'da (xona mavjudmi, operator tayyormi).
+    # Boshqaruvchi operator allaqachon bor bo'lsa, yangi operator ko'ruvchi bo'ladi
+    # (avvalgidek birinchisini jimgina almashtirmaydi).
+    # Operator hali tayyor bo'lmasa, client rad etilmaydi — operator tayyor bo'lgan
+    # zahoti (registry hodisasi orqali) qabul qilinadi.
+    wait = 0.0
+    try:
+        if role == "client":
+            info = await registry.info(room)
+            if info is not None and not info["operator_ready"]:
+                peer.send_control(json.dumps({
+                    "type": "waiting",
+                    "message": "Waiting for operator to get ready..."
+                }))
+                wait = CLIENT_PARK_TIMEOUT
+        role, error = await registry.join(room, role, wait)
+    except ConnectionError as e:
+        print(f"Registry unavailable ({role} -> {room}): {e}")
+        error = "Relay is temporarily unavailable, please reconnect."
+    if error:
+        await reject(error)
+        return
+    peer.role = role
+    r = local_room(room)
+
     # OPERATOR
     if role == "operator":
-        if room not in rooms:
-            # Operator yangi xona ochadi
-            rooms[room] = {
-                "client": None, 
-                "operator": None, 
-                "created_at": time.time(),
-                "operator_ready": False
-            }
-        
         # Operator'ni saqlash
-        rooms[room]["operator"] = socket
-        
-        # Operator tayyor bo'lguncha kutish (2 soniya)
-        await asyncio.sleep(0.5)
-        rooms[room]["operator_ready"] = True
-        
-        await socket.send_text(json.dumps({
+        r["operator"] = peer
+
+        # "connected" navbatga birinchi bo'lib qo'yiladi, shuning uchun undan keyingi
+        # har qanday xabar (peer_connected, kadrlar) operatorga tartib bilan yetadi
+        peer.send_control(json.dumps({
             "type": "connected",
             "role": "operator",
             "room": room,
             "message": "Waiting for client..."
         }))
-        
-        # Agar client allaqachon kutayotgan bo'lsa
-        if rooms[room]["client"]:
-            try:
-                await rooms[room]["client"].send_text(json.dumps({
-                    "type": "peer_connected",
-                    "peer_role": "operator"
-                }))
-                await socket.send_text(json.dumps({
-                    "type": "peer_connected",
-                    "peer_role": "client"
-                }))
-            except:
-                pass
-    
-    # CLIENT
-    elif role == "client":
-        # Xona mavjudligini tekshirish
-        if room not in rooms:
-            await socket.send_text(json.dumps({
-                "type": "error",
-                "message": f"Room '{room}' does not exist. Please check the Room ID."
+
+        # Agar client allaqachon ulangan bo'lsa (operator qayta ulangan)
+        info = await registry.info(room)
+        if info and info["client"] > 0:
+            deliver(room, "client", json.dumps({
+                "type": "peer_connected",
+                "peer_role": "operator"
             }))
-            await socket.close()
-            return
-        
-        # Operator tayyor emasligini tekshirish
-        if not rooms[room]["operator_ready"]:
-            await socket.send_text(json.dumps({
-                "type": "error",
-                "message": f"Operator is not ready yet. Please wait and try again."
+            peer.send_control(json.dumps({
+                "type": "peer_connected",
+                "peer_role": "client"
             }))
-            await socket.close()
-            return
-        
-        # Operator yo'qligini tekshirish
-        if rooms[room]["operator"] is None:
-            await socket.send_text(json.dumps({
-                "type": "error",
-                "message": f"No operator in room '{room}'. Please ask operator to connect first."
+
+        # Tayyorlikni darhol e'lon qilamiz: kutib turgan client'lar shu zahoti qabul qilinadi
+        await registry.set_ready(room, True)
+
+    # VIEWER — faqat ko'radi, buyruqlari client'ga yetkazilmaydi
+    elif role == "viewer":
+        r["viewers"].add(peer)
+
+        peer.send_control(json.dumps({
+            "type": "connected",
+            "role": "viewer",
+            "room": room,
+            "message": "Joined as viewer (read-only)."
+        }))
+
+        info = await registry.info(room)
+        if info and info["client"] > 0:
+            peer.send_control(json.dumps({
+                "type": "peer_connected",
+                "peer_role": "client"
             }))
-            await socket.close()
-            return
-        
+            # Client bir marta yuboradigan holatni (kursor shakllari) yangi ko'ruvchi uchun qaytaradi
+            deliver(room, "client", json.dumps({
+                "type": "peer_connected",
+                "peer_role": "viewer"
+            }))
+
+    # CLIENT
+    elif role == "client":
         # Client'ni saqlash
-        rooms[room]["client"] = socket
-        
-        await socket.send_text(json.dumps({
+        r["client"] = peer
+
+        peer.send_control(json.dumps({
             "type": "connected",
             "role": "client",
             "room": room
         }))
-        
-        # Operator'ga xabar
-        if rooms[room]["operator"]:
-            try:
-                await rooms[room]["operator"].send_text(json.dumps({
-                    "type": "peer_connected",
-                    "peer_role": "client",
-                    "message": "Client connected successfully!"
-                }))
-            except:
-                pass
-    
-    peer_role = "operator" if role == "client" else "client"
 
-    # Message loop
+        # Operator va ko'ruvchilarga xabar
+        deliver(room, "watchers", json.dumps({
+            "type": "peer_connected",
+            "peer_role": "client",
+            "message": "Client connected successfully!"
+        }))
+
+    counters = r["counters"]
+
+    # Message loop: qabul qilish hech qachon peer'ga yuborishni kutmaydi —
+    # xabar faqat qarshi tomon navbatiga qo'yiladi, uni uning yozuvchi task'i yuboradi.
     try:
         while True:
-            msg = await socket.receive_text()
-            other = rooms[room].get(peer_role)
-            if other:
-                try:
-                    await other.send_text(msg)
-                except Exception as e:
-                    print(f"Send to peer error: {e}")
-                    pass
+            message = await socket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            received = r["last_activity"] = time.perf_counter()
+
+            data = message.get("bytes")
+            if data is None:
+                data = message["text"]
+
+            if role == "client":
+                counters.add(metrics.UPSTREAM, len(data))
+                metrics.TOTALS.add(metrics.UPSTREAM, len(data))
+                frame = is_frame(data)
+                if frame:
+                    metrics.FRAME_BYTES.observe(len(data))
+                deliver(room, "watchers", data, received, frame)
+            elif role == "operator":
+                counters.add(metrics.DOWNSTREAM, len(data))
+                metrics.TOTALS.add(metrics.DOWNSTREAM, len(data))
+                deliver(room, "client", data, received)
+            elif is_keyframe_request(data):
+                # viewer: faqat o'qish — kalit kadr so'rovidan boshqa xabarlari tashlanadi
+                deliver(room, "client", KEYFRAME_REQUEST, received)
     except WebSocketDisconnect:
         print(f"{role} disconnected from {room}")
     except Exception as e:
         print(f"WebSocket error ({role}): {e}")
     finally:
         # Cleanup
-        if role in rooms.get(room, {}):
-            rooms[room][role] = None
-            
-            if role == "operator":
-                rooms[room]["operator_ready"] = False
-        
+        if role == "viewer":
+            r["viewers"].discard(peer)
+        elif r.get(role) is peer:
+            r[role] = None
+        await peer.close(timeout=0)
+        drop_local_room(room)
+        try:
+            await registry.leave(room, role)
+        except ConnectionError:
+            pass   # broker ulanishi uzilganda a'zoliklarni o'zi o'chiradi
+
         # Peer'ga disconnect xabari
-        other = rooms[room].get(peer_role) if room in rooms else None
-        if other:
-            try:
-                await other.send_text(json.dumps({
-                    "type": "peer_disconnected",
-                    "peer_role": role
-                }))
-            except:
-                pass
-        
-        # Agar ikkala tomon ham yo'q bo'lsa, xonani o'chirish
-        if room in rooms:
-            if rooms[room]["client"] is None and rooms[room]["operator"] is None:
-                del rooms[room]
-                print(f"Room {room} deleted")
+        notice = json.dumps({
+            "type": "peer_disconnected",
+            "peer_role": role
+        })
+        if role == "client":
+            deliver(room, "watchers", notice)
+        elif role == "operator":
+            deliver(room, "client", notice)
 
 app.mount("/static", StaticFiles(directory="static", html=True), name="static")
@@ -0,0 +1,396 @@
+"""
+Relay yuklama testi: app.py'ni lokal ishga tushiradi va N ta sintetik client/operator
+juftligini boshqaradi. Client binary ekran kadrlari (WebP) yuboradi, operator esa
+input buyruqlari yuboradi; har bir xabar ichidagi vaqt belgisi bo'yicha relay orqali
+o'tish kechikishi o'lchanadi.
+
+Natija: xabar/s, bayt/s, p50/p99/p999 kechikish, tashlangan kadrlar, server CPU va RSS —
+JSON ko'rinishida (relay o'zgarishlarini bir-biri bilan solishtirish uchun).
+
+Misollar:
+    python bench_relay.py --pairs 200 --fps 30 --frame-size 80000 --duration 30
+    python bench_relay.py --pairs 2000 --procs 8 --workers 4 --out results.json
+    python bench_relay.py --url ws://relay.local:8000 --payload-dir ./frames
+"""
+import argparse
+import asyncio
+import glob
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+import websockets
+
+# client_desktop.py bilan bir xil binary kadr sarlavhasi
+MSG_SCREEN   = 1
+FRAME_HEADER = struct.Struct("!BBHHd")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ------------------ Payload'lar ------------------
+
+def load_payloads(args):
+    """Yozib olingan .webp fayllar yoki sintetik WebP kadrlar (PIL bo'lmasa — tasodifiy baytlar)."""
+    if args.payload_dir:
+        files = sorted(glob.glob(os.path.join(args.payload_dir, "*.webp")))
+        if not files:
+            sys.exit(f"No .webp files in {args.payload_dir}")
+        return [open(f, "rb").read() for f in files]
+
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return [os.urandom(args.frame_size) for _ in range(8)]
+
+    def encode(img):
+        buf = io.BytesIO()
+        img.save(buf, format="WEBP", quality=80, method=0)
+        return buf.getvalue()
+
+    # Ish stoliga o'xshash kadr: fon, oynalar, matn satrlari; --frame-size hajmiga
+    # shovqin ulushini ikkiga bo'lib qidirish orqali yetkaziladi
+    rnd = random.Random(1)
+    payloads = []
+    width, height = args.width, args.width * 9 // 16
+    for i in range(8):
+        img = Image.new("RGB", (width, height), (30, 60, 110))
+        draw = ImageDraw.Draw(img)
+        for _ in range(6):
+            x0, y0 = rnd.randrange(width // 2), rnd.randrange(height // 2)
+            draw.rectangle((x0, y0, x0 + width // 3, y0 + height // 3), fill=(235, 235, 235))
+            for line in range(y0 + 8, y0 + height // 3 - 8, 12):
+                draw.text((x0 + 6, line), "lorem ipsum %d" % rnd.randrange(10 ** 6), fill=(20, 20, 20))
+        noise = Image.effect_noise((width, height), 40 + 10 * i).convert("RGB")
+        lo, hi = 0.0, 1.0
+        for _ in range(8):
+            data = encode(Image.blend(img, noise, (lo + hi) / 2))
+            lo, hi = ((lo + hi) / 2, hi) if len(data) < args.frame_size else (lo, (lo + hi) / 2)
+        payloads.append(data)
+    return payloads
+
+
+# ------------------ Juftlik simulyatsiyasi ------------------
+
+async def _recv_until(ws, wanted):
+    while True:
+        msg = await ws.recv()
+        if isinstance(msg, str):
+            data = json.loads(msg)
+            if data.get("type") == "error":
+                raise ConnectionError(data.get("message"))
+            if data.get("type") == wanted:
+                return
+
+
+async def run_pair(index, cfg, payloads, stats, start_at, stop_at, sem):
+    room = f"bench-{os.getpid()}-{index}"
+    opts = dict(max_size=None, compression=None, ping_interval=None, open_timeout=30)
+    async with sem:
+        op = await websockets.connect(f"{cfg['url']}/ws/{room}/operator", **opts)
+        await _recv_until(op, "connected")
+        cl = await websockets.connect(f"{cfg['url']}/ws/{room}/client", **opts)
+        await _recv_until(cl, "connected")
+        await _recv_until(op, "peer_connected")
+    stats["pairs"] += 1
+
+    async def client_frames():
+        period = 1.0 / cfg["fps"]
+        deadline = time.perf_counter() + random.random() * period
+        n = index
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            if deadline > now:
+                await asyncio.sleep(deadline - now)
+            deadline += period
+            payload = payloads[n % len(payloads)]
+            n += 1
+            ts = time.perf_counter()
+            packet = FRAME_HEADER.pack(MSG_SCREEN, 0, cfg["width"], cfg["width"] * 9 // 16, ts) + payload
+            await cl.send(packet)
+            if ts >= start_at:
+                stats["frames_sent"] += 1
+
+    async def operator_inputs():
+        if cfg["input_rate"] <= 0:
+            return
+        period = 1.0 / cfg["input_rate"]
+        deadline = time.perf_counter() + random.random() * period
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            if deadline > now:
+                await asyncio.sleep(deadline - now)
+            deadline += period
+            ts = time.perf_counter()
+            await op.send(json.dumps({"type": "mouse_move", "x": random.random(),
+                                      "y": random.random(), "t": ts}))
+            if ts >= start_at:
+                stats["inputs_sent"] += 1
+
+    async def operator_receiver():
+        async for msg in op:
+            now = time.perf_counter()
+            if now < start_at or not isinstance(msg, bytes) or msg[0] != MSG_SCREEN:
+                continue
+            ts = FRAME_HEADER.unpack_from(msg)[4]
+            if ts < start_at:
+                continue
+            stats["frame_lat"].append(now - ts)
+            stats["frames_recv"] += 1
+            stats["frame_bytes"] += len(msg)
+
+    async def client_receiver():
+        async for msg in cl:
+            now = time.perf_counter()
+            if now < start_at or not isinstance(msg, str):
+                continue
+            data = json.loads(msg)
+            if data.get("t", 0) >= start_at:
+                stats["input_lat"].append(now - data["t"])
+                stats["inputs_recv"] += 1
+                stats["input_bytes"] += len(msg)
+
+    receivers = [asyncio.create_task(operator_receiver()), asyncio.create_task(client_receiver())]
+    try:
+        await asyncio.gather(client_frames(), operator_inputs())
+        # Yo'ldagi xabarlar yetib kelishi uchun qisqa kutish
+        await asyncio.sleep(cfg["drain"])
+    finally:
+        for t in receivers:
+            t.cancel()
+        await cl.close()
+        await op.close()
+
+
+async def _driver(cfg, indices, payloads):
+    stats = {"pairs": 0, "failed": 0, "frames_sent": 0, "frames_recv": 0, "frame_bytes": 0,
+             "inputs_sent": 0, "inputs_recv": 0, "input_bytes": 0, "frame_lat": [], "input_lat": []}
+    # Barcha juftliklar bir vaqtda boshlab, bir vaqtda tugatadi (ulanish vaqti o'lchovga kirmaydi)
+    start_at = time.perf_counter() + cfg["ramp"] + cfg["warmup"]
+    stop_at = start_at + cfg["duration"]
+    sem = asyncio.Semaphore(cfg["connect_concurrency"])
+
+    async def guarded(i):
+        try:
+            await run_pair(i, cfg, payloads, stats, start_at, stop_at, sem)
+        except Exception as e:
+            stats["failed"] += 1
+            if stats["failed"] <= 3:
+                print(f"[bench] pair {i} failed: {e}", file=sys.stderr)
+
+    await asyncio.gather(*(guarded(i) for i in indices))
+    return stats
+
+
+def _driver_proc(cfg, indices, payloads, queue):
+    queue.put(asyncio.run(_driver(cfg, indices, payloads)))
+
+
+# ------------------ Server va resurslar ------------------
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_relay(args):
+    """app.py'ni vaqtinchalik katalogda (static/ bilan) uvicorn orqali ishga tushiradi."""
+    workdir = tempfile.mkdtemp(prefix="deskweb-bench-")
+    os.makedirs(os.path.join(workdir, "static"))
+    env = dict(os.environ, PYTHONPATH=HERE + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    procs = []
+    if args.workers > 1:
+        sock = os.path.join(workdir, "broker.sock")
+        procs.append(subprocess.Popen([sys.executable, os.path.join(HERE, "registry.py"), "--listen", sock],
+                                      cwd=workdir, env=env, stdout=subprocess.DEVNULL))
+        env["DESKWEB_BROKER"] = sock
+        time.sleep(0.5)
+    port = _free_port()
+    procs.append(subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--workers", str(args.workers),
+         "--log-level", "warning", "--ws-max-size", str(64 * 1024 * 1024)],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL))
+    for _ in range(100):
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                break
+        except OSError:
+            time.sleep(0.1)
+    return f"ws://127.0.0.1:{port}", procs, workdir
+
+
+def _proc_tree(pid):
+    """pid va uning barcha avlodlari (uvicorn worker'lari)."""
+    try:
+        import psutil
+        p = psutil.Process(pid)
+        return [p] + p.children(recursive=True)
+    except Exception:
+        return []
+
+
+class ResourceSampler:
+    """Server jarayonlari CPU% va RSS'ini har soniyada o'lchaydi (psutil kerak)."""
+
+    def __init__(self, pids):
+        self.pids = pids
+        self.cpu, self.rss = [], []
+        self._stop = False
+
+    def run(self):
+        import threading
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def _loop(self):
+        procs = [p for pid in self.pids for p in _proc_tree(pid)]
+        for p in procs:
+            try:
+                p.cpu_percent(None)
+            except Exception:
+                pass
+        while not self._stop:
+            time.sleep(1.0)
+            cpu, rss = 0.0, 0
+            for p in procs:
+                try:
+                    cpu += p.cpu_percent(None)
+                    rss += p.memory_info().rss
+                except Exception:
+                    pass
+            self.cpu.append(cpu)
+            self.rss.append(rss)
+
+    def stop(self):
+        self._stop = True
+
+    def summary(self):
+        if not self.cpu:
+            return {"available": False}
+        return {
+            "available": True,
+            "cpu_percent_avg": round(sum(self.cpu) / len(self.cpu), 1),
+            "cpu_percent_max": round(max(self.cpu), 1),
+            "rss_mb_max": round(max(self.rss) / 2 ** 20, 1),
+        }
+
+
+# ------------------ Hisobot ------------------
+
+def percentiles(samples):
+    if not samples:
+        return None
+    samples.sort()
+    n = len(samples)
+
+    def at(q):
+        return round(samples[min(n - 1, int(q * n))] * 1000, 3)
+
+    return {"p50": at(0.50), "p99": at(0.99), "p999": at(0.999), "max": round(samples[-1] * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeskWeb relay load test")
+    parser.add_argument("--url", help="Mavjud relay (ws://host:port). Berilmasa app.py lokal ishga tushiriladi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker'lari (>1 bo'lsa broker ham)")
+    parser.add_argument("--pairs", type=int, default=100)
+    parser.add_argument("--procs", type=int, default=1, help="Yuklama beruvchi jarayonlar soni")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--input-rate", type=float, default=20, help="Operator input buyruqlari/s")
+    parser.add_argument("--frame-size", type=int, default=60000, help="Sintetik kadr hajmi (taxminan)")
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--payload-dir", help="Yozib olingan .webp kadrlar katalogi")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--ramp", type=float, default=5, help="Ulanishlar uchun ajratilgan vaqt")
+    parser.add_argument("--drain", type=float, default=1.0)
+    parser.add_argument("--connect-concurrency", type=int, default=100)
+    parser.add_argument("--out", help="JSON natijani shu faylga yozish")
+    args = parser.parse_args()
+
+    payloads = load_payloads(args)
+    procs, workdir = [], None
+    url = args.url
+    if not url:
+        url, procs, workdir = spawn_relay(args)
+
+    cfg = {"url": url, "fps": args.fps, "input_rate": args.input_rate, "width": args.width,
+           "duration": args.duration, "warmup": args.warmup, "ramp": args.ramp, "drain": args.drain,
+           "connect_concurrency": args.connect_concurrency}
+
+    sampler = ResourceSampler([p.pid for p in procs])
+    if procs:
+        sampler.run()
+
+    try:
+        chunks = [list(range(i, args.pairs, args.procs)) for i in range(args.procs)]
+        if args.procs == 1:
+            results = [asyncio.run(_driver(cfg, chunks[0], payloads))]
+        else:
+            queue = multiprocessing.Queue()
+            workers = [multiprocessing.Process(target=_driver_proc, args=(cfg, c, payloads, queue))
+                       for c in chunks]
+            for w in workers:
+                w.start()
+            results = [queue.get() for _ in workers]
+            for w in workers:
+                w.join()
+    finally:
+        sampler.stop()
+        for p in reversed(procs):
+            p.terminate()
+            p.wait()
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    total = {k: sum(r[k] for r in results) for k in results[0] if not k.endswith("_lat")}
+    frame_lat = [x for r in results for x in r["frame_lat"]]
+    input_lat = [x for r in results for x in r["input_lat"]]
+    d = args.duration
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "out"},
+        "payload_bytes_avg": round(sum(map(len, payloads)) / len(payloads)),
+        "pairs_connected": total["pairs"],
+        "pairs_failed": total["failed"],
+        "frames": {
+            "sent": total["frames_sent"],
+            "received": total["frames_recv"],
+            "dropped": max(0, total["frames_sent"] - total["frames_recv"]),
+            "msgs_per_s": round(total["frames_recv"] / d, 1),
+            "bytes_per_s": round(total["frame_bytes"] / d),
+            "latency_ms": percentiles(frame_lat),
+        },
+        "inputs": {
+            "sent": total["inputs_sent"],
+            "received": total["inputs_recv"],
+            "msgs_per_s": round(total["inputs_recv"] / d, 1),
+            "bytes_per_s": round(total["input_bytes"] / d),
+            "latency_ms": percentiles(input_lat),
+        },
+        "server": sampler.summary() if procs else {"available": False},
+    }
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Relay metrikalari (Prometheus text formati, /metrics).
+
+Issiq yo'lda faqat oldindan ajratilgan ro'yxatlardagi butun sonlar oshiriladi:
+label qidirish, lug'at yaratish yoki matn formatlash yo'q — bular faqat
+/metrics so'ralganda bajariladi. To'liq yuklamada ham yoqilgan holda qoldirish mumkin.
+"""
+from bisect import bisect_left
+from typing import Dict, Iterable, List
+
+# Yo'nalishlar indeksi (RoomCounters ichidagi ro'yxatlar uchun)
+UPSTREAM   = 0   # client -> operator/ko'ruvchilar
+DOWNSTREAM = 1   # operator -> client
+DIRECTIONS = ("client_to_operator", "operator_to_client")
+
+
+class Histogram:
+    __slots__ = ("name", "help", "bounds", "counts", "sum", "count")
+
+    def __init__(self, name: str, help: str, bounds: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, out: List[str]):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        cumulative = 0
+        for bound, n in zip(self.bounds, self.counts):
+            cumulative += n
+            out.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        out.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        out.append(f"{self.name}_sum {self.sum:.6f}")
+        out.append(f"{self.name}_count {self.count}")
+
+
+class RoomCounters:
+    """Xona bo'yicha xabar/bayt hisoblagichlari; xona ochilganda bir marta ajratiladi."""
+    __slots__ = ("messages", "bytes")
+
+    def __init__(self):
+        self.messages = [0, 0]
+        self.bytes = [0, 0]
+
+    def add(self, direction: int, size: int):
+        self.messages[direction] += 1
+        self.bytes[direction] += size
+
+
+# Jarayon bo'yicha jami hisoblagichlar (xona yopilgandan keyin ham o'smaydi/kamaymaydi)
+TOTALS = RoomCounters()
+
+FRAME_BYTES = Histogram(
+    "deskweb_frame_size_bytes",
+    "Size of screen frames received from clients.",
+    (4096, 16384, 32768, 65536, 131072, 262144, 524288, 1048576, 2097152),
+)
+
+FORWARD_SECONDS = Histogram(
+    "deskweb_forward_seconds",
+    "Relay forwarding time from receive to send completion, per destination peer.",
+    (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(rooms, registry, reaped: Dict[str, int]) -> str:
+    """rooms — app.rooms (shu worker'dagi peer'lar); registry — xonalar jadvali;
+    reaped — muddati o'tib yopilgan xonalar soni (sabab bo'yicha)."""
+    out: List[str] = []
+
+    out.append("# HELP deskweb_rooms_active Rooms with at least one peer on this worker.")
+    out.append("# TYPE deskweb_rooms_active gauge")
+    out.append(f"deskweb_rooms_active {len(rooms)}")
+
+    sockets = {"client": 0, "operator": 0, "viewer": 0}
+    for r in rooms.values():
+        sockets["client"] += r["client"] is not None
+        sockets["operator"] += r["operator"] is not None
+        sockets["viewer"] += len(r["viewers"])
+    out.append("# HELP deskweb_sockets_active Connected WebSockets on this worker by role.")
+    out.append("# TYPE deskweb_sockets_active gauge")
+    for role, n in sockets.items():
+        out.append(f'deskweb_sockets_active{{role="{role}"}} {n}')
+
+    out.append("# HELP deskweb_messages_total Messages received by the relay (use rate() for msg/s).")
+    out.append("# TYPE deskweb_messages_total counter")
+    for i, direction in enumerate(DIRECTIONS):
+        out.append(f'deskweb_messages_total{{direction="{direction}"}} {TOTALS.messages[i]}')
+    out.append("# HELP deskweb_bytes_total Bytes received by the relay (use rate() for bytes/s).")
+    out.append("# TYPE deskweb_bytes_total counter")
+    for i, direction in enumerate(DIRECTIONS):
+        out.append(f'deskweb_bytes_total{{direction="{direction}"}} {TOTALS.bytes[i]}')
+
+    out.append("# HELP deskweb_room_messages_total Messages received per room and direction.")
+    out.append("# TYPE deskweb_room_messages_total counter")
+    room_bytes = []
+    for room, r in rooms.items():
+        label = _escape(room)
+        c = r["counters"]
+        for i, direction in enumerate(DIRECTIONS):
+            out.append(f'deskweb_room_messages_total{{room="{label}",direction="{direction}"}} {c.messages[i]}')
+            room_bytes.append(f'deskweb_room_bytes_total{{room="{label}",direction="{direction}"}} {c.bytes[i]}')
+    out.append("# HELP deskweb_room_bytes_total Bytes received per room and direction.")
+    out.append("# TYPE deskweb_room_bytes_total counter")
+    out.extend(room_bytes)
+
+    queue_lines, drop_lines = [], []
+    for room, r in rooms.items():
+        label = _escape(room)
+        peers = [("client", r["client"]), ("operator", r["operator"])]
+        peers += [("viewer", v) for v in r["viewers"]]
+        for role, peer in peers:
+            if peer is None:
+                continue
+            # peer — bir xonadagi bir nechta ko'ruvchi bir xil seriya bo'lib qolmasligi uchun
+            labels = f'room="{label}",role="{role}",peer="{peer.id}"'
+            for queue in ("control", "frames", "bulk"):
+                queue_lines.append(f'deskweb_peer_queue_depth{{{labels},queue="{queue}"}} {len(getattr(peer, queue))}')
+            drop_lines.append(f'deskweb_peer_dropped_frames_total{{{labels}}} {peer.dropped_frames}')
+    out.append("# HELP deskweb_peer_queue_depth Messages waiting in a peer's outbound queue.")
+    out.append("# TYPE deskweb_peer_queue_depth gauge")
+    out.extend(queue_lines)
+    out.append("# HELP deskweb_peer_dropped_frames_total Frames dropped because a peer fell behind.")
+    out.append("# TYPE deskweb_peer_dropped_frames_total counter")
+    out.extend(drop_lines)
+
+    if registry.remote:
+        out.append("# HELP deskweb_bridge_dropped_frames_total Frames dropped on a backed-up broker link.")
+        out.append("# TYPE deskweb_bridge_dropped_frames_total counter")
+        out.append(f"deskweb_bridge_dropped_frames_total {registry.dropped_frames}")
+
+    out.append("# HELP deskweb_rooms_reaped_total Rooms closed by the expiry reaper, by reason.")
+    out.append("# TYPE deskweb_rooms_reaped_total counter")
+    for reason in ("unclaimed", "waiting", "idle"):
+        out.append(f'deskweb_rooms_reaped_total{{reason="{reason}"}} {reaped.get(reason, 0)}')
+
+    FRAME_BYTES.render(out)
+    FORWARD_SECONDS.render(out)
+    out.append("")
+    return "\n".join(out)
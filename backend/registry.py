@@ -0,0 +1,640 @@
+"""
+Xona registri: xonalar holati (kim ulangan, operator tayyormi) va turli
+worker/host'lardagi peer'lar orasidagi xabar ko'prigi.
+
+LocalRegistry  — bitta jarayon (standart). Hamma narsa xotirada, ko'prik kerak emas.
+BrokerRegistry — har bir uvicorn worker broker jarayoniga Unix socket (yoki host:port)
+                 orqali ulanadi. Broker xonalar jadvalini yagona manba sifatida saqlaydi
+                 va xonaning bir tomonidan kelgan xabarlarni o'sha xonaga obuna bo'lgan
+                 boshqa worker'larga uzatadi.
+
+Broker'ni ishga tushirish:
+    python registry.py --listen /tmp/deskweb-broker.sock
+Worker'lar:
+    DESKWEB_BROKER=/tmp/deskweb-broker.sock uvicorn app:app --workers 4
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import struct
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Optional, Tuple, Union
+
+# Freym: length(4) op(1) + payload
+WIRE_HEADER    = struct.Struct("!IB")
+# Publish payload: side(1) flags(1) room_len(1) + room + data
+PUBLISH_HEADER = struct.Struct("!BBB")
+FLAG_TEXT      = 1
+FLAG_FRAME     = 2   # ekran kadri: ko'prik to'lib qolsa tashlanishi mumkin
+FLAG_DELTA     = 4   # oldingi kadrga bog'liq kadr: biri tashlansa, to'liq kadrgacha hammasi tashlanadi
+
+OP_RPC         = 1   # worker -> broker: JSON so'rov {"id", "op", ...}
+OP_REPLY       = 2   # broker -> worker: JSON javob {"id", "result"}
+OP_PUBLISH     = 3   # ikki tomonga: xonaning bir tomoniga xabar
+OP_SUBSCRIBE   = 4   # worker -> broker: shu xonadagi xabarlarni menga ham yubor
+OP_UNSUBSCRIBE = 5
+
+SIDES = ("client", "watchers")
+
+OP_REAP        = 6   # broker -> worker: xona muddati o'tdi, peer'larni yop ("room\0reason")
+
+# Ko'prik buferi shundan oshsa, kadrlar tashlanadi (boshqaruv xabarlari hech qachon)
+BRIDGE_BUFFER_LIMIT = 4 * 1024 * 1024
+
+# Delta zanjiri uzilganda (kadr tashlanganda) client'ga yuboriladi: keyingi kadr — kalit kadr
+KEYFRAME_REQUEST = '{"type": "keyframe_request"}'
+
+# Xona muddatlari (soniya), env orqali sozlanadi
+TTL_UNCLAIMED   = float(os.environ.get("DESKWEB_TTL_UNCLAIMED", 600))   # yaratilgan, hech kim ulanmagan
+TTL_WAITING     = float(os.environ.get("DESKWEB_TTL_WAITING", 900))     # faqat bir tomon ulangan
+REAPER_INTERVAL = 5.0
+
+# Operator tayyor bo'lishini kutayotgan client shuncha vaqt "to'xtatib turiladi"
+CLIENT_PARK_TIMEOUT = float(os.environ.get("DESKWEB_CLIENT_PARK_TIMEOUT", 120))
+
+# Broker'ga so'rov javobini kutish chegarasi (join'ning o'z kutishidan tashqari) va
+# ulanish uzilganda qayta ulanish oralig'i (0.5 s dan ikki barobardan shu chegaragacha)
+BROKER_CALL_TIMEOUT = float(os.environ.get("DESKWEB_BROKER_TIMEOUT", 10))
+BROKER_RETRY_MAX    = 10.0
+
+
+class ExpiryIndex:
+    """
+    Muddati bo'yicha tartiblangan xonalar indeksi (min-heap). Har bir xona uchun
+    ko'pi bilan bitta yozuv; muddati uzaygan bo'lsa, yozuv olinganda qayta qo'yiladi.
+    Qo'shish va muddati o'tganini olish — O(log n), butun jadvalni skanerlash yo'q.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.indexed = set()
+
+    def push(self, deadline: float, room: str):
+        if room not in self.indexed:
+            self.indexed.add(room)
+            heapq.heappush(self.heap, (deadline, room))
+
+    def pop_due(self, now: float):
+        """Muddati kelgan yozuvlarni indeksdan olib, (deadline, room) qaytaradi."""
+        while self.heap and self.heap[0][0] <= now:
+            deadline, room = heapq.heappop(self.heap)
+            self.indexed.discard(room)
+            yield deadline, room
+
+    def __len__(self):
+        return len(self.heap)
+
+
+class RoomTable:
+    """
+    Xonalar jadvali va qabul qilish qoidalari. LocalRegistry ham, broker ham
+    aynan shu qoidalardan foydalanadi.
+    """
+
+    def __init__(self):
+        # room -> {"created_at", "changed_at", "client": int, "operator": int, "viewers": int,
+        #          "operator_ready": bool}
+        self.rooms: Dict[str, Dict] = {}
+        self.expiry = ExpiryIndex()
+        self.reaped = Counter()   # sabab -> o'chirilgan xonalar soni
+        # room -> operator tayyor bo'lganda (yoki xona o'chganda) o'rnatiladigan hodisa
+        self.ready_events: Dict[str, asyncio.Event] = {}
+
+    def _new(self, room: str) -> Dict:
+        now = time.time()
+        self.rooms[room] = {
+            "created_at": now,
+            "changed_at": now,
+            "client": 0,
+            "operator": 0,
+            "viewers": 0,
+            "operator_ready": False,
+        }
+        self._schedule(room)
+        return self.rooms[room]
+
+    def _expiry(self, info: Dict):
+        """(muddat, sabab) yoki (None, None) — ikkala tomon ulangan xona muddatsiz."""
+        if info["client"] == 0 and info["operator"] == 0 and info["viewers"] == 0:
+            return info["changed_at"] + TTL_UNCLAIMED, "unclaimed"
+        if info["client"] == 0 or info["operator"] == 0:
+            return info["changed_at"] + TTL_WAITING, "waiting"
+        return None, None
+
+    def _schedule(self, room: str):
+        info = self.rooms[room]
+        info["changed_at"] = time.time()
+        deadline, _ = self._expiry(info)
+        if deadline is not None:
+            self.expiry.push(deadline, room)
+
+    def sweep(self, now: float):
+        """Muddati o'tgan xonalarni o'chiradi; [(room, sabab), ...] qaytaradi."""
+        reaped = []
+        for _, room in list(self.expiry.pop_due(now)):
+            info = self.rooms.get(room)
+            if info is None:
+                continue
+            deadline, reason = self._expiry(info)
+            if deadline is None:
+                continue
+            if deadline > now:
+                self.expiry.push(deadline, room)
+                continue
+            del self.rooms[room]
+            self._wake(room)
+            self.reaped[reason] += 1
+            reaped.append((room, reason))
+            print(f"Room {room} reaped ({reason})")
+        return reaped
+
+    def create(self, room: str) -> bool:
+        """False — xona band (operator bor)."""
+        info = self.rooms.get(room)
+        if info is None:
+            self._new(room)
+            return True
+        return info["operator"] == 0
+
+    def join(self, room: str, role: str) -> Tuple[Optional[str], Optional[str]]:
+        """Qaytaradi: (berilgan rol, xato matni)."""
+        info = self.rooms.get(room)
+
+        if role == "operator":
+            if info is None:
+                # Operator yangi xona ochadi
+                info = self._new(room)
+            if info["operator"] > 0:
+                # Boshqaruvchi bor — yangi operator ko'ruvchi bo'ladi
+                info["viewers"] += 1
+                self._schedule(room)
+                return "viewer", None
+            info["operator"] += 1
+            info["operator_ready"] = False
+            self._schedule(room)
+            return "operator", None
+
+        if info is None:
+            return None, f"Room '{room}' does not exist. Please check the Room ID."
+
+        if role == "viewer":
+            info["viewers"] += 1
+            self._schedule(room)
+            return "viewer", None
+
+        # client
+        if not info["operator_ready"]:
+            return None, "Operator is not ready yet. Please wait and try again."
+        if info["operator"] == 0:
+            return None, f"No operator in room '{room}'. Please ask operator to connect first."
+        info["client"] += 1
+        self._schedule(room)
+        return "client", None
+
+    def set_ready(self, room: str, ready: bool):
+        info = self.rooms.get(room)
+        if info is not None and info["operator"] > 0:
+            info["operator_ready"] = ready
+            if ready:
+                self._wake(room)
+
+    def _wake(self, room: str):
+        event = self.ready_events.pop(room, None)
+        if event is not None:
+            event.set()
+
+    async def wait_ready(self, room: str, timeout: float) -> bool:
+        """Operator tayyor bo'lguncha kutadi (xona mavjud bo'lsa). True — tayyor."""
+        info = self.rooms.get(room)
+        if info is None:
+            return False
+        if not info["operator_ready"]:
+            event = self.ready_events.setdefault(room, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        info = self.rooms.get(room)
+        return info is not None and info["operator_ready"]
+
+    def leave(self, room: str, role: str):
+        info = self.rooms.get(room)
+        if info is None:
+            return
+        key = "viewers" if role == "viewer" else role
+        info[key] = max(0, info[key] - 1)
+        if role == "operator" and info["operator"] == 0:
+            info["operator_ready"] = False
+        # Agar hech kim qolmagan bo'lsa, xonani o'chirish
+        if info["client"] == 0 and info["operator"] == 0 and info["viewers"] == 0:
+            del self.rooms[room]
+            self._wake(room)
+            print(f"Room {room} deleted")
+        else:
+            self._schedule(room)
+
+    def info(self, room: str) -> Optional[Dict]:
+        info = self.rooms.get(room)
+        return dict(info) if info is not None else None
+
+
+class LocalRegistry:
+    """Bitta jarayon uchun registr: barcha peer'lar shu worker'da."""
+
+    remote = False
+
+    def __init__(self):
+        self.table = RoomTable()
+        self.reaper_task = None
+
+    async def start(self, deliver: Callable, reap: Callable):
+        self.reaper_task = asyncio.create_task(_reaper(self.table, reap))
+
+    async def stop(self):
+        if self.reaper_task:
+            self.reaper_task.cancel()
+
+    async def create(self, room: str) -> bool:
+        return self.table.create(room)
+
+    async def join(self, room: str, role: str, wait: float = 0.0):
+        if wait:
+            await self.table.wait_ready(room, wait)
+        return self.table.join(room, role)
+
+    async def set_ready(self, room: str, ready: bool):
+        self.table.set_ready(room, ready)
+
+    async def leave(self, room: str, role: str):
+        self.table.leave(room, role)
+
+    async def info(self, room: str) -> Optional[Dict]:
+        return self.table.info(room)
+
+    async def reaped(self) -> Dict[str, int]:
+        return dict(self.table.reaped)
+
+    def subscribe(self, room: str):
+        pass
+
+    def unsubscribe(self, room: str):
+        pass
+
+    def publish(self, room: str, side: str, data: Union[bytes, str], frame: bool, delta: bool = False):
+        pass
+
+
+def _is_tcp(address: str) -> bool:
+    """'host:port' — TCP (bir nechta host uchun), aks holda Unix socket yo'li."""
+    return ":" in address and not address.startswith(("/", "."))
+
+
+async def _open(address: str):
+    if _is_tcp(address):
+        host, port = address.rsplit(":", 1)
+        return await asyncio.open_connection(host, int(port))
+    return await asyncio.open_unix_connection(address)
+
+
+def _write(writer: asyncio.StreamWriter, op: int, *parts: bytes):
+    writer.writelines((WIRE_HEADER.pack(sum(len(p) for p in parts), op), *parts))
+
+
+def _publish_parts(room: str, side: str, data: Union[bytes, str], frame: bool, delta: bool = False):
+    room_b = room.encode()
+    flags = (FLAG_FRAME if frame else 0) | (FLAG_DELTA if delta else 0)
+    if isinstance(data, str):
+        data = data.encode()
+        flags |= FLAG_TEXT
+    return PUBLISH_HEADER.pack(SIDES.index(side), flags, len(room_b)), room_b, data
+
+
+def _parse_publish(body: bytes):
+    side, flags, room_len = PUBLISH_HEADER.unpack_from(body)
+    start = PUBLISH_HEADER.size
+    room = body[start:start + room_len].decode()
+    data = body[start + room_len:]
+    return room, SIDES[side], (data.decode() if flags & FLAG_TEXT else data), flags
+
+
+def _drop_frame(need_keyframe: set, room: str, flags: int, transport) -> bool:
+    """
+    Ko'prik to'lib qolganda kadrni tashlash kerakmi? Delta tashlangach, o'sha xona uchun
+    keyingi to'liq kadrgacha barcha deltalar ham tashlanadi (need_keyframe — xonalar to'plami).
+    """
+    if not flags & FLAG_FRAME:
+        return False
+    if flags & FLAG_DELTA and room in need_keyframe:
+        return True
+    if transport.get_write_buffer_size() > BRIDGE_BUFFER_LIMIT:
+        need_keyframe.add(room)
+        return True
+    if not flags & FLAG_DELTA:
+        need_keyframe.discard(room)
+    return False
+
+
+async def _reaper(table: RoomTable, reap: Callable):
+    """Fon vazifasi: muddati o'tgan xonalarni o'chirib, reap(room, sabab) chaqiradi."""
+    while True:
+        await asyncio.sleep(REAPER_INTERVAL)
+        try:
+            for room, reason in table.sweep(time.time()):
+                reap(room, reason)
+        except Exception as e:
+            print(f"[registry] reaper error: {e}")
+
+
+async def _read_frame(reader: asyncio.StreamReader):
+    length, op = WIRE_HEADER.unpack(await reader.readexactly(WIRE_HEADER.size))
+    return op, await reader.readexactly(length)
+
+
+class BrokerRegistry:
+    """Worker tomoni: xonalar jadvali broker'da, xabarlar broker orqali ko'priklanadi."""
+
+    remote = True
+
+    def __init__(self, address: str):
+        self.address = address
+        self.reader = None
+        self.writer = None
+        self.deliver = None
+        self.reap = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.seq = 0
+        self.subscriptions = Counter()
+        self.dropped_frames = 0
+        self.need_keyframe = set()
+        self.read_task = None
+        self.reconnect_task = None
+        self.connected = False
+        self.stopping = False
+
+    async def start(self, deliver: Callable, reap: Callable):
+        self.deliver = deliver
+        self.reap = reap
+        await self._connect()
+
+    async def _connect(self):
+        self.reader, self.writer = await _open(self.address)
+        self.connected = True
+        self.need_keyframe.clear()
+        # Uzilish paytida ham ochiq qolgan obunalar yangi ulanishda tiklanadi
+        for room in self.subscriptions:
+            _write(self.writer, OP_SUBSCRIBE, room.encode())
+        self.read_task = asyncio.create_task(self._read_loop())
+        print(f"[registry] connected to broker at {self.address}")
+
+    async def _reconnect(self):
+        delay = 0.5
+        while not self.stopping:
+            await asyncio.sleep(delay)
+            try:
+                await self._connect()
+                return
+            except OSError as e:
+                print(f"[registry] broker reconnect failed: {e}")
+                delay = min(delay * 2, BROKER_RETRY_MAX)
+
+    async def stop(self):
+        self.stopping = True
+        for task in (self.read_task, self.reconnect_task):
+            if task:
+                task.cancel()
+        if self.writer:
+            self.writer.close()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                op, body = await _read_frame(self.reader)
+                if op == OP_PUBLISH:
+                    room, side, data, _ = _parse_publish(body)
+                    self.deliver(room, side, data)
+                elif op == OP_REAP:
+                    room, reason = body.decode().split("\0", 1)
+                    self.reap(room, reason)
+                elif op == OP_REPLY:
+                    reply = json.loads(body)
+                    fut = self.pending.pop(reply["id"], None)
+                    if fut and not fut.done():
+                        fut.set_result(reply["result"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[registry] broker connection lost: {e}")
+        finally:
+            self.connected = False
+            self.writer.close()
+            for fut in self.pending.values():
+                if not fut.done():
+                    fut.set_exception(ConnectionError("broker connection lost"))
+            self.pending.clear()
+            if not self.stopping:
+                # Broker bu worker a'zoliklarini o'chirdi: shu yerdagi peer'lar yopiladi
+                # (qayta ulanib qayta qo'shiladi), ulanish esa fonda tiklanadi
+                for room in list(self.subscriptions):
+                    self.reap(room, "broker connection lost")
+                self.reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _call(self, op: str, **kwargs):
+        """So'rov; broker ulanmagan bo'lsa yoki javob kelmasa — ConnectionError."""
+        if not self.connected:
+            raise ConnectionError("broker unavailable")
+        self.seq += 1
+        seq = self.seq
+        fut = asyncio.get_running_loop().create_future()
+        self.pending[seq] = fut
+        _write(self.writer, OP_RPC, json.dumps({"id": seq, "op": op, **kwargs}).encode())
+        try:
+            return await asyncio.wait_for(fut, kwargs.get("wait", 0.0) + BROKER_CALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"broker did not answer '{op}'") from None
+        finally:
+            self.pending.pop(seq, None)
+
+    async def create(self, room: str) -> bool:
+        return await self._call("create", room=room)
+
+    async def join(self, room: str, role: str, wait: float = 0.0):
+        assigned, error = await self._call("join", room=room, role=role, wait=wait)
+        return assigned, error
+
+    async def set_ready(self, room: str, ready: bool):
+        await self._call("set_ready", room=room, ready=ready)
+
+    async def leave(self, room: str, role: str):
+        await self._call("leave", room=room, role=role)
+
+    async def info(self, room: str) -> Optional[Dict]:
+        return await self._call("info", room=room)
+
+    async def reaped(self) -> Dict[str, int]:
+        return await self._call("reaped")
+
+    def subscribe(self, room: str):
+        self.subscriptions[room] += 1
+        if self.subscriptions[room] == 1 and self.connected:
+            _write(self.writer, OP_SUBSCRIBE, room.encode())
+
+    def unsubscribe(self, room: str):
+        self.subscriptions[room] -= 1
+        if self.subscriptions[room] <= 0:
+            del self.subscriptions[room]
+            if self.connected:
+                _write(self.writer, OP_UNSUBSCRIBE, room.encode())
+
+    def publish(self, room: str, side: str, data: Union[bytes, str], frame: bool, delta: bool = False):
+        if not self.connected:
+            return   # qayta ulanguncha boshqa worker'lardagi peer'larga yo'l yo'q
+        header, room_b, payload = _publish_parts(room, side, data, frame, delta)
+        chained = room not in self.need_keyframe
+        if _drop_frame(self.need_keyframe, room, header[1], self.writer.transport):
+            self.dropped_frames += 1
+            if chained:
+                # Kadrlar shu worker'dagi client'dan: undan darhol kalit kadr so'raymiz
+                self.deliver(room, "client", KEYFRAME_REQUEST)
+            return
+        _write(self.writer, OP_PUBLISH, header, room_b, payload)
+
+
+def create_registry():
+    """DESKWEB_BROKER o'rnatilgan bo'lsa — broker, aks holda jarayon ichidagi registr."""
+    address = os.environ.get("DESKWEB_BROKER")
+    return BrokerRegistry(address) if address else LocalRegistry()
+
+
+# ------------------ Broker jarayoni ------------------
+
+class Broker:
+    def __init__(self):
+        self.table = RoomTable()
+        # room -> obuna bo'lgan worker ulanishlari
+        self.subscribers: Dict[str, set] = defaultdict(set)
+        # worker ulanishi -> delta kadrlari to'liq kadr kutayotgan xonalar
+        self.need_keyframe: Dict[asyncio.StreamWriter, set] = defaultdict(set)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Worker o'lib qolsa, uning a'zoliklari va obunalari tozalanadi
+        members = Counter()
+        rooms_subscribed = set()
+        try:
+            while True:
+                op, body = await _read_frame(reader)
+
+                if op == OP_PUBLISH:
+                    # Payload o'zgartirilmasdan boshqa worker'larga uzatiladi
+                    _, flags, room_len = PUBLISH_HEADER.unpack_from(body)
+                    start = PUBLISH_HEADER.size
+                    room = body[start:start + room_len].decode()
+                    for other in self.subscribers.get(room, ()):
+                        if other is writer:
+                            continue
+                        chained = room not in self.need_keyframe[other]
+                        if _drop_frame(self.need_keyframe[other], room, flags, other.transport):
+                            if chained:
+                                # Kadr yuborgan worker'dagi client'dan kalit kadr so'raymiz
+                                _write(writer, OP_PUBLISH,
+                                       *_publish_parts(room, "client", KEYFRAME_REQUEST, False))
+                            continue
+                        _write(other, OP_PUBLISH, body)
+
+                elif op == OP_RPC:
+                    req = json.loads(body)
+                    if req.get("wait"):
+                        # Client operatorni kutmoqda — ulanish navbatini to'xtatmaslik uchun alohida
+                        asyncio.create_task(self._parked_join(req, members, writer))
+                    else:
+                        self._reply(writer, req, self._rpc(req, members))
+
+                elif op == OP_SUBSCRIBE:
+                    room = body.decode()
+                    self.subscribers[room].add(writer)
+                    rooms_subscribed.add(room)
+
+                elif op == OP_UNSUBSCRIBE:
+                    room = body.decode()
+                    self._unsubscribe(room, writer)
+                    rooms_subscribed.discard(room)
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for room in rooms_subscribed:
+                self._unsubscribe(room, writer)
+            self.need_keyframe.pop(writer, None)
+            for (room, role), n in members.items():
+                for _ in range(n):
+                    self.table.leave(room, role)
+            writer.close()
+
+    def _reply(self, writer, req: Dict, result):
+        if not writer.is_closing():
+            _write(writer, OP_REPLY, json.dumps({"id": req["id"], "result": result}).encode())
+
+    async def _parked_join(self, req: Dict, members: Counter, writer):
+        await self.table.wait_ready(req["room"], req["wait"])
+        if not writer.is_closing():
+            self._reply(writer, req, self._rpc(req, members))
+
+    def _unsubscribe(self, room: str, writer):
+        subs = self.subscribers.get(room)
+        if subs is not None:
+            subs.discard(writer)
+            if not subs:
+                del self.subscribers[room]
+
+    def _rpc(self, req: Dict, members: Counter):
+        op = req["op"]
+        room = req.get("room")
+        if op == "create":
+            return self.table.create(room)
+        if op == "join":
+            assigned, error = self.table.join(room, req["role"])
+            if assigned:
+                members[(room, assigned)] += 1
+            return [assigned, error]
+        if op == "set_ready":
+            self.table.set_ready(room, req["ready"])
+            return None
+        if op == "leave":
+            if members[(room, req["role"])] > 0:
+                members[(room, req["role"])] -= 1
+            self.table.leave(room, req["role"])
+            return None
+        if op == "info":
+            return self.table.info(room)
+        if op == "reaped":
+            return dict(self.table.reaped)
+        return None
+
+    def reap(self, room: str, reason: str):
+        """Muddati o'tgan xona: unga obuna worker'lar o'z peer'larini yopadi."""
+        for writer in self.subscribers.get(room, ()):
+            _write(writer, OP_REAP, f"{room}\0{reason}".encode())
+
+
+async def serve(address: str):
+    broker = Broker()
+    if _is_tcp(address):
+        host, port = address.rsplit(":", 1)
+        server = await asyncio.start_server(broker.handle, host, int(port))
+    else:
+        if os.path.exists(address):
+            os.unlink(address)
+        server = await asyncio.start_unix_server(broker.handle, address)
+    print(f"[broker] listening on {address}")
+    reaper = asyncio.create_task(_reaper(broker.table, broker.reap))  # noqa: F841
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DeskWeb relay room broker")
+    parser.add_argument("--listen", default="/tmp/deskweb-broker.sock",
+                        help="Unix socket yo'li yoki host:port")
+    asyncio.run(serve(parser.parse_args().listen))
@@ -0,0 +1,223 @@
+"""
+Ekran olish -> kichraytirish -> kodlash yo'lining mikro-benchmarki (1080p/1440p).
+
+Bir xil BGRA kadrlarda uch yo'l solishtiriladi:
+  legacy — avvalgi yo'l: screenshot.rgb -> Image.frombytes -> LANCZOS -> np.array
+           -> [:, :, ::-1] -> cv2.imencode (teskari qadamli massivni cv2 o'zi nusxalaydi)
+  cv2    — frame_codec.FrameScaler: BGRA ko'rinishi -> cv2.resize(INTER_AREA) ->
+           cvtColor(BGR) oldindan ajratilgan buferlarga -> cv2.imencode
+  pil    — FrameScaler(use_cv2=False): OpenCV yo'q bo'lgandagi fallback
+
+Har bir yo'l uchun bosqichlar vaqti (ms/kadr) va kadr boshiga ajratiladigan katta
+buferlar chiqariladi. Buferlar alohida (vaqt o'lchanmaydigan) o'tishda o'lchanadi:
+  copies / alloc MB — NumPy massivlari, OpenCV chiqishlari va bytes (tracemalloc;
+                      bosqich ichida ajratilib bo'shatilgan vaqtinchalik bufer peak orqali)
+  PIL img           — yaratilgan PIL tasvirlari (Pillow statistikasi; ularning C xotirasi
+                      tracemalloc'ga ko'rinmaydi), ichki oraliq tasvirlar ham kiradi
+
+Misollar:
+    python bench_capture.py
+    python bench_capture.py --sizes 1920x1080 2560x1440 3840x2160 --frames 60 --json out.json
+    python bench_capture.py --mss            # sintetik kadrlar o'rniga haqiqiy ekran
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+from PIL import Image
+
+import frame_codec as fc
+
+
+# ------------------ Kadrlar ------------------
+
+def synthetic_frames(width: int, height: int, count: int = 4):
+    """Ish stoliga o'xshash BGRA kadrlar: fon, oynalar va matnga o'xshash chiziqlar."""
+    rng = np.random.default_rng(1)
+    frames = []
+    for _ in range(count):
+        img = np.empty((height, width, 4), dtype=np.uint8)
+        img[:] = (110, 60, 30, 255)
+        for _ in range(6):
+            x0, y0 = rng.integers(0, width // 2), rng.integers(0, height // 2)
+            x1, y1 = x0 + width // 3, y0 + height // 3
+            img[y0:y1, x0:x1, :3] = 235
+            for line in range(y0 + 8, y1 - 8, 14):
+                mask = rng.random((6, x1 - x0 - 12)) < 0.35
+                img[line:line + 6, x0 + 6:x1 - 6, :3][mask] = 20
+        frames.append(bytearray(img.tobytes()))
+    return frames
+
+
+def mss_frames(count: int = 4):
+    import mss
+    with mss.mss() as sct:
+        monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
+        shots = [sct.grab(monitor) for _ in range(count)]
+    width, height = shots[0].size
+    return width, height, [shot.raw for shot in shots]
+
+
+# ------------------ Yo'llar ------------------
+
+def legacy_rgb(raw, width: int, height: int) -> bytes:
+    """mss ScreenShot.rgb bilan bir xil: BGRA -> RGB (Python darajasida kesish + bytes nusxasi)."""
+    rgb = bytearray(width * height * 3)
+    rgb[0::3] = raw[2::4]
+    rgb[1::3] = raw[1::4]
+    rgb[2::3] = raw[0::4]
+    return bytes(rgb)
+
+
+def legacy_stages(width: int, height: int):
+    return [
+        ("screenshot.rgb", lambda raw: legacy_rgb(raw, width, height)),
+        ("frombytes", lambda rgb: Image.frombytes('RGB', (width, height), rgb)),
+        ("resize", lambda img: fc.downscale_hq(img, fc.TARGET_WIDTH)),
+        ("np.array+flip", lambda img: np.array(img)[:, :, ::-1]),
+        ("encode", lambda arr: fc._encode_image_sync_cv2(arr)[0]),
+    ]
+
+
+def scaler_stages(scaler, encode, width: int, height: int):
+    return [
+        ("scale", lambda raw: scaler.scale(raw, width, height)),
+        ("encode", lambda frame: encode(frame)[0]),
+    ]
+
+
+def run_stages(stages, raw, timings):
+    """Bosqichlarni ketma-ket bajaradi; har birining vaqti timings'ga qo'shiladi. Qaytaradi: kodlangan hajm."""
+    value = raw
+    for name, fn in stages:
+        t0 = time.perf_counter()
+        value = fn(value)
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - t0)
+    return len(value)
+
+
+def scaled_size(width: int, height: int):
+    if width > fc.TARGET_WIDTH:
+        return fc.TARGET_WIDTH, max(1, int(height * fc.TARGET_WIDTH / width))
+    return width, height
+
+
+def large_blocks(min_size: int) -> Counter:
+    """tracemalloc kuzatayotgan, min_size dan katta tirik bloklar: o'lcham -> soni."""
+    return Counter(t.size for t in tracemalloc.take_snapshot().traces if t.size >= min_size)
+
+
+def allocations(stages, raw, min_size: int):
+    """
+    Bitta kadrda ajratilgan katta buferlarni o'lchaydi (kodlangan natijadan tashqari).
+    Bosqich chiqishlari kadr oxirigacha ushlab turiladi — har biri keyingi snapshotda ko'rinadi.
+    Qaytaradi: (buferlar soni, baytlar, yaratilgan PIL tasvirlari)
+    """
+    outputs = []
+    count = size = 0
+    tracemalloc.start()
+    try:
+        pil_before = Image.core.get_stats()["new_count"]
+        before = large_blocks(min_size)
+        value = raw
+        for _, fn in stages:
+            tracemalloc.reset_peak()
+            value = fn(value)
+            outputs.append(value)
+            current, peak = tracemalloc.get_traced_memory()
+            after = large_blocks(min_size)
+            for block, n in (after - before).items():
+                count += n
+                size += block * n
+            # Bosqich ichida ajratilib, chiqishgacha bo'shatilgan bufer (masalan, cv2 ning
+            # teskari qadamli massiv nusxasi) — peak'da qoladi; kamida bittasi sanaladi
+            if peak - current >= min_size:
+                count += 1
+                size += peak - current
+            before = after
+        pil_images = Image.core.get_stats()["new_count"] - pil_before
+    finally:
+        tracemalloc.stop()
+    return count, size, pil_images
+
+
+def bench(path: str, frames, width: int, height: int, count: int):
+    timings = {}
+    sizes = []
+    if path == "legacy":
+        stages = legacy_stages(width, height)
+    elif path == "cv2":
+        stages = scaler_stages(fc.FrameScaler(use_cv2=True), fc._encode_image_sync_cv2, width, height)
+    else:
+        stages = scaler_stages(fc.FrameScaler(use_cv2=False), fc._encode_image_sync_pil, width, height)
+
+    run_stages(stages, frames[0], timings)   # isitish (buferlar ajratiladi)
+    timings.clear()
+    for i in range(count):
+        sizes.append(run_stages(stages, frames[i % len(frames)], timings))
+
+    # Kichraytirilgan kadrning bitta kanalidan katta har bir blok — "kadr nusxasi"
+    sw, sh = scaled_size(width, height)
+    copies, alloc, pil_images = allocations(stages, frames[count % len(frames)], sw * sh)
+
+    stages_ms = {k: round(1000 * v / count, 2) for k, v in timings.items()}
+    encode_ms = stages_ms.get("encode", 0.0)
+    return {
+        "size": f"{width}x{height}",
+        "path": path,
+        "stages_ms": stages_ms,
+        "capture_to_encoder_ms": round(sum(stages_ms.values()) - encode_ms, 2),
+        "encode_ms": encode_ms,
+        "total_ms": round(sum(stages_ms.values()), 2),
+        "frame_copies": copies,
+        "alloc_mb_per_frame": round(alloc / 2 ** 20, 1),
+        "pil_images": pil_images,
+        "encoded_kb": round(sum(sizes) / len(sizes) / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeskWeb capture path micro-benchmark")
+    parser.add_argument("--sizes", nargs="+", default=["1920x1080", "2560x1440"])
+    parser.add_argument("--frames", type=int, default=30, help="Har bir yo'l uchun kadrlar soni")
+    parser.add_argument("--paths", nargs="+", default=["legacy", "cv2", "pil"],
+                        choices=["legacy", "cv2", "pil"])
+    parser.add_argument("--mss", action="store_true", help="Haqiqiy ekran kadrlaridan foydalanish")
+    parser.add_argument("--json", help="Natijani JSON faylga yozish")
+    args = parser.parse_args()
+
+    paths = [p for p in args.paths if fc.CV2_AVAILABLE or p == "pil"]
+    if len(paths) < len(args.paths):
+        print("OpenCV topilmadi: faqat PIL yo'li o'lchanadi.")
+
+    if args.mss:
+        width, height, frames = mss_frames()
+        inputs = [(width, height, frames)]
+    else:
+        inputs = []
+        for size in args.sizes:
+            width, height = map(int, size.lower().split("x"))
+            inputs.append((width, height, synthetic_frames(width, height)))
+
+    results = []
+    header = f"{'size':<11} {'path':<7} {'to-encoder ms':>13} {'encode ms':>10} {'total ms':>9} {'copies':>7} {'alloc MB':>9} {'PIL img':>8}"
+    print(header)
+    print("-" * len(header))
+    for width, height, frames in inputs:
+        for path in paths:
+            r = bench(path, frames, width, height, args.frames)
+            results.append(r)
+            print(f"{r['size']:<11} {r['path']:<7} {r['capture_to_encoder_ms']:>13.2f} {r['encode_ms']:>10.2f} "
+                  f"{r['total_ms']:>9.2f} {r['frame_copies']:>7} {r['alloc_mb_per_frame']:>9.1f} {r['pil_images']:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"target_width": fc.TARGET_WIDTH, "results": results}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,471 @@
+"""
+Kadr kodlovchilari benchmarki: ish stoli kadrlari korpusida barcha yo'l va sozlamalar.
+
+Har bir kadr (client kabi TARGET_WIDTH gacha kichraytirilgan) har bir kodlovchi bilan
+kodlanadi va quyidagilar o'lchanadi:
+  encode ms  — client tomonda kodlash (bir necha takrorlash medianasi)
+  bytes      — kodlangan kadr hajmi
+  decode ms  — operator tomonda dekodlash (PIL: Image.open + convert("RGB"), decode_frame kabi)
+  PSNR / SSIM — asl kadrga nisbatan sifat (SSIM — kulrang, 7x7 oyna)
+
+Kodlovchilar:
+  client-cv2 / client-pil — client_desktop'dagi aynan ishlab chiqarish yo'llari (WEBP_QUALITY)
+  cv2-webp-qN, cv2-jpeg-qN, pil-webp-mM-qN, pil-jpeg-sS-qN — sozlamalar bo'yicha variantlar
+
+Oqim kodlovchilari (holatli — bitta kadr emas, qisqa kadrlar ketma-ketligida o'lchanadi):
+  seq-full      — har kadr to'liq rasm (plitkalarsiz client yo'li)
+  seq-tiles     — client'ning plitkali yo'li: birinchi kadr to'liq, keyin o'zgargan plitkalar
+                  (TILE_FULL_RATIO dan ko'p o'zgarsa — yana to'liq kadr); operator kabi yig'iladi
+  seq-h264 / seq-vp8 — video_codec.VideoEncoder (PyAV o'rnatilgan bo'lsa), operator kabi dekodlanadi
+Ketma-ketlik (--seq kadr): avval matn yozilishi (kichik soha o'zgaradi), keyin skroll.
+Qiymatlar kadr boshiga o'rtacha; PSNR/SSIM — operatorda tiklangan kadr va asl kadr.
+
+Korpus: --corpus papkasidagi PNG/JPEG/WebP fayllar; fayl nomining birinchi qismi
+(masalan "ide_02.png" -> "ide") toifa sifatida olinadi. Korpus bo'lmasa — sintetik
+kadrlar (text, ide, browser, photo, video). Haqiqiy korpus yig'ish:
+    python bench_encoders.py --record corpus/ide --frames 5   # 1 soniya oraliqda 5 kadr
+
+Misollar:
+    python bench_encoders.py
+    python bench_encoders.py --corpus corpus --json encoders.json
+    python bench_encoders.py --encoders cv2-webp-q80 pil-webp-m4-q80 --width 0   # asl o'lcham
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+import frame_codec as fc
+import video_codec as vc
+
+CATEGORIES = ("text", "ide", "browser", "photo", "video")
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp", ".bmp")
+
+# client_desktop.TILE_SIZE / TILE_FULL_RATIO bilan bir xil (client GUI modulini import qilmaslik uchun)
+TILE_SIZE       = 64
+TILE_FULL_RATIO = 0.5
+
+
+# ------------------ Korpus ------------------
+
+def _lines(draw: ImageDraw.ImageDraw, rng, box, colors, line_h=16, indent=True):
+    """Matnga o'xshash qatorlar: tasodifiy uzunlikdagi "so'zlar" (haqiqiy shrift bilan)."""
+    x0, y0, x1, y1 = box
+    y = y0
+    while y + line_h <= y1:
+        x = x0 + (int(rng.integers(0, 4)) * 24 if indent else 0)
+        while x < x1 - 40:
+            word = "".join(chr(int(c)) for c in rng.integers(97, 123, int(rng.integers(2, 10))))
+            draw.text((x, y), word, fill=tuple(int(c) for c in colors[int(rng.integers(len(colors)))]))
+            x += 7 * len(word) + 7
+            if rng.random() < 0.08:
+                break
+        y += line_h
+
+
+def synthetic_frame(category: str, width: int = 1920, height: int = 1080, seed: int = 0) -> np.ndarray:
+    """Toifaga xos sintetik ish stoli kadri (BGR)."""
+    rng = np.random.default_rng(seed)
+    if category in ("photo", "video"):
+        # Past chastotali "tabiiy" tasvir: kichik shovqin kattalashtirilib, ustiga don (grain)
+        small = rng.integers(0, 255, (9, 16, 3), dtype=np.uint8)
+        img = Image.fromarray(small).resize((width, height), Image.Resampling.BICUBIC)
+        img = img.filter(ImageFilter.GaussianBlur(radius=width / 120))
+        arr = np.asarray(img).astype(np.int16)
+        arr += rng.integers(-12, 13, arr.shape, dtype=np.int16)
+        if category == "video":
+            # Pleyer oynasi: qora fon, markazda kadr, pastda boshqaruv paneli
+            frame = np.full_like(arr, 12)
+            h, w = height * 3 // 4, width * 3 // 4
+            y, x = (height - h) // 2, (width - w) // 2
+            frame[y:y + h, x:x + w] = arr[y:y + h, x:x + w]
+            frame[y + h:y + h + 40, x:x + w] = 40
+            arr = frame
+        return np.clip(arr, 0, 255).astype(np.uint8)[:, :, ::-1].copy()
+
+    if category == "ide":
+        img = Image.new("RGB", (width, height), (30, 30, 30))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, 0, width // 6, height), fill=(37, 37, 38))           # fayllar paneli
+        draw.rectangle((0, height - 24, width, height), fill=(0, 122, 204))     # holat qatori
+        _lines(draw, rng, (10, 10, width // 6 - 10, height - 30), [(204, 204, 204)], indent=False)
+        _lines(draw, rng, (width // 6 + 50, 10, width - 10, height - 30),
+               [(86, 156, 214), (206, 145, 120), (106, 153, 85), (220, 220, 170), (212, 212, 212)])
+    elif category == "browser":
+        img = Image.new("RGB", (width, height), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        draw.rectangle((0, 0, width, 80), fill=(222, 225, 230))                 # tablar va manzil
+        draw.rectangle((120, 44, width - 120, 70), fill=(255, 255, 255))
+        for i in range(4):                                                      # rasmli kartochkalar
+            x = 80 + i * (width - 160) // 4
+            block = rng.integers(0, 255, (3, 4, 3), dtype=np.uint8)
+            pic = Image.fromarray(block).resize(((width - 160) // 4 - 20, 200), Image.Resampling.BICUBIC)
+            img.paste(pic, (x, 120))
+        _lines(draw, rng, (80, 350, width - 80, height - 20), [(32, 33, 36), (26, 13, 171)], line_h=22)
+    else:  # text
+        img = Image.new("RGB", (width, height), (255, 255, 255))
+        draw = ImageDraw.Draw(img)
+        _lines(draw, rng, (width // 5, 40, width * 4 // 5, height - 40), [(0, 0, 0)], line_h=18, indent=False)
+    return np.asarray(img)[:, :, ::-1].copy()
+
+
+def load_corpus(path: str):
+    """[(nom, toifa, BGR kadr)] — papka (ichki papkalar bilan) yoki bitta fayl."""
+    files = []
+    if os.path.isdir(path):
+        for root, _, names in os.walk(path):
+            files += [os.path.join(root, n) for n in sorted(names) if n.lower().endswith(IMAGE_EXTS)]
+    else:
+        files = [path]
+    corpus = []
+    for f in sorted(files):
+        name = os.path.relpath(f, path) if os.path.isdir(path) else os.path.basename(f)
+        category = os.path.basename(f).split("_")[0].split(".")[0].lower()
+        arr = np.asarray(Image.open(f).convert("RGB"))[:, :, ::-1].copy()
+        corpus.append((name, category, arr))
+    return corpus
+
+
+def record_corpus(directory: str, count: int, interval: float = 1.0):
+    """Haqiqiy ekrandan korpus kadrlarini (PNG, asl o'lchamda) yozadi: <papka nomi>_NN.png"""
+    import mss
+    os.makedirs(directory, exist_ok=True)
+    category = os.path.basename(os.path.normpath(directory))
+    with mss.mss() as sct:
+        monitor = sct.monitors[1] if len(sct.monitors) > 1 else sct.monitors[0]
+        for i in range(count):
+            shot = sct.grab(monitor)
+            out = os.path.join(directory, f"{category}_{i:02d}.png")
+            Image.frombytes("RGB", shot.size, shot.raw, "raw", "BGRX").save(out, optimize=True)
+            print(f"saved {out}")
+            time.sleep(interval)
+
+
+def downscale(arr: np.ndarray, width: int) -> np.ndarray:
+    """Client kabi kichraytirish (FrameScaler: cv2 INTER_AREA yoki PIL LANCZOS)."""
+    height, src_w = arr.shape[:2]
+    if not width or src_w <= width:
+        return arr
+    bgra = np.dstack([arr, np.full(arr.shape[:2], 255, np.uint8)])
+    return fc.FrameScaler().scale(bgra.tobytes(), src_w, height, width).copy()
+
+
+def frame_sequence(frame: np.ndarray, count: int):
+    """
+    Ish stolidagi odatiy harakat: birinchi yarmida matn yoziladi (har kadrda bitta "harf" —
+    kichik to'rtburchak), ikkinchi yarmida kadr 8 px dan yuqoriga skroll qilinadi.
+    """
+    height, width = frame.shape[:2]
+    frames = [frame]
+    typing = count // 2
+    x, y = width // 4, height // 3
+    for i in range(1, count):
+        cur = frames[-1].copy()
+        if i <= typing:
+            cur[y:y + 14, x + 9 * i:x + 9 * i + 7] = 20
+        else:
+            cur = np.concatenate([cur[8:], cur[:8]])
+        frames.append(cur)
+    return frames
+
+
+# ------------------ Kodlovchilar ------------------
+
+def _pil_encoder(fmt: str, quality: int, **opts):
+    def encode(frame):
+        buf = io.BytesIO()
+        Image.fromarray(np.ascontiguousarray(frame[:, :, ::-1])).save(buf, format=fmt, quality=quality, **opts)
+        return buf.getvalue()
+    return encode
+
+
+def _cv2_encoder(ext: str, params):
+    def encode(frame):
+        ok, buf = fc.cv2.imencode(ext, frame, params)
+        if not ok:
+            raise RuntimeError(f"cv2.imencode({ext}) failed")
+        return buf.tobytes()
+    return encode
+
+
+def encoders():
+    """nom -> frame(BGR) -> bytes. Avval client yo'llari, keyin sozlama variantlari."""
+    table = {}
+    if fc.CV2_AVAILABLE:
+        table["client-cv2"] = lambda f: fc._encode_image_sync_cv2(f, True, fc.WEBP_QUALITY)[0]
+    table["client-pil"] = lambda f: fc._encode_image_sync_pil(f, True, fc.WEBP_QUALITY)[0]
+    if fc.CV2_AVAILABLE:
+        cv2 = fc.cv2
+        for q in (60, 80, 90):
+            table[f"cv2-webp-q{q}"] = _cv2_encoder(".webp", [int(cv2.IMWRITE_WEBP_QUALITY), q])
+        for q in (60, 80, 90):
+            table[f"cv2-jpeg-q{q}"] = _cv2_encoder(".jpg", [int(cv2.IMWRITE_JPEG_QUALITY), q,
+                                                            int(cv2.IMWRITE_JPEG_OPTIMIZE), 1])
+    for m in (0, 4, 6):
+        table[f"pil-webp-m{m}-q80"] = _pil_encoder("WEBP", 80, method=m)
+    table["pil-webp-lossless"] = _pil_encoder("WEBP", 80, lossless=True, method=0)
+    for sub in (0, 2):   # 0 — 4:4:4 (rangli matn tiniq), 2 — 4:2:0
+        table[f"pil-jpeg-s{sub}-q80"] = _pil_encoder("JPEG", 80, optimize=True, subsampling=sub)
+    return table
+
+
+class FullStream:
+    """Har kadr to'liq rasm (client encode_image_sync); operator uni to'g'ridan-to'g'ri dekodlaydi."""
+
+    def encode(self, frame):
+        return [(0, 0, fc.encode_image_sync(frame, quality=fc.WEBP_QUALITY)[0])]
+
+    def decode(self, packet):
+        return decode(packet[0][2])
+
+
+class TileStream(FullStream):
+    """
+    Client'ning plitkali yo'li (encode_update kabi, davriy kalit kadrsiz): o'zgargan plitkalar
+    yoki to'liq kadr. Operator (decode_frame kabi) plitkalarni framebuffer ustiga qo'yadi.
+    Paket: [(x, y, rasm baytlari), ...]; ekran o'zgarmagan bo'lsa — bo'sh ro'yxat.
+    """
+
+    def __init__(self):
+        self.prev = None
+        self.framebuffer = None
+
+    def encode(self, frame):
+        prev, self.prev = self.prev, frame
+        if prev is not None and prev.shape == frame.shape:
+            rects, ratio = fc.changed_tile_rects(frame, prev, TILE_SIZE)
+            if ratio <= TILE_FULL_RATIO:
+                return [(x, y, fc.encode_image_sync(frame[y:y + h, x:x + w], quality=fc.WEBP_QUALITY)[0])
+                        for x, y, w, h in rects]
+        return super().encode(frame)
+
+    def decode(self, packet):
+        for x, y, data in packet:
+            tile = Image.open(io.BytesIO(data)).convert("RGB")
+            if self.framebuffer is None or tile.size == self.framebuffer.size:   # to'liq kadr
+                self.framebuffer = tile
+            else:
+                self.framebuffer.paste(tile, (x, y))
+        return np.asarray(self.framebuffer)[:, :, ::-1]
+
+
+class VideoStream:
+    """video_codec.VideoEncoder (client encode_video kabi: birinchi kadr kalit, keyin deltalar)."""
+
+    def __init__(self, codec: str):
+        self.encoder = vc.VideoEncoder(codec)
+        self.decoder = vc.av.CodecContext.create(codec, "r")
+        self.picture = None
+
+    def encode(self, frame):
+        data, _, _, _ = self.encoder.encode(frame, fc.WEBP_QUALITY, self.encoder.ctx is None)
+        return [(0, 0, data)] if data else []
+
+    def decode(self, packet):
+        # Operator VideoDecoder kabi: oxirgi dekodlangan kadr ko'rsatiladi
+        for _, _, data in packet:
+            frames = self.decoder.decode(vc.av.Packet(data))
+            if frames:
+                self.picture = frames[-1].to_ndarray(format="bgr24")
+        return self.picture
+
+
+def streams():
+    """nom -> yangi holatli oqim (encode(frame) -> paket, decode(paket) -> BGR kadr)."""
+    table = {"seq-full": FullStream, "seq-tiles": TileStream}
+    for codec in vc.VIDEO_CODECS:
+        if vc.encoder_available(codec):
+            table[f"seq-{codec}"] = lambda codec=codec: VideoStream(codec)
+    return table
+
+
+# ------------------ Sifat ------------------
+
+def psnr(a: np.ndarray, b: np.ndarray) -> float:
+    """dB; aynan bir xil tasvir (lossless) uchun 99 — JSON'da Infinity bo'lmasin."""
+    mse = np.mean((a.astype(np.float64) - b.astype(np.float64)) ** 2)
+    return 99.0 if mse == 0 else float(min(99.0, 10 * np.log10(255.0 ** 2 / mse)))
+
+
+def _box_mean(x: np.ndarray, k: int) -> np.ndarray:
+    """k x k oynadagi o'rtacha (integral tasvir orqali, 'valid' qism)."""
+    s = np.pad(x, ((1, 0), (1, 0))).cumsum(0).cumsum(1)
+    return (s[k:, k:] - s[:-k, k:] - s[k:, :-k] + s[:-k, :-k]) / (k * k)
+
+
+def ssim(a: np.ndarray, b: np.ndarray, k: int = 7) -> float:
+    """Kulrang tasvirlar uchun SSIM (Wang va boshq., 2004), bir xil k x k oyna bilan."""
+    weights = np.array([0.114, 0.587, 0.299])   # BGR -> Y
+    x = a.astype(np.float64) @ weights
+    y = b.astype(np.float64) @ weights
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mx, my = _box_mean(x, k), _box_mean(y, k)
+    vx = _box_mean(x * x, k) - mx * mx
+    vy = _box_mean(y * y, k) - my * my
+    cov = _box_mean(x * y, k) - mx * my
+    ssim_map = ((2 * mx * my + c1) * (2 * cov + c2)) / ((mx * mx + my * my + c1) * (vx + vy + c2))
+    return float(ssim_map.mean())
+
+
+def decode(data: bytes) -> np.ndarray:
+    """Operator yo'li: PIL Image.open + convert("RGB") (decode_frame kabi); natija BGR."""
+    return np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))[:, :, ::-1]
+
+
+# ------------------ O'lchash ------------------
+
+def bench_one(encode, frame: np.ndarray, repeat: int):
+    encode(frame)   # isitish
+    enc_times, dec_times = [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        data = encode(frame)
+        enc_times.append(time.perf_counter() - t0)
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        decoded = decode(data)
+        dec_times.append(time.perf_counter() - t0)
+    return {
+        "encode_ms": round(1000 * statistics.median(enc_times), 2),
+        "bytes": len(data),
+        "decode_ms": round(1000 * statistics.median(dec_times), 2),
+        "psnr": round(psnr(frame, decoded), 2),
+        "ssim": round(ssim(frame, decoded), 4),
+    }
+
+
+def bench_stream(make, frames, repeat: int):
+    """
+    Ketma-ketlikni repeat marta (har safar yangi holat bilan) kodlab-dekodlaydi.
+    Vaqtlar — kadr boshiga (takrorlar medianasi), hajm va sifat — kadrlar bo'yicha o'rtacha.
+    """
+    enc_runs, dec_runs = [], []
+    for _ in range(repeat):
+        stream = make()
+        enc_time = dec_time = 0.0
+        sizes, psnrs, ssims = [], [], []
+        for frame in frames:
+            t0 = time.perf_counter()
+            packet = stream.encode(frame)
+            t1 = time.perf_counter()
+            decoded = stream.decode(packet)
+            t2 = time.perf_counter()
+            enc_time += t1 - t0
+            dec_time += t2 - t1
+            sizes.append(sum(len(data) for _, _, data in packet))
+            if decoded is not None:
+                h, w = decoded.shape[:2]   # video juft o'lchamga kesiladi
+                psnrs.append(psnr(frame[:h, :w], decoded))
+                ssims.append(ssim(frame[:h, :w], decoded))
+        enc_runs.append(enc_time / len(frames))
+        dec_runs.append(dec_time / len(frames))
+    return {
+        "encode_ms": round(1000 * statistics.median(enc_runs), 2),
+        "bytes": round(statistics.mean(sizes)),
+        "decode_ms": round(1000 * statistics.median(dec_runs), 2),
+        "psnr": round(statistics.mean(psnrs), 2) if psnrs else 0.0,
+        "ssim": round(statistics.mean(ssims), 4) if ssims else 0.0,
+        "frames": len(frames),
+    }
+
+
+def summarize(results):
+    """Kodlovchi bo'yicha o'rtacha (barcha kadrlar)."""
+    summary = {}
+    for name in dict.fromkeys(r["encoder"] for r in results):
+        rows = [r for r in results if r["encoder"] == name]
+        summary[name] = {
+            "encode_ms": round(statistics.mean(r["encode_ms"] for r in rows), 2),
+            "kb": round(statistics.mean(r["bytes"] for r in rows) / 1024, 1),
+            "decode_ms": round(statistics.mean(r["decode_ms"] for r in rows), 2),
+            "psnr": round(statistics.mean(r["psnr"] for r in rows), 2),
+            "ssim": round(statistics.mean(r["ssim"] for r in rows), 4),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DeskWeb frame encoder benchmark")
+    parser.add_argument("--corpus", help="Kadrlar papkasi (toifa_NN.png); bo'lmasa sintetik kadrlar")
+    parser.add_argument("--record", help="Ekrandan shu papkaga korpus kadrlarini yozish va chiqish")
+    parser.add_argument("--frames", type=int, default=5, help="--record uchun kadrlar soni")
+    parser.add_argument("--width", type=int, default=fc.TARGET_WIDTH,
+                        help="Kodlashdan oldin shu kenglikkacha kichraytirish (0 — asl o'lcham)")
+    parser.add_argument("--repeat", type=int, default=5, help="Har bir o'lchov takrorlari (mediana)")
+    parser.add_argument("--encoders", nargs="+", help="Faqat shu kodlovchilar (nomlar jadvaldagidek)")
+    parser.add_argument("--seq", type=int, default=20, help="Oqim kodlovchilari uchun ketma-ketlik uzunligi")
+    parser.add_argument("--json", help="Natijani JSON faylga yozish")
+    args = parser.parse_args()
+
+    if args.record:
+        record_corpus(args.record, args.frames)
+        return
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+    else:
+        corpus = [(f"{c}-synthetic", c, synthetic_frame(c, seed=i)) for i, c in enumerate(CATEGORIES)]
+    if not corpus:
+        parser.error("korpusda rasm topilmadi")
+
+    table = encoders()
+    stream_table = streams()
+    if args.encoders:
+        known = {**table, **stream_table}
+        unknown = set(args.encoders) - set(known)
+        if unknown:
+            parser.error(f"noma'lum kodlovchi: {', '.join(sorted(unknown))}; mavjud: {', '.join(known)}")
+        table = {name: table[name] for name in args.encoders if name in table}
+        stream_table = {name: stream_table[name] for name in args.encoders if name in stream_table}
+
+    results = []
+    header = (f"{'frame':<20} {'encoder':<20} {'encode ms':>10} {'KB':>8} "
+              f"{'decode ms':>10} {'PSNR':>7} {'SSIM':>7}")
+    print(header)
+    print("-" * len(header))
+    for name, category, arr in corpus:
+        frame = downscale(arr, args.width)
+        runs = [(enc_name, lambda encode=encode: bench_one(encode, frame, args.repeat))
+                for enc_name, encode in table.items()]
+        if stream_table:
+            sequence = frame_sequence(frame, args.seq)
+            runs += [(enc_name, lambda make=make: bench_stream(make, sequence, args.repeat))
+                     for enc_name, make in stream_table.items()]
+        for enc_name, run in runs:
+            r = run()
+            r.update(frame=name, category=category, encoder=enc_name,
+                     size=f"{frame.shape[1]}x{frame.shape[0]}")
+            results.append(r)
+            print(f"{name[:20]:<20} {enc_name:<20} {r['encode_ms']:>10.2f} {r['bytes'] / 1024:>8.1f} "
+                  f"{r['decode_ms']:>10.2f} {r['psnr']:>7.2f} {r['ssim']:>7.4f}")
+
+    summary = summarize(results)
+    print()
+    print(f"{'encoder (mean)':<20} {'encode ms':>10} {'KB':>8} {'decode ms':>10} {'PSNR':>7} {'SSIM':>7}")
+    for enc_name, s in summary.items():
+        print(f"{enc_name:<20} {s['encode_ms']:>10.2f} {s['kb']:>8.1f} {s['decode_ms']:>10.2f} "
+              f"{s['psnr']:>7.2f} {s['ssim']:>7.4f}")
+
+    if args.json:
+        env = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "cv2": fc.cv2.__version__ if fc.CV2_AVAILABLE else None,
+            "av": vc.av.__version__ if vc.AV_AVAILABLE else None,
+            "pillow": Image.__version__,
+        }
+        with open(args.json, "w") as f:
+            json.dump({"env": env, "width": args.width, "repeat": args.repeat, "seq": args.seq,
+                       "summary": summary, "results": results}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,10 @@
+import multiprocessing
+
+if __name__ == "__main__":
+    # Kodlovchi jarayonlar puli uchun: PyInstaller exe'da ishchi jarayon shu yerda ishlab to'xtaydi —
+    # quyidagi og'ir importlar (pyautogui, tkinter, mss, av ...) ishchiga yuklanmaydi
+    multiprocessing.freeze_support()
+
 import asyncio
 import websockets
 import json
@@ -6,15 +13,28 @@ import mss
 import io
 import base64
 import ssl
+import struct
 import time
 import ctypes
+import ctypes.wintypes
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
 import threading
 import os
+import sys
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 
-from PIL import Image, ImageFilter
+from PIL import Image
+
+# Kichraytirish va rasm kodlash (ishchi jarayonlar faqat shu modulni import qiladi)
+from frame_codec import (TARGET_WIDTH, WEBP_QUALITY, CV2_AVAILABLE, FrameScaler, EncoderPool,
+                         encoder_workers, encode_image_sync, changed_tile_rects,
+                         _encode_image_sync_cv2, _encode_image_sync_pil)
+# Inter-frame video (PyAV ixtiyoriy)
+from video_codec import AV_AVAILABLE, VIDEO_CODECS, VideoEncoder, encoder_available
+from file_transfer import FileTransfers, MSG_FILE_CHUNK, FILE_SHARE, describe as describe_transfer
+from clipboard_sync import Clipboard, ClipboardSync, MSG_CLIPBOARD_CHUNK
 
 # --- Windows DPI Awareness (1:1 koordinata aniqligi uchun) ---
 try:
@@ -40,91 +60,532 @@ screen_width, screen_height = pyautogui.size()
 pyautogui.FAILSAFE = False
 pyautogui.PAUSE = 0
 
-# FPS va rasm sifat parametrlari
-FPS_TARGET      = 30
-FRAME_DELAY     = 1.0 / FPS_TARGET
-TARGET_WIDTH    = 1024    # 1152 ham mumkin; 1024 bilan FPS barqarorroq
-WEBP_QUALITY    = 80
-JPEG_QUALITY    = 80
-UNSHARP_ENABLED = False    # True qilsangiz matn biroz tiniqroq, lekin FPS pasayadi
-UNSHARP_RADIUS  = 0.6
-UNSHARP_PCT     = 90
-UNSHARP_TH      = 3
+# FPS va rasm sifat parametrlari (boshlang'ich qiymatlar — ish vaqtida AdaptiveController moslaydi)
+FPS_TARGET      = 30      # yuqori chegara
+FPS_MIN         = 3
+# Boshlang'ich o'lcham va sifat (TARGET_WIDTH, WEBP_QUALITY) hamda kichraytirish sozlamalari — frame_codec.py
+
+# Moslashuvchan sifat: "latency" — FPS saqlanadi, avval sifat/o'lcham pasayadi;
+# "sharpness" — tasvir tiniqligi saqlanadi, avval FPS pasayadi (SHARP_FPS_FLOOR gacha)
+ADAPT_POLICY    = os.environ.get("DESKWEB_ADAPT_POLICY", "latency")
+WIDTH_STEPS     = (1920, 1600, 1280, 1024, 896, 768, 640, 512)
+QUALITY_STEPS   = (90, 85, 80, 70, 60, 50, 40)
+SHARP_FPS_FLOOR = 8
+FPS_STEP_UP     = 1.25    # FPS pog'onasi (ko'tarishda ko'paytiriladi, pasaytirishda bo'linadi)
+UP_AFTER        = 3       # shuncha soniya tirbandliksiz o'tsa — bir pog'ona yuqoriga
+SEND_BUSY_HIGH  = 0.85    # uplink vaqtining shuncha ulushi yuborish bilan band — tirbandlik
+SEND_BUSY_LOW   = 0.5     # bundan kam bo'lsa — zaxira bor
+STATS_STALE     = 3.0     # shundan eski relay_stats/frame_stats hisobga olinmaydi (soniya)
+
+# Ekran o'zgarmasa kadr kodlanmaydi ham, yuborilmaydi ham; faqat shu oraliqda bir marta
+# to'liq kadr (keyin qo'shilgan ko'ruvchilar uchun). Uzoq jim turganda ekran siyrakroq tekshiriladi.
+KEEPALIVE_INTERVAL = 2.0
+IDLE_AFTER         = 1.0  # shuncha vaqt ekran o'zgarmasa va buyruq kelmasa — "jim" holat
+IDLE_POLL_FPS      = 10   # jim holatda ekranni tekshirish tezligi
+
+# Monitorlar (mss tartibi): 0 — barcha monitorlarni qamraydigan umumiy ko'rinish (overview),
+# 1..N — alohida monitorlar. Faqat operator tanlagan monitor olinadi va kodlanadi;
+# overview esa past tezlikda. Operator "select_monitor" bilan qayta ulanmasdan almashtiradi.
+DEFAULT_MONITOR = int(os.environ.get("DESKWEB_MONITOR", 1))
+OVERVIEW_FPS    = 2
+
+# Kattalashtirish (ROI): operator monitor ichidagi to'rtburchakni (0..1 koordinatalarda)
+# "set_roi" bilan so'raydi — faqat shu soha olinadi va kodlanadi. Piksel byudjeti butun
+# monitor oqimi bilan bir xil (AdaptiveController kengligi), shuning uchun kichik soha
+# asl o'lchamda (kichraytirilmasdan) ketadi va mayda matn o'qiladigan bo'ladi.
+ROI_MIN_PX      = 64      # sohaning eng kichik tomoni (asl piksellarda)
+
+# Binary kadr rejimi: operator "binary" imkoniyatini e'lon qilsa, kadrlar
+# base64/JSON o'rniga [sarlavha + xom rasm baytlari] ko'rinishida yuboriladi.
+# Sarlavha: kind(1) format(1) width(2) height(2) timestamp(8) — big-endian
+MSG_SCREEN      = 1
+FRAME_HEADER    = struct.Struct("!BBHHd")
+IMAGE_FORMATS   = ("webp", "jpeg")
+
+# Plitkali yangilanish (operator "tiles" imkoniyatini e'lon qilsa):
+# [FRAME_HEADER(kind=MSG_TILES) + soni(2) + har biri: x(2) y(2) w(2) h(2) uzunlik(4) + rasm]
+# Faqat oldingi kadrdan farq qilgan plitkalar yuboriladi; operator ularni o'zidagi
+# to'liq kadr ustiga qo'yadi. To'liq kadr (MSG_SCREEN) davriy ravishda yuboriladi.
+MSG_TILES         = 2
+TILE_COUNT        = struct.Struct("!H")
+TILE_HEADER       = struct.Struct("!HHHHI")
+TILES_ENABLED     = True
+TILE_SIZE         = 64     # kichraytirilgan kadrdagi plitka o'lchami (px)
+TILE_FULL_RATIO   = 0.5    # shundan ko'p plitka o'zgarsa, to'liq kadr arzonroq
+KEYFRAME_INTERVAL = 2.0    # to'liq kadrlar oralig'i (soniya): xatolar to'planib qolmasin
+
+# Yo'lakli to'liq kadr (operator "stripes" imkoniyatini e'lon qilsa): MSG_TILES bilan bir xil
+# tuzilma, lekin delta emas — yo'laklar butun kadrni qoplaydi va alohida kodlanadi.
+MSG_SCREEN_STRIPES = 5
+
+# Ko'p yadroli kodlash (DESKWEB_ENCODER_WORKERS): kadr yo'laklar/plitkalarga bo'linib,
+# jarayonlar pulida parallel kodlanadi — EncoderPool, frame_codec.py.
+
+# Video rejimi (PyAV o'rnatilgan va operator kodekni e'lon qilgan bo'lsa, masalan "h264"):
+# kadrlar mustaqil rasmlar emas, CPU'da kodlangan inter-frame video oqimi.
+# [FRAME_HEADER(kind, format=VIDEO_CODECS indeksi) + kodlangan paket]; MSG_VIDEO — kalit kadr
+# (mustaqil dekodlanadi), MSG_VIDEO_DELTA — oldingi kadrlarga bog'liq. Kalit kadr davriy
+# ravishda va operator yoki relay "keyframe_request" yuborganda chiqariladi.
+# Video qo'llanmasa — WebP/JPEG rasmlar (yuqoridagi rejimlar) ishlatiladi.
+# Kodek ro'yxati (VIDEO_CODECS) va VideoEncoder — video_codec.py.
+MSG_VIDEO               = 3
+MSG_VIDEO_DELTA         = 4
+VIDEO_CODEC             = os.environ.get("DESKWEB_VIDEO_CODEC", "h264")   # "off" — faqat rasmlar
+VIDEO_KEYFRAME_INTERVAL = float(os.environ.get("DESKWEB_VIDEO_KEYFRAME_INTERVAL", 10.0))
+
+# Kiruvchi buyruqlar bitta ishchi oqimda, kelgan tartibida bajariladi (har buyruqqa yangi
+# thread emas — mouse_down/mouse_up va harakatlar o'rni almashmaydi). Ishchi navbatni har
+# "tick"da to'liq oladi: ketma-ket mouse_move'lardan faqat oxirgisi qo'llanadi, tugmalar esa
+# o'sha tickda bir paketda ketma-ket bajariladi. Navbat chuqurligi va kechikish shu oraliqda chiqariladi.
+INPUT_STATS_INTERVAL = 5.0
+
+# Motion-to-photon o'lchovi: operator buyruqlari "seq" va "t" (operator soati) bilan keladi.
+# Oxirgi qo'llangan buyruq ta'siri tushgan birinchi kadrdan oldin "input_ack" yuboriladi:
+# seq, t va client bosqichlari (ms) — inject (navbat + pyautogui), wait (keyingi ekran
+# olishgacha), capture, encode. Shuncha vaqt ichida kadr chiqmasa (ekran o'zgarmadi) — o'lchanmaydi.
+INPUT_ACK_MAX_AGE = 1.0
+
+# Kursor kanali (operator "cursor" imkoniyatini e'lon qilsa): kursor kadr piksellarida emas,
+# alohida kichik xabarlarda yuboriladi — operator uni kanvas ustida o'zi chizadi, shuning uchun
+# kursor harakati video FPS'ga va kodlash kechikishiga bog'liq emas. mss kursorni kadrga
+# chizmaydi (Windows'da umuman, Linux'da with_cursor=False — standart), kursor kadrni "iflos" qilmaydi.
+#   {"type": "cursor", "x", "y" (oqimdagi monitor/soha ichida 0..1), "visible", "shape"}
+#   {"type": "cursor_shape", "id", "hotspot": [x, y], "data": base64 PNG} — har shakl bir marta
+# Shakl faqat Windows'da olinadi (GetCursorInfo + DrawIconEx); boshqa tizimlarda shape=None —
+# operator standart strelkani chizadi. Kursor xabarlari uchun bitta o'rin: yangisi eskisini almashtiradi.
+CURSOR_FPS = 60
+
+# Server "waiting" desa, operator tayyor bo'lishini shuncha soniya kutamiz
+OPERATOR_WAIT_TIMEOUT = 130
 
 # Kodlashni fon oqimida bajarish uchun pool
 executor = ThreadPoolExecutor(max_workers=2)
 
-# OpenCV (tez encoder) ixtiyoriy
+# Ekran olish + kichraytirish uchun alohida oqim: mss obyekti shu oqimda yaratiladi
+# va ishlatiladi, event loop esa kiruvchi buyruqlarni o'qishda bo'sh qoladi.
+capture_executor = ThreadPoolExecutor(max_workers=1)
+
 import numpy as np
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except Exception:
-    CV2_AVAILABLE = False
 
 
 # ------------------ Yordamchi funksiyalar ------------------
 
-def downscale_hq(img: Image.Image, target_width: int) -> Image.Image:
+class ScreenGrabber:
+    """Ekranni olish: capture_executor ichida yaratiladi va faqat shu oqimda ishlatiladi."""
+
+    def __init__(self, monitor: int = DEFAULT_MONITOR):
+        self.sct = mss.mss()
+        # Virtual ish stolidagi to'rtburchaklar (left, top, width, height); 0 — hammasi
+        self.monitors = [{k: m[k] for k in ("left", "top", "width", "height")}
+                         for m in self.sct.monitors]
+        self.prev_raw = None
+        self.scaler = FrameScaler()
+        self.select(monitor)
+
+    def select(self, index: int, roi=None):
+        """
+        Olinadigan monitorni (noto'g'ri indeks — 1-monitor, bo'lmasa hammasi) va uning ichidagi
+        sohani (roi = (x, y, w, h) 0..1 oralig'ida; None — butun monitor) almashtiradi.
+        """
+        self.requested = (index, None if roi is None else tuple(roi))
+        if not 0 <= index < len(self.monitors):
+            index = 1 if len(self.monitors) > 1 else 0
+        m = self.monitors[index]
+        self.index = index
+        self.roi = None
+        self.monitor = m
+        if roi is not None:
+            x, y, w, h = (min(1.0, max(0.0, float(v))) for v in roi)
+            width = min(m["width"], max(ROI_MIN_PX, int(w * m["width"])))
+            height = min(m["height"], max(ROI_MIN_PX, int(h * m["height"])))
+            left = min(m["width"] - width, int(x * m["width"]))
+            top = min(m["height"] - height, int(y * m["height"]))
+            self.monitor = {"left": m["left"] + left, "top": m["top"] + top,
+                            "width": width, "height": height}
+            # Chegaralarga moslangan soha (operator ko'rinishi aynan shu bo'lishi uchun)
+            self.roi = (left / m["width"], top / m["height"], width / m["width"], height / m["height"])
+        self.prev_raw = None
+
+    def grab(self, compare: bool = True, target_width: int = TARGET_WIDTH, monitor: int = None, roi=None):
+        """
+        Ekranni oladi va target_width gacha kichraytiradi. compare=True bo'lsa va xom bufer oldingisi bilan
+        bir xil bo'lsa (memcmp), kichraytirish o'tkazib yuboriladi va None qaytadi.
+        monitor/roi berilsa va joriysidan farq qilsa — avval shu monitor/sohaga o'tiladi.
+        target_width — butun monitor uchun; soha uchun kenglik shu piksel byudjetidan olinadi.
+        Qaytaradi: BGR np.ndarray (H, W, 3) | None
+        """
+        if monitor is not None and (monitor, roi) != self.requested:
+            self.select(monitor, roi)
+        if self.roi is not None:
+            m = self.monitors[self.index]
+            budget = target_width * target_width * m["height"] / m["width"]
+            area = self.monitor["width"] * self.monitor["height"]
+            target_width = max(1, int(self.monitor["width"] * min(1.0, (budget / area) ** 0.5)))
+        screenshot = self.sct.grab(self.monitor)
+        raw = screenshot.raw
+        unchanged = self.prev_raw is not None and raw == self.prev_raw
+        self.prev_raw = raw
+        if compare and unchanged:
+            return None
+        return self.scaler.scale(raw, *screenshot.size, target_width)
+
+    def close(self):
+        self.sct.close()
+
+
+def pack_rects(kind: int, width: int, height: int, rects, encoded) -> bytes:
+    """[FRAME_HEADER + soni + har biri: TILE_HEADER + rasm] (MSG_TILES / MSG_SCREEN_STRIPES)."""
+    parts = [b"", TILE_COUNT.pack(len(rects))]
+    img_fmt = "webp"
+    for (x, y, w, h), (img_bytes, img_fmt) in zip(rects, encoded):
+        parts.append(TILE_HEADER.pack(x, y, w, h, len(img_bytes)))
+        parts.append(img_bytes)
+    parts[0] = FRAME_HEADER.pack(kind, IMAGE_FORMATS.index(img_fmt), width, height, time.time())
+    return b"".join(parts)
+
+
+async def encode_image_async(frame: np.ndarray, prefer_webp: bool = True, quality: int = WEBP_QUALITY):
     """
-    Pasaytirishni yuqori sifat bilan bajaradi; xohlasa Unsharp qo'yadi.
+    Async-API: kodlashni thread poolga chiqaradi. OpenCV bo'lsa — undan foydalanadi.
     """
-    if img.width > target_width:
-        ratio = target_width / img.width
-        new_size = (target_width, max(1, int(img.height * ratio)))
-        img = img.resize(new_size, Image.Resampling.LANCZOS)
-        if UNSHARP_ENABLED:
-            img = img.filter(ImageFilter.UnsharpMask(radius=UNSHARP_RADIUS,
-                                                     percent=UNSHARP_PCT,
-                                                     threshold=UNSHARP_TH))
-    return img
-
-
-def _encode_image_sync_pil(pil_img: Image.Image, prefer_webp: bool = True):
+    loop = asyncio.get_running_loop()
+    if CV2_AVAILABLE:
+        return await loop.run_in_executor(executor, _encode_image_sync_cv2, frame, prefer_webp, quality)
+    return await loop.run_in_executor(executor, _encode_image_sync_pil, frame, prefer_webp, quality)
+
+
+def video_codec_for(peer_caps):
+    """Ikkala tomon qo'llaydigan video kodek (avval VIDEO_CODEC); bo'lmasa — None (rasmlar)."""
+    if not AV_AVAILABLE or VIDEO_CODEC == "off" or "binary" not in peer_caps:
+        return None
+    for codec in sorted(VIDEO_CODECS, key=lambda c: c != VIDEO_CODEC):
+        if codec in peer_caps and encoder_available(codec):
+            return codec
+    return None
+
+
+class InputInjector:
     """
-    Tez va barqaror PIL encoder (fallback).
-    Qaytaradi: (base64_str, "webp"|"jpeg")
+    Operator buyruqlarini bitta fon oqimida tartib bilan bajaradi (pyautogui chaqiruvlari).
+    Navbat — deque + Condition; ishchi har safar to'plangan barcha buyruqlarni oladi,
+    ketma-ket mouse_move'larni eng yangisiga qisqartiradi va qolganini ketma-ket bajaradi.
     """
-    buf = io.BytesIO()
-    if prefer_webp:
-        try:
-            pil_img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=6)
-            return base64.b64encode(buf.getvalue()).decode("ascii"), "webp"
-        except Exception:
-            buf = io.BytesIO()
-    # JPEG fallback (subsampling=2 -> 4:2:0 — tez va kichik)
-    pil_img.save(buf, format="JPEG", quality=JPEG_QUALITY,
-                 optimize=True, subsampling=2, progressive=False)
-    return base64.b64encode(buf.getvalue()).decode("ascii"), "jpeg"
+
+    def __init__(self, execute):
+        self.execute = execute
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.closed = False
+        # Oxirgi qo'llangan "seq"li buyruq: (seq, operator t, navbatga qo'yilgan, qo'llangan) — monotonic
+        self.applied = None
+        self._reset_stats()
+        self.stats_since = time.monotonic()
+        self.thread = threading.Thread(target=self._run, name="input-injector", daemon=True)
+        self.thread.start()
+
+    def _reset_stats(self):
+        self.executed = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def submit(self, data: dict):
+        """Event loop'dan chaqiriladi: bloklamaydi, faqat navbatga qo'yadi."""
+        with self.cond:
+            self.pending.append((time.monotonic(), data))
+            self.max_depth = max(self.max_depth, len(self.pending))
+            self.cond.notify()
+
+    def clear(self):
+        """Bajarilmagan buyruqlarni tashlaydi (uzilishda: eski bosishlar keyinroq qo'llanmasin)."""
+        with self.cond:
+            self.pending.clear()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.pending.clear()
+            self.cond.notify()
+        self.thread.join(timeout=1)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait(timeout=INPUT_STATS_INTERVAL)
+                    self._maybe_report()
+                if self.closed:
+                    return
+                batch = list(self.pending)
+                self.pending.clear()
+
+            for i, (queued_at, data) in enumerate(batch):
+                # Keyingisi ham mouse_move bo'lsa — bu oraliq nuqta, kursor baribir yangisiga boradi
+                if (data.get("type") == "mouse_move" and i + 1 < len(batch)
+                        and batch[i + 1][1].get("type") == "mouse_move"):
+                    self.coalesced += 1
+                    continue
+                self.execute(data)
+                applied_at = time.monotonic()
+                if "seq" in data:
+                    self.applied = (data["seq"], data.get("t"), queued_at, applied_at)
+                latency = applied_at - queued_at
+                self.executed += 1
+                self.latency_sum += latency
+                self.latency_max = max(self.latency_max, latency)
+            self._maybe_report()
+
+    def _maybe_report(self):
+        now = time.monotonic()
+        if now - self.stats_since < INPUT_STATS_INTERVAL:
+            return
+        if self.executed:
+            print(f"[Client] Input: {self.executed} cmds, {self.coalesced} moves coalesced, "
+                  f"queue max {self.max_depth}, latency avg {1000 * self.latency_sum / self.executed:.1f} ms, "
+                  f"max {1000 * self.latency_max:.1f} ms")
+        self._reset_stats()
+        self.stats_since = now
+
+
+class _CURSORINFO(ctypes.Structure):
+    _fields_ = [("cbSize", ctypes.wintypes.DWORD), ("flags", ctypes.wintypes.DWORD),
+                ("hCursor", ctypes.c_void_p), ("ptScreenPos", ctypes.wintypes.POINT)]
+
+
+class _ICONINFO(ctypes.Structure):
+    _fields_ = [("fIcon", ctypes.wintypes.BOOL), ("xHotspot", ctypes.wintypes.DWORD),
+                ("yHotspot", ctypes.wintypes.DWORD), ("hbmMask", ctypes.c_void_p),
+                ("hbmColor", ctypes.c_void_p)]
 
 
-def _encode_image_sync_cv2(pil_img: Image.Image, prefer_webp: bool = True):
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [("biSize", ctypes.wintypes.DWORD), ("biWidth", ctypes.wintypes.LONG),
+                ("biHeight", ctypes.wintypes.LONG), ("biPlanes", ctypes.wintypes.WORD),
+                ("biBitCount", ctypes.wintypes.WORD), ("biCompression", ctypes.wintypes.DWORD),
+                ("biSizeImage", ctypes.wintypes.DWORD), ("biXPelsPerMeter", ctypes.wintypes.LONG),
+                ("biYPelsPerMeter", ctypes.wintypes.LONG), ("biClrUsed", ctypes.wintypes.DWORD),
+                ("biClrImportant", ctypes.wintypes.DWORD)]
+
+
+class CursorTracker:
     """
-    OpenCV encoder — odatda PIL’dan ancha tez.
-    Qaytaradi: (base64_str, "webp"|"jpeg")
+    Kursor holati: poll() -> (x, y, visible, shape_id) virtual ish stoli piksellarida.
+    Windows'da GetCursorInfo (shape_id — HCURSOR qiymati), aks holda pyautogui.position().
+    shape(shape_id) -> (PNG baytlari, hotspot) — kursorni qora va oq fonga chizib alfa tiklanadi
+    (XOR niqobli monoxrom kursorlar ham ko'rinadi).
     """
-    arr = np.array(pil_img)[:, :, ::-1]  # RGB -> BGR
-    if prefer_webp:
-        ok, buf = cv2.imencode('.webp', arr, [int(cv2.IMWRITE_WEBP_QUALITY), WEBP_QUALITY])
-        if ok:
-            return base64.b64encode(buf.tobytes()).decode('ascii'), 'webp'
-    # JPEG fallback
-    ok, buf = cv2.imencode('.jpg', arr, [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY,
-                                         int(cv2.IMWRITE_JPEG_OPTIMIZE), 1])
-    if ok:
-        return base64.b64encode(buf.tobytes()).decode('ascii'), 'jpeg'
-    # Favqulodda fallback: PIL
-    return _encode_image_sync_pil(pil_img, prefer_webp=False)
-
-
-async def encode_image_async(pil_img: Image.Image, prefer_webp: bool = True):
+
+    def __init__(self):
+        try:
+            self.user32, self.gdi32 = ctypes.windll.user32, ctypes.windll.gdi32
+        except AttributeError:
+            self.user32 = self.gdi32 = None
+            return
+        u, g = self.user32, self.gdi32
+        vp = ctypes.c_void_p
+        u.GetCursorInfo.argtypes = [ctypes.POINTER(_CURSORINFO)]
+        u.GetIconInfo.argtypes = [vp, ctypes.POINTER(_ICONINFO)]
+        u.GetDC.argtypes, u.GetDC.restype = [vp], vp
+        u.ReleaseDC.argtypes = [vp, vp]
+        u.DrawIconEx.argtypes = [vp, ctypes.c_int, ctypes.c_int, vp, ctypes.c_int, ctypes.c_int,
+                                 ctypes.c_uint, vp, ctypes.c_uint]
+        g.CreateCompatibleDC.argtypes, g.CreateCompatibleDC.restype = [vp], vp
+        g.CreateDIBSection.argtypes = [vp, ctypes.POINTER(_BITMAPINFOHEADER), ctypes.c_uint,
+                                       ctypes.POINTER(vp), vp, ctypes.wintypes.DWORD]
+        g.CreateDIBSection.restype = vp
+        g.SelectObject.argtypes, g.SelectObject.restype = [vp, vp], vp
+        g.DeleteObject.argtypes = [vp]
+        g.DeleteDC.argtypes = [vp]
+
+    def poll(self):
+        if self.user32 is not None:
+            info = _CURSORINFO(cbSize=ctypes.sizeof(_CURSORINFO))
+            if self.user32.GetCursorInfo(ctypes.byref(info)):
+                return (info.ptScreenPos.x, info.ptScreenPos.y, bool(info.flags & 1),  # CURSOR_SHOWING
+                        info.hCursor or None)
+        x, y = pyautogui.position()
+        return x, y, True, None
+
+    def shape(self, shape_id):
+        """Kursor shaklini PNG (RGBA) ko'rinishida qaytaradi; olinmasa None."""
+        if self.user32 is None or shape_id is None:
+            return None
+        u, g = self.user32, self.gdi32
+        info = _ICONINFO()
+        if not u.GetIconInfo(shape_id, ctypes.byref(info)):
+            return None
+        screen_dc = u.GetDC(None)
+        dc = g.CreateCompatibleDC(screen_dc)
+        size = max(32, u.GetSystemMetrics(13))   # SM_CXCURSOR
+        header = _BITMAPINFOHEADER(biSize=ctypes.sizeof(_BITMAPINFOHEADER), biWidth=size,
+                                   biHeight=-size, biPlanes=1, biBitCount=32)
+        bits = ctypes.c_void_p()
+        bitmap = g.CreateDIBSection(dc, ctypes.byref(header), 0, ctypes.byref(bits), None, 0)
+        try:
+            if not bitmap:
+                return None
+            old = g.SelectObject(dc, bitmap)
+            planes = []
+            for background in (0, 255):
+                ctypes.memset(bits, background, size * size * 4)
+                u.DrawIconEx(dc, 0, 0, shape_id, size, size, 0, None, 3)   # DI_NORMAL
+                g.GdiFlush()
+                raw = ctypes.string_at(bits, size * size * 4)
+                planes.append(np.frombuffer(raw, np.uint8).reshape(size, size, 4)[:, :, :3].astype(np.int32))
+            g.SelectObject(dc, old)
+        finally:
+            if bitmap:
+                g.DeleteObject(bitmap)
+            g.DeleteDC(dc)
+            u.ReleaseDC(None, screen_dc)
+            for handle in (info.hbmMask, info.hbmColor):
+                if handle:
+                    g.DeleteObject(handle)
+        black, white = planes
+        alpha = np.clip(255 - (white - black).max(axis=2), 0, 255)
+        color = np.clip(black * 255 // np.maximum(alpha, 1)[:, :, None], 0, 255)
+        rgba = np.dstack([color[:, :, ::-1], alpha]).astype(np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(rgba, "RGBA").save(buf, format="PNG")
+        return buf.getvalue(), (int(info.xHotspot), int(info.yHotspot))
+
+
+class AdaptiveController:
     """
-    Async-API: kodlashni thread poolga chiqaradi. OpenCV bo'lsa — undan foydalanadi.
+    Ish vaqtida kadr tezligi, o'lcham (kenglik) va sifatni tanlaydi.
+
+    O'lchovlar (har soniyada update()): kodlash vaqti va kadr hajmi (observe_encode),
+    uplink band bo'lgan vaqt ulushi — ws.send drain vaqti (observe_send), client'ning
+    o'zida almashtirilgan kadrlar va relay/operator qayta aloqasi (report_sink).
+    Tirbandlikda bir pog'ona pasayadi; UP_AFTER soniya tinch o'tsa — bir pog'ona ko'tariladi.
+    Qaysi parametr birinchi o'zgarishini ADAPT_POLICY belgilaydi.
     """
-    loop = asyncio.get_running_loop()
-    if CV2_AVAILABLE:
-        return await loop.run_in_executor(executor, _encode_image_sync_cv2, pil_img, prefer_webp)
-    return await loop.run_in_executor(executor, _encode_image_sync_pil, pil_img, prefer_webp)
+
+    def __init__(self, policy: str = ADAPT_POLICY):
+        self.policy = policy if policy in ("latency", "sharpness") else "latency"
+        # Yuqori chegara — TARGET_WIDTH; ekrandan keng pog'onalar ma'nosiz (kattalashtirilmaydi)
+        screen_top = next((i for i, w in enumerate(WIDTH_STEPS) if w <= screen_width),
+                          len(WIDTH_STEPS) - 1)
+        self.width_top = max(screen_top, self._nearest(WIDTH_STEPS, TARGET_WIDTH))
+        self.width_idx = self.width_top
+        self.quality_idx = self._nearest(QUALITY_STEPS, WEBP_QUALITY)
+        self.fps = float(FPS_TARGET)
+        self.sink_limits = {}   # manba -> (monotonic vaqt, fps yoki None — cheklov yo'q)
+        self.calm = 0
+        self.frames = 0
+        self.encode_seconds = 0.0
+        self.frame_bytes = 0
+        self.send_seconds = 0.0
+
+    @staticmethod
+    def _nearest(steps, value):
+        return min(range(len(steps)), key=lambda i: abs(steps[i] - value))
+
+    @property
+    def width(self) -> int:
+        return WIDTH_STEPS[self.width_idx]
+
+    @property
+    def quality(self) -> int:
+        return QUALITY_STEPS[self.quality_idx]
+
+    def observe_encode(self, seconds: float, size: int):
+        self.frames += 1
+        self.encode_seconds += seconds
+        self.frame_bytes += size
+
+    def observe_send(self, seconds: float):
+        self.send_seconds += seconds
+
+    def report_sink(self, source: str, interval: float, shown: int, dropped: int):
+        """relay_stats/frame_stats: qabul qiluvchi kadr tashlagan bo'lsa — u ko'rsatgan tezlik chegara."""
+        limit = shown / max(interval, 1e-3) if dropped > 0 else None
+        self.sink_limits[source] = (time.monotonic(), limit)
+
+    def update(self, elapsed: float, sent: int, replaced: int):
+        """Oxirgi oraliq o'lchovlari bo'yicha keyingi soniya uchun FPS/o'lcham/sifatni tanlaydi."""
+        frames, encode_s = self.frames, self.encode_seconds / max(1, self.frames)
+        send_busy = self.send_seconds / max(elapsed, 1e-3)
+        self.frames, self.encode_seconds, self.frame_bytes, self.send_seconds = 0, 0.0, 0, 0.0
+
+        now = time.monotonic()
+        limits = [limit for t, limit in self.sink_limits.values()
+                  if limit is not None and now - t < STATS_STALE]
+
+        if limits and min(limits) < self.fps:
+            # Qabul qiluvchi ko'rsata olganidan tez yuborishning foydasi yo'q
+            self.fps = max(FPS_MIN, min(limits))
+            self.calm = 0
+        elif replaced > 0 or send_busy > SEND_BUSY_HIGH:
+            self._step_down()            # uplink ulgurmayapti
+            self.calm = 0
+        elif frames and encode_s > 1.0 / self.fps:
+            self._step_down_cpu(encode_s)  # kodlovchi kadr muddatiga ulgurmayapti
+            self.calm = 0
+        elif frames and not limits and send_busy < SEND_BUSY_LOW and encode_s < 0.6 / self.fps:
+            self.calm += 1
+            if self.calm >= UP_AFTER:
+                self._step_up()
+                self.calm = 0
+
+    def _lower_fps(self, floor: float) -> bool:
+        if self.fps <= floor:
+            return False
+        self.fps = max(floor, self.fps / FPS_STEP_UP)
+        return True
+
+    def _lower_quality(self) -> bool:
+        if self.quality_idx + 1 >= len(QUALITY_STEPS):
+            return False
+        self.quality_idx += 1
+        return True
+
+    def _lower_width(self) -> bool:
+        if self.width_idx + 1 >= len(WIDTH_STEPS):
+            return False
+        self.width_idx += 1
+        return True
+
+    def _step_down(self):
+        if self.policy == "sharpness":
+            steps = (lambda: self._lower_fps(SHARP_FPS_FLOOR), self._lower_quality,
+                     self._lower_width, lambda: self._lower_fps(FPS_MIN))
+        else:
+            steps = (self._lower_quality, self._lower_width, lambda: self._lower_fps(FPS_MIN))
+        any(step() for step in steps)
+
+    def _step_down_cpu(self, encode_s: float):
+        # Kodlash vaqti asosan piksellar soniga bog'liq: latency — o'lchamni kichraytiradi,
+        # sharpness — FPS'ni kodlovchi ulguradigan darajaga tushiradi
+        if self.policy == "latency" and self._lower_width():
+            return
+        self.fps = max(FPS_MIN, min(self.fps, 0.9 / encode_s))
+
+    def _raise_fps(self) -> bool:
+        if self.fps >= FPS_TARGET:
+            return False
+        self.fps = min(FPS_TARGET, self.fps * FPS_STEP_UP + 1)
+        return True
+
+    def _raise_quality(self) -> bool:
+        if self.quality_idx == 0:
+            return False
+        self.quality_idx -= 1
+        return True
+
+    def _raise_width(self) -> bool:
+        if self.width_idx <= self.width_top:
+            return False
+        self.width_idx -= 1
+        return True
+
+    def _step_up(self):
+        if self.policy == "sharpness":
+            steps = (self._raise_width, self._raise_quality, self._raise_fps)
+        else:
+            steps = (self._raise_fps, self._raise_width, self._raise_quality)
+        any(step() for step in steps)
 
 
 # ------------------ Asosiy Client logikasi ------------------
@@ -137,12 +598,85 @@ class ClientApp:
         self.loop = None
         self.send_task = None
         self.recv_task = None
+        self.peer_caps = set()   # operator e'lon qilgan imkoniyatlar ("binary", ...)
+
+        # Chiquvchi navbat: boshqaruv xabarlari hech qachon tashlanmaydi va kadrdan
+        # oldin yuboriladi; kadr uchun esa bitta joy — yangisi yuborilmagan eskisini almashtiradi.
+        self.control_out = deque()
+        self.cursor_out = None   # kursor kanali: faqat eng yangi holat
+        self.frame_out = None
+        # Fayl bo'laklari: tashlanmaydi, kadr kutayotganda FILE_SHARE ulushida yuboriladi
+        self.bulk_out = deque()
+        self.bulk_credit = 0.0
+        self.out_wakeup = None
+        self.out_task = None
+        self.replaced_frames = 0
+        self.sent_frames = 0
+
+        # Plitkali rejim holati: oxirgi yuborilgan kadr (taqqoslash uchun) va to'liq kadr vaqti
+        self.tile_prev = None
+        self.last_keyframe = 0.0
+        self.force_keyframe = True
+
+        # Video rejimi: operator kodekni e'lon qilsa yaratiladi (aks holda None — rasmlar)
+        self.video = None
+
+        # Fayl uzatish (ikki tomonga); on_event GUI tomonidan o'rnatiladi
+        self.files = FileTransfers(self.send_control, self.send_bulk)
+        # Clipboard sinxronizatsiyasi: operator tarkibi input navbati orqali o'rnatiladi (keyingi
+        # Ctrl+V'dan oldin); o'z clipboard'i faqat o'zgarganda yuboriladi. Tkinter oynasini GUI beradi.
+        self.clipboard = ClipboardSync(
+            Clipboard(), self.send_control, self.send_bulk,
+            apply=lambda kind, payload: self.input.submit(
+                {'type': 'clipboard_set', 'kind': kind, 'payload': payload}),
+            on_paste=lambda data: self.input.submit(data),
+            send_initial=False)
+
+        # Kursor kanali: oxirgi yuborilgan holat va operatorga yuborilgan shakllar (id)
+        self.cursor_sent = None
+        self.cursor_shapes = set()
+
+        # Ko'p yadroli kodlash (OpenCV yo'q bo'lganda): jarayonlar puli, kerak bo'lmasa None
+        workers = encoder_workers()
+        self.encoder_pool = EncoderPool(workers) if workers else None
+
+        # Oxirgi buyruq vaqti (monotonic): jim holatdan darhol chiqish uchun
+        self.last_command = 0.0
+        # Buyruqlarni tartib bilan bajaruvchi yagona ishchi oqim
+        self.input = InputInjector(self.execute_command)
+        self.acked_seq = None    # oxirgi input_ack yuborilgan buyruq (motion-to-photon)
+
+        # Monitorlar: ro'yxat ScreenGrabber'dan; monitor_index — operator tanlagani,
+        # stream_monitor — hozir oqimda ketayotgani (kiruvchi koordinatalar shunga moslanadi)
+        self.monitors = []
+        self.monitor_index = DEFAULT_MONITOR
+        self.stream_monitor = None
+        # Kattalashtirilgan soha (monitor ichida, 0..1): roi — so'ralgani, stream_roi — oqimdagi
+        self.roi = None
+        self.stream_roi = None
+        self.last_packet = 0.0   # oxirgi kadr navbatga qo'yilgan vaqt (keepalive uchun)
+
+        # FPS, o'lcham va sifatni ish vaqtida tanlovchi (har ulanishda qaytadan)
+        self.controller = AdaptiveController()
         self.SERVER_URL_BASE = "wss://deskweb.duckdns.org"
 
     async def connect(self, room: str):
         self.room = room
         uri = f"{self.SERVER_URL_BASE}/ws/{room}/client"
         self.running = True
+        self.peer_caps = set()
+        self.control_out.clear()
+        self.cursor_out = None
+        self.frame_out = None
+        self.bulk_out.clear()
+        self.bulk_credit = 0.0
+        self.out_wakeup = asyncio.Event()
+        self.controller = AdaptiveController()
+        self.video = None
+        self.tile_prev = None
+        self.force_keyframe = True
+        self.input.applied = self.acked_seq = None
+        self.clipboard.reset()
 
         try:
             self.ws = await websockets.connect(
@@ -164,25 +698,47 @@ class ClientApp:
                 "room": self.room
             }))
 
-            # (ixtiyoriy) serverdan tasdiq kutish
-            try:
-                ack_raw = await asyncio.wait_for(self.ws.recv(), timeout=5)
+            # (ixtiyoriy) serverdan tasdiq kutish. Operator hali tayyor bo'lmasa server
+            # avval "waiting" yuboradi va operator tayyor bo'lishi bilan "connected" keladi.
+            ack_timeout = 5
+            while True:
+                try:
+                    ack_raw = await asyncio.wait_for(self.ws.recv(), timeout=ack_timeout)
+                except asyncio.TimeoutError:
+                    break  # server ack yubormasa ham davom etamiz
                 try:
                     ack = json.loads(ack_raw)
                     print(f"[Client] Server says: {ack}")
                 except json.JSONDecodeError:
                     print("[Client] Non-JSON ACK:", ack_raw)
-            except asyncio.TimeoutError:
-                pass  # server ack yubormasa ham davom etamiz
+                    break
+                if ack.get("type") == "waiting":
+                    ack_timeout = OPERATOR_WAIT_TIMEOUT
+                    continue
+                if ack.get("type") == "error":
+                    raise ConnectionError(ack.get("message", "Server rejected connection"))
+                break
 
             # Parallel ravishda ekran yuborish va buyruqlarni olish
+            self.out_task = asyncio.create_task(self._sender())
             self.send_task = asyncio.create_task(self.send_screen())
             self.recv_task = asyncio.create_task(self.receive_commands())
-            await asyncio.gather(self.send_task, self.recv_task)
+            cursor_task = asyncio.create_task(self.send_cursor())
+            clipboard_task = asyncio.create_task(self.clipboard.run())
+            try:
+                await asyncio.gather(self.send_task, self.recv_task)
+            finally:
+                cursor_task.cancel()
+                clipboard_task.cancel()
 
         except Exception as e:
             print(f"[Client] Connection error: {e}")
         finally:
+            self.running = False
+            self.files.pause()
+            if self.out_task:
+                self.out_wakeup.set()
+                self.out_task.cancel()
             try:
                 if self.ws and not self.ws.closed:
                     await self.ws.close()
@@ -190,7 +746,6 @@ class ClientApp:
                 pass
 
             self.ws = None
-            self.running = False
             print("[Client] Connection closed.")
 
     async def _close_ws(self):
@@ -201,72 +756,391 @@ class ClientApp:
             pass
         self.ws = None
 
-    async def send_screen(self):
+    def send_control(self, data):
+        """Boshqaruv/holat xabarini navbatga qo'yadi — keyingi kadrdan oldin ketadi."""
+        if not self.running:
+            return
+        self.control_out.append(data)
+        self.out_wakeup.set()
+
+    def send_bulk(self, data: bytes):
+        """Fayl bo'lagini navbatga qo'yadi (hajmini uzatish oynasi cheklaydi)."""
+        if not self.running:
+            return
+        self.bulk_out.append(data)
+        self.out_wakeup.set()
+
+    def send_monitors(self):
+        """Monitorlar ro'yxati va oqimdagi monitor (overview — 0) operator/ko'ruvchilarga."""
+        if not self.monitors:
+            return
+        self.send_control(json.dumps({
+            "type": "monitors",
+            "monitors": [dict(m, index=i) for i, m in enumerate(self.monitors)],
+            "active": self.stream_monitor,
+            "roi": list(self.stream_roi) if self.stream_roi else None,
+        }))
+
+    def screen_point(self, data: dict):
         """
-        Ekran tasvirini WebSocket orqali uzatish (OpenCV/PIL encoder + threadpool + FPS control).
+        Normallangan (0..1) koordinatani operator ko'rgan monitorning virtual ish stolidagi
+        nuqtasiga o'tkazadi (data["monitor"] — operator ko'rgan oqim; bo'lmasa joriy oqim).
+        Kattalashtirilgan sohadagi nuqtani operator o'zi monitor koordinatasiga o'tkazib yuboradi.
         """
-        sct = mss.mss()
-        last_fps_time = time.time()
-        frame_count = 0
+        index = data.get('monitor', self.stream_monitor)
+        monitors = self.monitors
+        if isinstance(index, int) and 0 <= index < len(monitors):
+            m = monitors[index]
+            x = m['left'] + min(m['width'] - 1, int(data['x'] * m['width']))
+            y = m['top'] + min(m['height'] - 1, int(data['y'] * m['height']))
+            return x, y
+        return int(data['x'] * screen_width), int(data['y'] * screen_height)
+
+    def input_ack(self, captured):
+        """
+        Shu kadr ta'sirini ko'rsatadigan oxirgi buyruq uchun input_ack (yoki None): buyruq
+        ekran olish boshlanishidan oldin qo'llangan va hali tasdiqlanmagan bo'lishi kerak.
+        """
+        applied = self.input.applied
+        if applied is None or applied[0] == self.acked_seq:
+            return None
+        seq, t, queued_at, applied_at = applied
+        capture_start, capture_end = captured
+        if applied_at > capture_start:
+            return None   # keyingi kadrda ko'rinadi
+        if capture_start - applied_at > INPUT_ACK_MAX_AGE:
+            self.acked_seq = seq   # ekranda ko'rinadigan ta'siri bo'lmagan
+            return None
+        now = time.monotonic()
+        return {
+            "type": "input_ack",
+            "seq": seq,
+            "t": t,
+            "inject_ms": round(1000 * (applied_at - queued_at), 2),
+            "wait_ms": round(1000 * (capture_start - applied_at), 2),
+            "capture_ms": round(1000 * (capture_end - capture_start), 2),
+            "encode_ms": round(1000 * (now - capture_end), 2),
+        }
+
+    def queue_frame(self, packet, delta: bool = False):
+        """
+        Kadrni yuborishga qo'yadi; oldingisi hali ketmagan bo'lsa, u almashtiriladi.
+        Delta (plitkalar) esa ketmagan kadrni almashtira olmaydi — u tashlanadi va
+        keyingi kadr to'liq yuboriladi.
+        """
+        if self.frame_out is not None:
+            self.replaced_frames += 1
+            if delta:
+                self.force_keyframe = True
+                return
+        self.frame_out = packet
+        self.out_wakeup.set()
+
+    def encode_update(self, arr: np.ndarray, quality: int = WEBP_QUALITY):
+        """
+        Plitkali rejim (fon oqimida): o'zgargan plitkalarni yoki to'liq kadrni kodlaydi.
+        arr — ScreenGrabber bergan BGR kadr (halqa buferi: faqat o'qiladi, saqlanadi).
+        Qaytaradi: (paket, delta) yoki ekran o'zgarmagan bo'lsa (None, False).
+        """
+        height, width = arr.shape[:2]
+        now = time.monotonic()
+        prev = self.tile_prev
+        keyframe = (self.force_keyframe or prev is None or prev.shape != arr.shape
+                    or now - self.last_keyframe >= KEYFRAME_INTERVAL)
+        if not keyframe:
+            rects, ratio = changed_tile_rects(arr, prev, TILE_SIZE)
+            if not rects:
+                # prev halqa slotida turadi: tile_prev eng yangi slotni ko'rsatmasa, halqa aylanib
+                # uning ustiga yozadi va keyingi o'zgarish (arr is prev) sezilmay qoladi
+                self.tile_prev = arr
+                return None, False
+            keyframe = ratio > TILE_FULL_RATIO
+        self.tile_prev = arr
+
+        if keyframe:
+            self.force_keyframe = False
+            self.last_keyframe = now
+            if self.encoder_pool is not None and "stripes" in self.peer_caps:
+                # Ko'p yadroda: to'liq kadr yo'laklarga bo'linib parallel kodlanadi
+                rects = self.encoder_pool.stripes(height, width)
+                return pack_rects(MSG_SCREEN_STRIPES, width, height, rects,
+                                  self.encode_rects(arr, rects, quality)), False
+            img_bytes, img_fmt = encode_image_sync(arr, quality=quality)
+            return FRAME_HEADER.pack(MSG_SCREEN, IMAGE_FORMATS.index(img_fmt),
+                                     width, height, time.time()) + img_bytes, False
+
+        return pack_rects(MSG_TILES, width, height, rects, self.encode_rects(arr, rects, quality)), True
+
+    def encode_rects(self, arr: np.ndarray, rects, quality: int):
+        """To'rtburchaklarni kodlaydi: jarayonlar pulida (bo'lsa) yoki shu oqimda ketma-ket."""
+        if self.encoder_pool is not None and len(rects) > 1:
+            try:
+                return self.encoder_pool.encode_rects(arr, rects, quality)
+            except Exception as e:
+                # Ishchi jarayon yiqilgan (BrokenProcessPool va h.k.) — bitta oqimga qaytamiz
+                print(f"[Client] Encoder pool disabled: {e}")
+                pool, self.encoder_pool = self.encoder_pool, None
+                pool.close()
+        return [encode_image_sync(arr[y:y + h, x:x + w], quality=quality) for x, y, w, h in rects]
 
-        # Monitor tanlash (1-chi monitor odatda butun ish stoli)
+    def encode_video(self, arr: np.ndarray, quality: int = WEBP_QUALITY):
+        """
+        Video rejimi (fon oqimida): kadrni inter-frame oqimga kodlaydi. Kalit kadr davriy,
+        keyframe_request kelganda yoki oldingi delta yuborilmay tashlanganda chiqariladi.
+        Qaytaradi: (paket, delta) yoki kodlovchi paket bermagan bo'lsa (None, False).
+        """
+        video = self.video
+        now = time.monotonic()
+        keyframe = self.force_keyframe or now - self.last_keyframe >= VIDEO_KEYFRAME_INTERVAL
+        self.force_keyframe = False
+        data, key, width, height = video.encode(arr, quality, keyframe)
+        if data is None:
+            return None, False
+        if key:
+            self.last_keyframe = now
+        return FRAME_HEADER.pack(MSG_VIDEO if key else MSG_VIDEO_DELTA,
+                                 VIDEO_CODECS.index(video.codec),
+                                 width, height, time.time()) + data, not key
+
+    async def _sender(self):
+        """
+        Yagona yozuvchi: avval boshqaruv navbatini bo'shatadi, keyin eng yangi kadrni yuboradi.
+        Shu sababli kadrlar boshqaruv xabarlarini hech qachon ortda qoldirmaydi.
+        """
         try:
-            monitor = sct.monitors[1]
-        except Exception:
-            monitor = sct.monitors[0]
+            while self.running and self.ws:
+                await self.out_wakeup.wait()
+                self.out_wakeup.clear()
+                while self.control_out or self.cursor_out or self.frame_out is not None or self.bulk_out:
+                    if self.control_out:
+                        await self.ws.send(self.control_out.popleft())
+                    elif self.cursor_out:
+                        message, self.cursor_out = self.cursor_out, None
+                        await self.ws.send(message)
+                    elif self.frame_out is not None and (not self.bulk_out or self.bulk_credit <= 0):
+                        packet, self.frame_out = self.frame_out, None
+                        t0 = time.perf_counter()
+                        await self.ws.send(packet)
+                        elapsed = time.perf_counter() - t0
+                        self.controller.observe_send(elapsed)
+                        self.sent_frames += 1
+                        # Kadr kutayotganda fayl bo'laklariga yuborish vaqtining FILE_SHARE ulushi
+                        share = min(FILE_SHARE, 0.95)
+                        self.bulk_credit = min(0.25, self.bulk_credit + elapsed * share / (1 - share))
+                    else:
+                        contended = self.frame_out is not None
+                        t0 = time.perf_counter()
+                        await self.ws.send(self.bulk_out.popleft())
+                        if contended:
+                            self.bulk_credit -= time.perf_counter() - t0
+        except asyncio.CancelledError:
+            pass
+        except websockets.exceptions.ConnectionClosed:
+            print("[Client] WS closed while sending.")
+        except Exception as e:
+            print(f"[Client] Send error: {e}")
+        finally:
+            self.running = False
 
+    def cursor_message(self, tracker: CursorTracker):
+        """Kursor holati oqimdagi monitor/soha koordinatalarida (0..1); chetda bo'lsa — ko'rinmas."""
+        x, y, visible, shape = tracker.poll()
+        index, monitors = self.stream_monitor, self.monitors
+        if not isinstance(index, int) or not 0 <= index < len(monitors):
+            return None
+        m = monitors[index]
+        xn = (x - m['left']) / m['width']
+        yn = (y - m['top']) / m['height']
+        if self.stream_roi:
+            rx, ry, rw, rh = self.stream_roi
+            xn, yn = (xn - rx) / rw, (yn - ry) / rh
+        visible = visible and 0 <= xn < 1 and 0 <= yn < 1
+        if not visible:
+            return {"type": "cursor", "visible": False}
+        return {"type": "cursor", "x": round(xn, 4), "y": round(yn, 4), "visible": True, "shape": shape}
+
+    async def send_cursor(self):
+        """
+        Kursor kanali: CURSOR_FPS tezlikda kursorni tekshiradi va o'zgargandagina yuboradi.
+        Yangi shakl birinchi marta ko'ringanda uning rasmi boshqaruv navbati orqali oldinroq ketadi.
+        """
+        tracker = CursorTracker()
+        period = 1.0 / CURSOR_FPS
         try:
             while self.running and self.ws:
-                # Ekranni olish
-                screenshot = sct.grab(monitor)
-                img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-
-                # Kichraytirish (+ xohlasa unsharp)
-                img = downscale_hq(img, TARGET_WIDTH)
-
-                # Kodlash (OpenCV bo'lsa undan foydalanadi; bo'lmasa PIL)
-                img_b64, img_fmt = await encode_image_async(img, prefer_webp=True)
-
-                # Paket
-                payload = {
-                    "type": "screen",
-                    "format": img_fmt,
-                    "data": img_b64,
-                    "width": img.width,
-                    "height": img.height,
-                    "timestamp": time.time(),
-                }
-
-                # Yuborish
-                try:
-                    await self.ws.send(json.dumps(payload))
-                except websockets.exceptions.ConnectionClosed:
-                    print("[Client] WS closed while sending frame.")
-                    break
-
-                # FPS hisoblash
-                frame_count += 1
-                now = time.time()
-                if now - last_fps_time >= 1.0:
-                    print(f"[Client] FPS: {frame_count}")
-                    frame_count = 0
-                    last_fps_time = now
-
-                # FPS nazorati
-                await asyncio.sleep(FRAME_DELAY)
+                await asyncio.sleep(period)
+                if "cursor" not in self.peer_caps:
+                    continue
+                cursor = self.cursor_message(tracker)
+                if cursor is None or cursor == self.cursor_sent:
+                    continue
+                shape = cursor.get("shape")
+                if shape is not None and shape not in self.cursor_shapes:
+                    self.cursor_shapes.add(shape)
+                    image = tracker.shape(shape)   # olinmasa operator standart strelkani chizadi
+                    if image is not None:
+                        png, hotspot = image
+                        self.send_control(json.dumps({
+                            "type": "cursor_shape",
+                            "id": shape,
+                            "hotspot": list(hotspot),
+                            "data": base64.b64encode(png).decode("ascii"),
+                        }))
+                self.cursor_sent = cursor
+                self.cursor_out = json.dumps(cursor)
+                self.out_wakeup.set()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"[Client] Cursor error: {e}")
 
+    async def send_screen(self):
+        """
+        Ekran tasvirini WebSocket orqali uzatish — konveyer (pipeline) ko'rinishida:
+        capture (N+1-kadr) -> encode (N-kadr) -> _sender (N-1-kadr) bir vaqtda ishlaydi.
+        Bosqichlar bitta o'rinli navbatlar bilan bog'langan; kadr vaqtlari mutlaq
+        muddatlar bo'yicha rejalashtiriladi (ish vaqti + sleep emas).
+        """
+        loop = asyncio.get_running_loop()
+        grabber = await loop.run_in_executor(capture_executor, ScreenGrabber)
+        handoff = asyncio.Queue(maxsize=1)   # capture -> encode: (BGR kadr, keepalive, switched, olish vaqtlari)
+        self.monitors = grabber.monitors
+        self.stream_monitor = self.stream_roi = None
+
+        stages = [asyncio.create_task(self._capture_stage(grabber, handoff)),
+                  asyncio.create_task(self._encode_stage(handoff))]
+        try:
+            # Bir bosqich to'xtasa (xato yoki uzilish), ikkinchisi ham to'xtatiladi
+            await asyncio.wait(stages, return_when=asyncio.FIRST_COMPLETED)
         except asyncio.CancelledError:
             print("[Client] send_screen cancelled.")
-        except Exception as e:
-            print(f"[Client] Screen send error: {e}")
         finally:
+            for t in stages:
+                t.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
             try:
-                sct.close()
+                capture_executor.submit(grabber.close)
             except Exception:
                 pass
             self.running = False
             print("[Client] Screen sender stopped.")
 
+    async def _capture_stage(self, grabber: ScreenGrabber, handoff: asyncio.Queue):
+        """
+        Har bir kadr muddatida ekranni oladi va kodlash bosqichiga uzatadi.
+        Kodlovchi oldingi kadrni olmaguncha yangi kadr olinmaydi — kadr eskirmaydi.
+        Ortda qolinsa o'tkazib yuborilgan muddatlar quvilmaydi, jadval hozirdan davom etadi.
+        """
+        loop = asyncio.get_running_loop()
+        last_change = time.monotonic()
+        deadline = loop.time()
+        try:
+            while self.running and self.ws:
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await handoff.join()   # kodlovchi oldingi kadrni oldi
+
+                # Ekranni olish va kichraytirish (+ xohlasa unsharp); o'zgarmagan bo'lsa — None.
+                # Keepalive vaqti kelganda taqqoslanmaydi va to'liq kadr yuboriladi.
+                captured = time.monotonic()
+                keepalive = captured - self.last_packet >= KEEPALIVE_INTERVAL
+                frame = await loop.run_in_executor(capture_executor, grabber.grab, not keepalive,
+                                                   self.controller.width, self.monitor_index, self.roi)
+                switched = (grabber.index, grabber.roi) != (self.stream_monitor, self.stream_roi)
+                if switched:
+                    # Boshqa monitor/soha: ko'ruvchilarga e'lon qilinadi, birinchi kadri — to'liq kadr
+                    self.stream_monitor, self.stream_roi = grabber.index, grabber.roi
+                    self.send_monitors()
+                if frame is not None and not keepalive:
+                    last_change = time.monotonic()
+                if frame is not None:
+                    handoff.put_nowait((frame, keepalive, switched, (captured, time.monotonic())))
+
+                # Keyingi muddat (qabul qiluvchi imkoniyatiga moslashgan; jim holatda siyrakroq)
+                fps = self.controller.fps
+                if self.stream_monitor == 0 and self.stream_roi is None:
+                    fps = min(fps, OVERVIEW_FPS)
+                if time.monotonic() - max(last_change, self.last_command) >= IDLE_AFTER:
+                    fps = min(fps, IDLE_POLL_FPS)
+                period = 1.0 / fps
+                deadline += period
+                if deadline < loop.time() - period:
+                    deadline = loop.time()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Client] Screen capture error: {e}")
+
+    async def _encode_stage(self, handoff: asyncio.Queue):
+        """Olingan kadrni kodlaydi va _sender'ga beradi; FPS hisobi va moslashuv shu yerda."""
+        loop = asyncio.get_running_loop()
+        last_fps_time = time.time()
+        frame_count = 0
+        last_sent, last_replaced = self.sent_frames, self.replaced_frames
+        try:
+            while self.running and self.ws:
+                frame, keepalive, switched, captured = await handoff.get()
+                handoff.task_done()   # capture keyingi kadrni shu kodlash bilan parallel oladi
+                if switched or (keepalive and self.video is None):
+                    # Video rejimida o'zgarmagan kadr arzon delta bo'ladi — kalit kadr shart emas
+                    self.force_keyframe = True
+
+                delta = False
+                quality = self.controller.quality
+                t0 = time.perf_counter()
+                if self.video is not None:
+                    # Inter-frame video oqimi (H.264/VP8)
+                    packet, delta = await loop.run_in_executor(executor, self.encode_video, frame, quality)
+                elif TILES_ENABLED and {"binary", "tiles"} <= self.peer_caps:
+                    # Faqat o'zgargan plitkalar (yoki davriy to'liq kadr)
+                    packet, delta = await loop.run_in_executor(executor, self.encode_update, frame, quality)
+                else:
+                    # Kodlash (OpenCV bo'lsa undan foydalanadi; bo'lmasa PIL)
+                    img_bytes, img_fmt = await encode_image_async(frame, prefer_webp=True, quality=quality)
+                    height, width = frame.shape[:2]
+
+                    # Paket: operator qo'llasa binary, aks holda eski JSON/base64 formati
+                    if "binary" in self.peer_caps:
+                        packet = FRAME_HEADER.pack(MSG_SCREEN, IMAGE_FORMATS.index(img_fmt),
+                                                   width, height, time.time()) + img_bytes
+                    else:
+                        packet = json.dumps({
+                            "type": "screen",
+                            "format": img_fmt,
+                            "data": base64.b64encode(img_bytes).decode("ascii"),
+                            "width": width,
+                            "height": height,
+                            "timestamp": time.time(),
+                        })
+
+                # Yuborish: navbatdagi boshqaruv xabarlari birinchi ketadi
+                if packet is not None:
+                    self.controller.observe_encode(time.perf_counter() - t0, len(packet))
+                    ack = self.input_ack(captured)
+                    self.queue_frame(packet, delta)
+                    if ack is not None and self.frame_out is packet:
+                        # Kadrdan oldin ketadi: operator keyingi chizilgan kadrni shu buyruqqa bog'laydi
+                        self.acked_seq = ack["seq"]
+                        self.send_control(json.dumps(ack))
+                    frame_count += 1
+                    self.last_packet = time.monotonic()
+
+                # FPS hisoblash
+                now = time.time()
+                if now - last_fps_time >= 1.0:
+                    self.controller.update(now - last_fps_time, self.sent_frames - last_sent,
+                                           self.replaced_frames - last_replaced)
+                    last_sent, last_replaced = self.sent_frames, self.replaced_frames
+                    c = self.controller
+                    print(f"[Client] FPS: {frame_count} (target {c.fps:.0f}, {c.width}px, q{c.quality})")
+                    frame_count = 0
+                    last_fps_time = now
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[Client] Screen encode error: {e}")
+
     async def receive_commands(self):
         """
         Operator komandalarini qabul qilish va bajarish.
@@ -276,6 +1150,13 @@ class ClientApp:
                 if not self.running:
                     break
 
+                if isinstance(message, bytes) and message[:1] == bytes([MSG_FILE_CHUNK]):
+                    self.files.handle_chunk(message)
+                    continue
+                if isinstance(message, bytes) and message[:1] == bytes([MSG_CLIPBOARD_CHUNK]):
+                    self.clipboard.handle_chunk(message)
+                    continue
+
                 try:
                     data = json.loads(message)
                 except json.JSONDecodeError:
@@ -284,6 +1165,15 @@ class ClientApp:
 
                 msg_type = data.get("type")
 
+                # Fayl uzatish (taklif, tasdiq, yakun) — buyruq emas
+                if self.files.handle(data):
+                    continue
+
+                # Clipboard tarkibi va "paste" (tarkib kelib o'rnatilgach input navbatiga tushadi)
+                if self.clipboard.handle(data):
+                    self.last_command = time.monotonic()
+                    continue
+
                 # Server holat xabarlari
                 if msg_type in ("peer_disconnected", "disconnect", "bye"):
                     print(f"[Client] Server says: {msg_type}")
@@ -293,9 +1183,58 @@ class ClientApp:
                     print(f"[Client] Server confirmed: {data}")
                     continue
 
-                # Boshqa komandalar -> alohida thread'da (loopni bloklamaslik uchun)
+                # Yangi operator yoki ko'ruvchi: kursor shakllari unda yo'q — qayta yuboriladi
+                if msg_type == "peer_connected":
+                    self.cursor_sent = None
+                    self.cursor_shapes = set()
+                    continue
+
+                # Qayta aloqa: relay va operator kadrlarni qanchalik qabul qila olayotgani
+                if msg_type == "relay_stats":
+                    self.controller.report_sink("relay", data.get("interval", 1.0),
+                                                data.get("delivered", 0), data.get("dropped", 0))
+                    continue
+                if msg_type == "frame_stats":
+                    received = data.get("received", 0)
+                    rendered = data.get("rendered", 0)
+                    self.controller.report_sink("operator", data.get("interval", 1.0),
+                                                rendered, received - rendered)
+                    continue
+
+                # Operator dekoderi (yoki relay) delta zanjirini yo'qotdi: keyingi kadr — kalit kadr
+                if msg_type == "keyframe_request":
+                    self.force_keyframe = True
+                    continue
+
+                # Operator imkoniyatlari (binary kadrlar va h.k.)
+                if msg_type == "hello":
+                    self.peer_caps = set(data.get("caps", []))
+                    self.force_keyframe = True
+                    self.cursor_sent = None
+                    self.cursor_shapes = set()
+                    codec = video_codec_for(self.peer_caps)
+                    self.video = VideoEncoder(codec, FPS_TARGET) if codec else None
+                    print(f"[Client] Operator caps: {sorted(self.peer_caps)}, video: {codec or 'off'}")
+                    self.send_monitors()
+                    self.files.resume()   # uzilishdan oldingi yuborishlar shu joyidan davom etadi
+                    continue
+
+                # Operator boshqa monitorni (yoki overview'ni) tanladi — keyingi kadrdan
+                if msg_type == "select_monitor":
+                    self.monitor_index = int(data.get("monitor", DEFAULT_MONITOR))
+                    self.roi = None
+                    continue
+
+                # Kattalashtirish: monitor ichidagi soha (x, y, w, h) yoki None — butun monitor
+                if msg_type == "set_roi":
+                    roi = data.get("roi")
+                    self.roi = tuple(float(v) for v in roi[:4]) if roi else None
+                    continue
+
+                # Boshqa komandalar -> input ishchisi navbatiga (loop bloklanmaydi, tartib saqlanadi)
+                self.last_command = time.monotonic()
                 if self.running:
-                    threading.Thread(target=self.execute_command, args=(data,), daemon=True).start()
+                    self.input.submit(data)
 
         except websockets.exceptions.ConnectionClosed:
             print("[Client] Connection closed by server.")
@@ -315,24 +1254,20 @@ class ClientApp:
             cmd_type = data.get('type')
 
             if cmd_type == 'mouse_move':
-                x = int(data['x'] * screen_width)
-                y = int(data['y'] * screen_height)
+                x, y = self.screen_point(data)
                 pyautogui.moveTo(x, y, duration=0, _pause=False)
 
             elif cmd_type == 'mouse_click':
-                x = int(data['x'] * screen_width)
-                y = int(data['y'] * screen_height)
+                x, y = self.screen_point(data)
                 button = data.get('button', 'left')
                 pyautogui.click(x, y, button=button, _pause=False)
 
             elif cmd_type == 'mouse_down':
-                x = int(data['x'] * screen_width)
-                y = int(data['y'] * screen_height)
+                x, y = self.screen_point(data)
                 pyautogui.mouseDown(x, y, _pause=False)
 
             elif cmd_type == 'mouse_up':
-                x = int(data['x'] * screen_width)
-                y = int(data['y'] * screen_height)
+                x, y = self.screen_point(data)
                 pyautogui.mouseUp(x, y, _pause=False)
 
             elif cmd_type == 'scroll':
@@ -350,6 +1285,13 @@ class ClientApp:
             elif cmd_type == 'type_text':
                 pyautogui.write(data.get('text', ''), interval=0, _pause=False)
 
+            elif cmd_type == 'clipboard_set':
+                self.clipboard.write(data['kind'], data['payload'])
+
+            elif cmd_type == 'paste':
+                # Butun tarkib bitta tizim joylashtirishi bilan (har belgi alohida yozilmaydi)
+                pyautogui.hotkey('command' if sys.platform == 'darwin' else 'ctrl', 'v', _pause=False)
+
             elif cmd_type == 'hotkey':
                 keys = data.get('keys', [])
                 keys_str = '+'.join(keys)
@@ -420,6 +1362,7 @@ class ClientApp:
         """
         print("[Client] Cleaning up...")
         self.running = False
+        self.input.clear()
         self._release_modifiers()
 
         # WebSocketni yopish
@@ -447,7 +1390,7 @@ class ClientGUI:
         self.app = ClientApp()
         self.root = tk.Tk()
         self.root.title("DeskWeb Client - Remote Support")
-        self.root.geometry("500x320")
+        self.root.geometry("560x350")
         self.root.resizable(False, False)
         self.setup_ui()
 
@@ -489,10 +1432,24 @@ class ClientGUI:
                                         cursor="hand2", state='disabled')
         self.disconnect_btn.pack(side='left', padx=5)
 
+        self.send_file_btn = tk.Button(btn_frame, text="📁 Send file",
+                                       command=self.on_send_file,
+                                       font=("Arial", 12, "bold"),
+                                       bg="#6c757d", fg="white",
+                                       padx=15, pady=8, relief='flat',
+                                       cursor="hand2", state='disabled')
+        self.send_file_btn.pack(side='left', padx=5)
+
         self.status_label = tk.Label(content_frame, text="● Not connected",
                                      font=("Arial", 10), fg="#6c757d", bg="white")
         self.status_label.pack(pady=(15, 5))
 
+        self.file_label = tk.Label(content_frame, text="", font=("Arial", 9),
+                                   fg="#6c757d", bg="white", wraplength=430)
+        self.file_label.pack()
+        self.app.files.on_event = lambda t: self.root.after(0, self.update_transfer, t)
+        self.app.clipboard.clipboard.attach(self.root)
+
         warning_frame = tk.Frame(self.root, bg="#fff3cd", relief='solid', bd=1)
         warning_frame.pack(fill='x', padx=20, pady=(0, 20))
         tk.Label(warning_frame, text="⚠️ Your screen will be shared and controlled",
@@ -509,6 +1466,7 @@ class ClientGUI:
 
         self.connect_btn.config(state='disabled')
         self.disconnect_btn.config(state='normal')
+        self.send_file_btn.config(state='normal')
         self.entry.config(state='disabled')
         self.status_label.config(text="● Connecting...", fg="#ffc107")
         self.root.update()
@@ -530,12 +1488,25 @@ class ClientGUI:
         self.app.disconnect()
         self.connect_btn.config(state='normal')
         self.disconnect_btn.config(state='disabled')
+        self.send_file_btn.config(state='disabled')
         self.entry.config(state='normal')
         self.status_label.config(text="● Disconnected", fg="#dc3545")
 
+    def on_send_file(self):
+        """Faylni operatorga yuborish (masalan loglar); uzilsa keyingi ulanishda davom etadi."""
+        path = filedialog.askopenfilename(title="Send file to operator")
+        if path and self.app.loop and self.app.running:
+            self.app.loop.call_soon_threadsafe(self.app.files.send_file, path)
+
+    def update_transfer(self, transfer):
+        self.file_label.config(text=describe_transfer(transfer))
+
     def on_closing(self):
         if messagebox.askokcancel("Quit", "Are you sure you want to exit?"):
             self.app.disconnect()
+            self.app.input.close()
+            if self.app.encoder_pool is not None:
+                self.app.encoder_pool.close()   # umumiy xotira segmenti ham o'chiriladi
             self.root.destroy()
             os._exit(0)
 
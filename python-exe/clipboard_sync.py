@@ -0,0 +1,466 @@
+"""
+Clipboard sinxronizatsiyasi: client va operator o'rtasida ikki tomonga (ikkala tomonda bir xil).
+
+Protokol:
+  {"type": "clipboard", "kind": "text"|"image", "hash", "size", "data"}
+      data — kichik tarkib (CLIPBOARD_INLINE gacha) base64; kattasi uchun null va ortidan
+      bulk navbatda [CLIP_CHUNK_HEADER(kind=MSG_CLIPBOARD_CHUNK, hash, offset) + bayt] ...
+  operator -> {"type": "paste", "hash"}
+      client shu hash'li tarkibni o'z clipboard'iga qo'ygach bitta Ctrl+V (macOS — Cmd+V) bosadi:
+      uzun matn har belgi alohida xabar/tugma bo'lib yozilmaydi.
+
+O'zgarish tarkib hash'i (sha256) bilan aniqlanadi: o'zgarmagan yoki qarshi tomondan kelgan
+tarkib qayta yuborilmaydi (aks-sado yo'q). Tarkib: matn — UTF-8, rasm — PNG.
+Sarlavha boshqaruv navbatida, bo'laklar undan keyin bulk navbatda ketadi — tartib saqlanadi;
+bulk tashlanmaydi, butunlik oxirida hash bilan tekshiriladi.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import threading
+
+try:
+    from PIL import Image, ImageGrab
+    PIL_AVAILABLE = True
+except Exception:
+    PIL_AVAILABLE = False
+
+MSG_CLIPBOARD_CHUNK = 7
+CLIP_CHUNK_HEADER   = struct.Struct("!B32sI")   # kind, sha256, offset
+
+CLIPBOARD_SYNC   = os.environ.get("DESKWEB_CLIPBOARD", "1") != "0"
+CLIPBOARD_POLL   = float(os.environ.get("DESKWEB_CLIPBOARD_POLL", 0.5))           # soniya
+CLIPBOARD_MAX    = int(os.environ.get("DESKWEB_CLIPBOARD_MAX", 16 * 1024 * 1024))  # bundan kattasi yuborilmaydi
+CLIPBOARD_INLINE = 32 * 1024     # shu hajmgacha tarkib JSON ichida
+CLIP_CHUNK_SIZE  = 64 * 1024
+TK_TIMEOUT       = 2.0           # tkinter oqimida clipboard amalini kutish
+
+# Windows clipboard formatlari
+CF_UNICODETEXT = 13
+CF_DIB         = 8
+GMEM_MOVEABLE  = 0x0002
+BMP_FILE_HEADER = struct.Struct("<2sIHHI")
+
+
+def content_hash(kind: str, payload: bytes) -> str:
+    return hashlib.sha256(kind.encode() + b"\0" + payload).hexdigest()
+
+
+def _dib_to_png(dib: bytes) -> bytes:
+    """CF_DIB (BITMAPINFOHEADER + piksellar) -> PNG: BMP fayl sarlavhasi qo'shilib PIL ochadi."""
+    header_size, = struct.unpack_from("<I", dib)
+    bit_count, compression = struct.unpack_from("<HI", dib, 14)
+    colors, = struct.unpack_from("<I", dib, 32)
+    offset = 14 + header_size
+    if header_size == 40 and compression == 3:
+        offset += 12      # BI_BITFIELDS maskalari
+    if colors == 0 and bit_count <= 8:
+        colors = 1 << bit_count
+    offset += colors * 4
+    bmp = BMP_FILE_HEADER.pack(b"BM", 14 + len(dib), 0, 0, offset) + dib
+    out = io.BytesIO()
+    Image.open(io.BytesIO(bmp)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def _png_to_dib(png: bytes) -> bytes:
+    img = Image.open(io.BytesIO(png))
+    out = io.BytesIO()
+    img.convert("RGB").save(out, format="BMP")
+    return out.getvalue()[BMP_FILE_HEADER.size:]
+
+
+def _image_png(img) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+class Clipboard:
+    """
+    Tizim clipboard'i. Windows'da Win32 API (ctypes) — istalgan oqimdan; boshqa tizimlarda
+    matn tkinter orqali (root o'rnatilgach, amal tkinter oqimida bajariladi), rasm o'qish —
+    PIL.ImageGrab. read() -> (kind, data) yoki None — matn UTF-8 bayt, rasm mahalliy ko'rinishda
+    (Windows'da CF_DIB bayt, boshqalarda PIL rasm; PNG'ga encode() o'giradi — faqat o'zgarganda);
+    write(kind, payload) -> bool (payload — tarmoqdagi ko'rinish).
+    """
+
+    def __init__(self, root=None):
+        self.root = None
+        self.tk_thread = None
+        if root is not None:
+            self.attach(root)
+        self.win32 = sys.platform == "win32"
+        self.sequence = None
+        if self.win32:
+            import ctypes
+            self.ctypes = ctypes
+            self.user32 = ctypes.windll.user32
+            self.kernel32 = ctypes.windll.kernel32
+            self.user32.OpenClipboard.argtypes = [ctypes.c_void_p]
+            self.user32.GetClipboardData.restype = ctypes.c_void_p
+            self.user32.GetClipboardData.argtypes = [ctypes.c_uint]
+            self.user32.SetClipboardData.restype = ctypes.c_void_p
+            self.user32.SetClipboardData.argtypes = [ctypes.c_uint, ctypes.c_void_p]
+            self.user32.IsClipboardFormatAvailable.argtypes = [ctypes.c_uint]
+            self.user32.GetClipboardSequenceNumber.restype = ctypes.c_uint
+            self.kernel32.GlobalAlloc.restype = ctypes.c_void_p
+            self.kernel32.GlobalAlloc.argtypes = [ctypes.c_uint, ctypes.c_size_t]
+            self.kernel32.GlobalLock.restype = ctypes.c_void_p
+            self.kernel32.GlobalLock.argtypes = [ctypes.c_void_p]
+            self.kernel32.GlobalUnlock.argtypes = [ctypes.c_void_p]
+            self.kernel32.GlobalFree.argtypes = [ctypes.c_void_p]
+            self.kernel32.GlobalSize.restype = ctypes.c_size_t
+            self.kernel32.GlobalSize.argtypes = [ctypes.c_void_p]
+
+    def attach(self, root):
+        """tkinter oynasi (shu oqim — tkinter oqimi); Windows'dan boshqa tizimlarda kerak."""
+        self.root = root
+        self.tk_thread = threading.current_thread()
+
+    @property
+    def available(self) -> bool:
+        return self.win32 or self.root is not None
+
+    def changed(self) -> bool:
+        """Arzon oldindan tekshiruv: Windows'da clipboard ketma-ketlik raqami o'zgardimi."""
+        if not self.win32:
+            return True
+        seq = self.user32.GetClipboardSequenceNumber()
+        if seq == self.sequence:
+            return False
+        self.sequence = seq
+        return True
+
+    def read(self):
+        if self.win32:
+            return self._win_read()
+        text = self._in_tk(self._tk_read)
+        if text:
+            return "text", text.encode("utf-8")
+        if PIL_AVAILABLE:
+            try:
+                img = ImageGrab.grabclipboard()
+            except Exception:
+                img = None
+            if img is not None and hasattr(img, "save"):
+                return "image", img
+        return None
+
+    @staticmethod
+    def key(data) -> bytes:
+        """O'zgarishni aniqlash uchun mahalliy ko'rinish baytlari (PNG'ga o'girmasdan)."""
+        if isinstance(data, bytes):
+            return data
+        return f"{data.mode}{data.size}".encode() + data.tobytes()
+
+    @staticmethod
+    def encode(kind: str, data) -> bytes:
+        """Tarmoqdagi ko'rinish: matn — o'zi, rasm — PNG."""
+        if kind != "image":
+            return data
+        return _dib_to_png(data) if isinstance(data, bytes) else _image_png(data)
+
+    def write(self, kind: str, payload: bytes) -> bool:
+        if self.win32:
+            ok = self._win_write(kind, payload)
+            if ok:
+                # O'zimiz qo'ygan tarkib changed()da o'zgarish bo'lib ko'rinmaydi
+                self.sequence = self.user32.GetClipboardSequenceNumber()
+            return ok
+        if kind != "text":
+            return False   # rasm yozish hozircha faqat Windows'da
+        return bool(self._in_tk(self._tk_write, payload.decode("utf-8", "replace")))
+
+    # --- tkinter (Windows'dan boshqa tizimlar) ---
+
+    def _in_tk(self, fn, *args):
+        """fn'ni tkinter oqimida bajaradi va natijani kutadi (tkinter oqimining o'zida — darhol)."""
+        if self.root is None:
+            return None
+        if threading.current_thread() is self.tk_thread:
+            return fn(*args)
+        done = threading.Event()
+        result = []
+
+        def run():
+            try:
+                result.append(fn(*args))
+            finally:
+                done.set()
+        try:
+            self.root.after(0, run)
+        except Exception:
+            return None
+        done.wait(TK_TIMEOUT)
+        return result[0] if result else None
+
+    def _tk_read(self):
+        try:
+            return self.root.clipboard_get()
+        except Exception:
+            return None   # bo'sh yoki matn emas
+
+    def _tk_write(self, text: str) -> bool:
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+        self.root.update_idletasks()
+        return True
+
+    # --- Win32 ---
+
+    def _win_open(self) -> bool:
+        for _ in range(10):   # boshqa dastur ochib turgan bo'lishi mumkin
+            if self.user32.OpenClipboard(None):
+                return True
+            threading.Event().wait(0.01)
+        return False
+
+    def _win_get(self, fmt: int):
+        handle = self.user32.GetClipboardData(fmt)
+        if not handle:
+            return None
+        ptr = self.kernel32.GlobalLock(handle)
+        if not ptr:
+            return None
+        try:
+            return self.ctypes.string_at(ptr, self.kernel32.GlobalSize(handle))
+        finally:
+            self.kernel32.GlobalUnlock(handle)
+
+    def _win_read(self):
+        if not self._win_open():
+            return None
+        try:
+            if self.user32.IsClipboardFormatAvailable(CF_UNICODETEXT):
+                raw = self._win_get(CF_UNICODETEXT)
+                if raw is None:
+                    return None
+                text = raw.decode("utf-16-le", "replace").split("\0", 1)[0]
+                return ("text", text.encode("utf-8")) if text else None
+            if PIL_AVAILABLE and self.user32.IsClipboardFormatAvailable(CF_DIB):
+                dib = self._win_get(CF_DIB)
+                return ("image", dib) if dib else None
+            return None
+        finally:
+            self.user32.CloseClipboard()
+
+    def _win_write(self, kind: str, payload: bytes) -> bool:
+        if kind == "text":
+            fmt, data = CF_UNICODETEXT, payload.decode("utf-8", "replace").encode("utf-16-le") + b"\0\0"
+        elif kind == "image" and PIL_AVAILABLE:
+            fmt, data = CF_DIB, _png_to_dib(payload)
+        else:
+            return False
+        handle = self.kernel32.GlobalAlloc(GMEM_MOVEABLE, len(data))
+        if not handle:
+            return False
+        ptr = self.kernel32.GlobalLock(handle)
+        self.ctypes.memmove(ptr, data, len(data))
+        self.kernel32.GlobalUnlock(handle)
+        if not self._win_open():
+            self.kernel32.GlobalFree(handle)
+            return False
+        try:
+            self.user32.EmptyClipboard()
+            # Muvaffaqiyatli bo'lsa xotira tizimga o'tadi
+            if not self.user32.SetClipboardData(fmt, handle):
+                self.kernel32.GlobalFree(handle)
+                return False
+            return True
+        finally:
+            self.user32.CloseClipboard()
+
+
+class ClipboardSync:
+    """
+    Ikki tomonlama sinxronizatsiya. Ilova ulanish event loop'i ichida chaqiradi:
+    send_control(str) — JSON navbatga; send_bulk(bytes) — bo'lak bulk navbatga;
+    apply(kind, payload) — qarshi tomon tarkibini o'rnatishni rejalashtirish; oxirida write() chaqirilishi
+    shart (standart: executor'da; client input navbati orqali — keyingi tugmalardan oldin bajariladi);
+    on_paste(data) — "paste" buyrug'i, tarkib o'rnatilgandan keyin (client).
+    send_initial — ulanishda joriy clipboard yuboriladimi (operator — ha; client faqat o'zgarishni).
+    """
+
+    def __init__(self, clipboard: Clipboard, send_control, send_bulk, apply=None, on_paste=None,
+                 send_initial: bool = True):
+        self.clipboard = clipboard
+        self.send_control = send_control
+        self.send_bulk = send_bulk
+        self.apply = apply
+        self.on_paste = on_paste
+        self.send_initial = send_initial
+        self.current = None       # oxirgi sinxronlangan tarkib hash'i (qaysi tomondan bo'lsa ham)
+        self.local = None         # shu tomon clipboard'idan oxirgi o'qilgan hash
+        self.incoming = None      # bo'laklab kelayotgan tarkib: {"kind", "hash", "buffer", "received"}
+        self.pending_paste = None
+        self.lock = asyncio.Lock()
+        # Qarshi tomon tarkibi o'rnatilayotganda o'qilgan clipboard eski bo'lishi mumkin:
+        # applying — kutilayotgan yozuvlar, generation — har yozuvdan keyin oshadi
+        self.applying = 0
+        self.generation = 0
+        self.restore = None
+        self.loop = None
+
+    @property
+    def enabled(self) -> bool:
+        return CLIPBOARD_SYNC and self.clipboard.available
+
+    def reset(self):
+        """Yangi ulanish: qarshi tomonning clipboard'i noma'lum, yarim qolgan tarkib tashlanadi."""
+        self.current = self.local = None
+        self.clipboard.sequence = None
+        self.incoming = None
+        self.pending_paste = None
+        self.lock = asyncio.Lock()
+        self.applying = 0
+        self.loop = asyncio.get_running_loop()
+
+    async def run(self):
+        """Ulanish davomida clipboard'ni kuzatadi (o'qish executor'da — loop bloklanmaydi)."""
+        if not self.enabled:
+            return
+        primed = self.send_initial
+        while True:
+            try:
+                await self.check(send=primed)
+            except Exception as e:
+                print(f"Clipboard error: {e}")
+            primed = True
+            await asyncio.sleep(CLIPBOARD_POLL)
+
+    async def check(self, send: bool = True) -> str:
+        """Mahalliy clipboard o'zgargan bo'lsa qarshi tomonga yuboradi; joriy hash'ni qaytaradi."""
+        async with self.lock:
+            loop = asyncio.get_running_loop()
+            if self.applying or not self.clipboard.changed():
+                return self.current
+            generation = self.generation
+            item = await loop.run_in_executor(None, self.clipboard.read)
+            if self.applying or generation != self.generation:
+                self.clipboard.sequence = None   # yozuv bilan ustma-ust tushdi — keyingi safar qayta o'qiladi
+                return self.current
+            if item is None:
+                return self.current
+            kind, data = item
+            local = await loop.run_in_executor(None, content_hash, kind, Clipboard.key(data))
+            if local == self.local:
+                return self.current
+            self.local = local
+            payload = await loop.run_in_executor(None, Clipboard.encode, kind, data)
+            digest = content_hash(kind, payload)
+            if digest == self.current:
+                return self.current   # qarshi tomondan kelgan tarkib
+            if not send or len(payload) > CLIPBOARD_MAX:
+                return self.current
+            self.current = digest
+            self._send(kind, payload, digest)
+            return digest
+
+    async def paste(self, send_command):
+        """Operator: joriy clipboard'ni yuborib (o'zgargan bo'lsa), client'dan joylashtirishni so'raydi."""
+        digest = await self.check()
+        send_command({"type": "paste", "hash": digest})
+
+    def _send(self, kind: str, payload: bytes, digest: str):
+        inline = len(payload) <= CLIPBOARD_INLINE
+        self.send_control(json.dumps({
+            "type": "clipboard", "kind": kind, "hash": digest, "size": len(payload),
+            "data": base64.b64encode(payload).decode("ascii") if inline else None,
+        }))
+        if inline:
+            return
+        raw = bytes.fromhex(digest)
+        view = memoryview(payload)
+        for offset in range(0, len(payload), CLIP_CHUNK_SIZE):
+            self.send_bulk(CLIP_CHUNK_HEADER.pack(MSG_CLIPBOARD_CHUNK, raw, offset)
+                           + view[offset:offset + CLIP_CHUNK_SIZE].tobytes())
+
+    # --- kiruvchi xabarlar ---
+
+    def handle(self, data: dict) -> bool:
+        """clipboard/paste JSON xabarini qayta ishlaydi; boshqa xabar bo'lsa False."""
+        kind = data.get("type")
+        if kind == "paste" and self.on_paste is not None:
+            digest = data.get("hash")
+            if digest is None or digest == self.current:
+                self.on_paste(data)
+            else:
+                self.pending_paste = data   # tarkib hali kelmoqda — o'rnatilgach bosiladi
+            return True
+        if kind != "clipboard":
+            return False
+        content_kind, digest = data.get("kind"), str(data.get("hash", ""))
+        try:
+            size = int(data.get("size", 0))
+            raw = bytes.fromhex(digest)
+        except (TypeError, ValueError):
+            return True
+        if content_kind not in ("text", "image") or len(raw) != 32 or not 0 <= size <= CLIPBOARD_MAX:
+            return True
+        if data.get("data") is not None:
+            self._received(content_kind, base64.b64decode(data["data"]), digest)
+        else:
+            self.incoming = {"kind": content_kind, "hash": digest, "raw": raw,
+                             "buffer": bytearray(size), "received": 0}
+        return True
+
+    def handle_chunk(self, message: bytes):
+        """Binary bo'lak: tartib bilan yig'iladi, oxirida hash tekshirilib o'rnatiladi."""
+        item = self.incoming
+        if item is None or len(message) < CLIP_CHUNK_HEADER.size:
+            return
+        kind, raw, offset = CLIP_CHUNK_HEADER.unpack_from(message)
+        payload = memoryview(message)[CLIP_CHUNK_HEADER.size:]
+        if kind != MSG_CLIPBOARD_CHUNK or raw != item["raw"] or offset != item["received"] \
+                or offset + len(payload) > len(item["buffer"]):
+            return
+        item["buffer"][offset:offset + len(payload)] = payload
+        item["received"] += len(payload)
+        if item["received"] == len(item["buffer"]):
+            self.incoming = None
+            self._received(item["kind"], bytes(item["buffer"]), item["hash"])
+
+    def _received(self, kind: str, payload: bytes, digest: str):
+        if content_hash(kind, payload) != digest:
+            print("Clipboard: hash mismatch, ignored")
+            return
+        self.current = digest
+        if not self.applying:
+            self.restore = self.local
+        self.applying += 1
+        self.local = None        # keyin shu tomonda eski tarkib qayta nusxalansa ham yuboriladi
+        self.loop = asyncio.get_running_loop()
+        if self.apply is not None:
+            self.apply(kind, payload)
+        else:
+            self.loop.run_in_executor(None, self.write, kind, payload)
+        pending = self.pending_paste
+        if pending is not None and pending.get("hash") == digest:
+            self.pending_paste = None
+            self.on_paste(pending)
+
+    def write(self, kind: str, payload: bytes) -> bool:
+        """Qarshi tomon tarkibini tizim clipboard'iga qo'yadi (istalgan oqimdan)."""
+        try:
+            ok = self.clipboard.write(kind, payload)
+        except Exception as e:
+            print(f"Clipboard write error: {e}")
+            ok = False
+        try:
+            self.loop.call_soon_threadsafe(self._applied, ok)
+        except RuntimeError:
+            pass   # ulanish loop'i yopilgan
+        return ok
+
+    def _applied(self, ok: bool):
+        self.applying = max(0, self.applying - 1)
+        self.generation += 1
+        if not ok and not self.applying:
+            # O'rnatib bo'lmadi (masalan, rasm): mahalliy tarkib o'zgarmagan — qaytarib yuborilmaydi
+            self.local = self.restore
@@ -0,0 +1,390 @@
+"""
+Fayl uzatish: client va operator o'rtasida xona ulanishi orqali (ikkala tomonda bir xil).
+
+Protokol (JSON boshqaruv xabarlari + binary bo'laklar):
+  yuboruvchi -> {"type": "file_offer", "id", "name", "size", "chunk"}
+  qabul qiluvchi -> {"type": "file_accept", "id", "offset"}    # offset — diskda tayyor qism (davom ettirish)
+  yuboruvchi -> [CHUNK_HEADER(kind=MSG_FILE_CHUNK, flags, id, offset, crc32) + bayt]  ...
+  qabul qiluvchi -> {"type": "file_ack", "id", "offset"}       # shu joygacha yozildi (kumulyativ)
+                   {"type": "file_nack", "id", "offset"}      # crc yoki tartib xatosi: shu joydan qayta
+  yuboruvchi -> {"type": "file_done", "id", "sha256"}
+  qabul qiluvchi -> {"type": "file_complete", "id", "ok"}
+  har ikkisi -> {"type": "file_cancel", "id", "reason"}
+
+Oqim nazorati: tasdiqlanmagan baytlar FILE_WINDOW bo'lakdan oshmaydi — relay va tomonlar
+navbatida fayldan ko'pi bilan shuncha turadi. Bo'laklar relay'da alohida (tashlanmaydigan)
+"bulk" navbatda ketadi va ekran kadrlari bilan navbat bilan yuboriladi (FILE_SHARE).
+Uzilishdan keyin yuboruvchi taklifni qaytaradi, qabul qiluvchi esa ".part" fayl hajmidan
+davom etadi (diskka faqat crc tekshirilgan bo'laklar yoziladi). Oxirida butun fayl sha256.
+O'qish/yozish file_executor oqimida, bo'laklab — fayl xotiraga to'liq yuklanmaydi.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+MSG_FILE_CHUNK = 6
+CHUNK_HEADER   = struct.Struct("!BB16sQI")   # kind, flags, id, offset, crc32
+FLAG_LAST      = 1
+
+CHUNK_SIZE   = int(os.environ.get("DESKWEB_FILE_CHUNK", 64 * 1024))
+FILE_WINDOW  = int(os.environ.get("DESKWEB_FILE_WINDOW", 8))       # yo'ldagi bo'laklar soni
+# Kadr yuborishni kutib turgan paytda fayl bo'laklariga beriladigan yuborish vaqti ulushi
+# (0 — fayl faqat kadrlar orasidagi bo'sh vaqtda; 0.5 — teng). Kadr kutmayotganda fayl cheklanmaydi.
+FILE_SHARE   = float(os.environ.get("DESKWEB_FILE_SHARE", 0.3))
+DOWNLOAD_DIR = os.environ.get("DESKWEB_DOWNLOAD_DIR",
+                              os.path.join(os.path.expanduser("~"), "Downloads", "DeskWeb"))
+PROGRESS_INTERVAL = 0.25   # on_event chaqiruvlari oralig'i (soniya)
+HASH_BLOCK        = 1024 * 1024
+
+# Diskka yozish/o'qish uchun bitta oqim: yozuvlar kelgan tartibida bajariladi (ack'lar ham)
+file_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def _read_chunk(path: str, offset: int, size: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(size)
+
+
+def _write_chunk(path: str, offset: int, data: bytes):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+
+def _prepare_part(path: str, offset: int) -> int:
+    """".part" faylni ochadi (yo'q bo'lsa yaratadi) va to'liq bo'laklar chegarasigacha qisqartiradi."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab"):
+        pass
+    offset = min(offset, os.path.getsize(path) // CHUNK_SIZE * CHUNK_SIZE)
+    os.truncate(path, offset)
+    return offset
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _finish(part: str, name: str, directory: str, expected: str) -> str:
+    """sha256 mos kelsa ".part"ni yakuniy nomga o'tkazadi (band bo'lsa "nom (1).ext")."""
+    if _sha256(part) != expected:
+        raise ValueError("sha256 mismatch")
+    stem, ext = os.path.splitext(name)
+    target, n = os.path.join(directory, name), 1
+    while os.path.exists(target):
+        target, n = os.path.join(directory, f"{stem} ({n}){ext}"), n + 1
+    os.replace(part, target)
+    return target
+
+
+def safe_name(name: str) -> str:
+    """Masofadan kelgan nomdan faqat fayl nomi (katalog qismlarisiz)."""
+    name = os.path.basename(str(name).replace("\\", "/")).strip()
+    return name if name not in ("", ".", "..") else "file"
+
+
+def transfer_id(path: str, size: int, mtime_ns: int) -> str:
+    """Bir xil fayl uchun qayta ishga tushirilgandan keyin ham bir xil id (davom ettirish uchun)."""
+    return hashlib.sha1(f"{os.path.abspath(path)}|{size}|{mtime_ns}".encode()).hexdigest()[:32]
+
+
+class Transfer:
+    """Bitta uzatish holati. direction: "send" / "receive"; state: offered, sending, paused,
+    receiving, verifying, done, failed, cancelled."""
+
+    def __init__(self, tid: str, direction: str, name: str, size: int, path: str):
+        self.id = tid
+        self.direction = direction
+        self.name = name
+        self.size = size
+        self.path = path          # yuborishda — manba, qabulda — ".part" fayl
+        self.state = "offered"
+        self.done_bytes = 0       # tasdiqlangan (send) yoki diskka yozilgan (receive) baytlar
+        self.next = 0             # send: keyingi yuboriladigan; receive: kutilayotgan offset
+        self.nacked = None        # receive: shu offset uchun nack yuborilgan
+        self.wake = None          # send: ack/nack kelganda (shu ulanish loop'ida)
+        self.task = None
+        self.result = None        # receive: yakuniy fayl yo'li
+        self.error = None
+        self.last_event = 0.0
+
+    @property
+    def progress(self) -> float:
+        return self.done_bytes / self.size if self.size else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed", "cancelled")
+
+
+class FileTransfers:
+    """
+    Ikkala yo'nalishdagi uzatishlar. Ilova ulanish event loop'i ichida chaqiradi:
+    send_control(str) — JSON xabar navbatga; send_bulk(bytes) — bo'lak bulk navbatga;
+    on_event(Transfer) — holat/progress o'zgardi (ixtiyoriy, loop oqimidan chaqiriladi).
+    Holat ilova obyektida saqlanadi — har ulanish yangi loop bo'lsa ham davom etadi.
+    """
+
+    def __init__(self, send_control, send_bulk, download_dir: str = DOWNLOAD_DIR, on_event=None):
+        self.send_control = send_control
+        self.send_bulk = send_bulk
+        self.download_dir = download_dir
+        self.on_event = on_event
+        self.transfers = {}
+        self.connected = False
+
+    # --- hodisalar ---
+
+    def _event(self, t: Transfer, force: bool = True):
+        now = time.monotonic()
+        if self.on_event and (force or now - t.last_event >= PROGRESS_INTERVAL):
+            t.last_event = now
+            try:
+                self.on_event(t)
+            except Exception as e:
+                print(f"File event error: {e}")
+
+    def _send(self, **message):
+        self.send_control(json.dumps(message))
+
+    def _fail(self, t: Transfer, reason: str, notify: bool = True):
+        t.state, t.error = "failed", reason
+        if t.task is not None:
+            t.task.cancel()
+        if notify and self.connected:
+            self._send(type="file_cancel", id=t.id, reason=reason)
+        self._event(t)
+
+    # --- ulanish ---
+
+    def resume(self):
+        """Qarshi tomon tayyor: to'xtatilgan chiquvchi uzatishlar qayta taklif qilinadi (takror chaqirish xavfsiz)."""
+        self.connected = True
+        for t in self.transfers.values():
+            if t.direction == "send" and t.state == "paused":
+                self._offer(t)
+
+    def pause(self):
+        """Ulanish uzildi: yuborish to'xtaydi, holat (offset) keyingi ulanish uchun saqlanadi."""
+        self.connected = False
+        for t in self.transfers.values():
+            if t.task is not None:
+                t.task.cancel()
+                t.task = None
+            if t.direction == "send" and t.state in ("sending", "verifying", "offered"):
+                t.state = "paused"
+                self._event(t)
+
+    # --- yuborish ---
+
+    def send_file(self, path: str):
+        """Faylni yuborishga qo'yadi (ulanish bo'lmasa — keyingi ulanishda taklif qilinadi)."""
+        st = os.stat(path)
+        tid = transfer_id(path, st.st_size, st.st_mtime_ns)
+        t = self.transfers.get(tid)
+        if t is not None and not t.finished:
+            return t
+        t = self.transfers[tid] = Transfer(tid, "send", os.path.basename(path), st.st_size, path)
+        if self.connected:
+            self._offer(t)
+        else:
+            t.state = "paused"
+        self._event(t)
+        return t
+
+    def cancel(self, tid: str):
+        t = self.transfers.get(tid)
+        if t is not None and not t.finished:
+            t.state = "cancelled"
+            if t.task is not None:
+                t.task.cancel()
+            if self.connected:
+                self._send(type="file_cancel", id=t.id, reason="cancelled")
+            self._event(t)
+
+    def _offer(self, t: Transfer):
+        t.state = "offered"
+        self._send(type="file_offer", id=t.id, name=t.name, size=t.size, chunk=CHUNK_SIZE)
+
+    async def _pump(self, t: Transfer):
+        """Oyna ichida bo'laklarni o'qib yuboradi; hammasi tasdiqlangach sha256 bilan yakunlaydi."""
+        loop = asyncio.get_running_loop()
+        raw_id = bytes.fromhex(t.id)
+        try:
+            while t.state == "sending":
+                if t.done_bytes >= t.size:
+                    t.state = "verifying"
+                    self._event(t)
+                    digest = await loop.run_in_executor(file_executor, _sha256, t.path)
+                    self._send(type="file_done", id=t.id, sha256=digest)
+                    return
+                if t.next < t.size and t.next - t.done_bytes < FILE_WINDOW * CHUNK_SIZE:
+                    offset = t.next
+                    data = await loop.run_in_executor(file_executor, _read_chunk, t.path, offset, CHUNK_SIZE)
+                    if t.state != "sending" or t.next != offset:
+                        continue   # shu orada nack (qaytish) yoki bekor qilish
+                    if not data:
+                        raise OSError("file shrank while sending")
+                    flags = FLAG_LAST if offset + len(data) >= t.size else 0
+                    self.send_bulk(CHUNK_HEADER.pack(MSG_FILE_CHUNK, flags, raw_id, offset,
+                                                     zlib.crc32(data)) + data)
+                    t.next = offset + len(data)
+                    continue
+                await t.wake.wait()
+                t.wake.clear()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self._fail(t, f"read error: {e}")
+        finally:
+            if t.task is asyncio.current_task():
+                t.task = None
+
+    # --- kiruvchi xabarlar ---
+
+    def handle(self, data: dict) -> bool:
+        """file_* JSON xabarini qayta ishlaydi; boshqa xabar bo'lsa False."""
+        kind = data.get("type", "")
+        if not kind.startswith("file_"):
+            return False
+        t = self.transfers.get(str(data.get("id")))
+        if kind == "file_offer":
+            self._on_offer(data)
+        elif t is None:
+            pass
+        elif kind == "file_accept" and t.direction == "send" and t.state == "offered":
+            t.done_bytes = t.next = max(0, min(int(data.get("offset", 0)), t.size))
+            t.state = "sending"
+            t.wake = asyncio.Event()
+            if t.task is not None:
+                t.task.cancel()
+            t.task = asyncio.create_task(self._pump(t))
+            self._event(t)
+        elif kind == "file_ack" and t.direction == "send" and t.state == "sending":
+            t.done_bytes = max(t.done_bytes, min(int(data.get("offset", 0)), t.size))
+            t.wake.set()
+            self._event(t, force=False)
+        elif kind == "file_nack" and t.direction == "send" and t.state == "sending":
+            t.next = t.done_bytes = max(0, min(int(data.get("offset", 0)), t.size))
+            t.wake.set()
+        elif kind == "file_done" and t.direction == "receive" and t.state == "receiving":
+            self._on_done(t, str(data.get("sha256", "")))
+        elif kind == "file_complete" and t.direction == "send":
+            if data.get("ok"):
+                t.state = "done"
+                self._event(t)
+            else:
+                self._fail(t, data.get("reason", "verification failed"), notify=False)
+        elif kind == "file_cancel" and not t.finished:
+            self._fail(t, data.get("reason", "cancelled by peer"), notify=False)
+        return True
+
+    def _on_offer(self, data: dict):
+        tid = str(data.get("id", ""))
+        try:
+            bytes.fromhex(tid)
+            size = int(data.get("size", 0))
+        except (TypeError, ValueError):
+            return
+        if len(tid) != 32 or size < 0 or int(data.get("chunk", CHUNK_SIZE)) != CHUNK_SIZE:
+            self._send(type="file_cancel", id=tid, reason="unsupported offer")
+            return
+        t = self.transfers.get(tid)
+        if t is None or t.finished:
+            name = safe_name(data.get("name", ""))
+            part = os.path.join(self.download_dir, f".{name}.{tid[:8]}.part")
+            t = self.transfers[tid] = Transfer(tid, "receive", name, size, part)
+        # Diskdagi qismdan (oldingi ulanish yoki ishga tushirishdan) davom etiladi; file_executor'da —
+        # oldingi ulanishning navbatdagi yozuvlaridan keyin
+        resume_at = t.done_bytes if t.state == "receiving" else t.size
+        t.state = "offered"
+        future = asyncio.get_running_loop().run_in_executor(file_executor, _prepare_part, t.path, resume_at)
+
+        def prepared(f):
+            if f.exception() is not None:
+                self._fail(t, f"write error: {f.exception()}")
+                return
+            t.done_bytes = t.next = f.result()
+            t.nacked = None
+            t.state = "receiving"
+            self._send(type="file_accept", id=tid, offset=t.next)
+            self._event(t)
+        future.add_done_callback(prepared)
+
+    def handle_chunk(self, message: bytes):
+        """Binary bo'lak: tartib va crc tekshiriladi, yozish file_executor'da, so'ng ack."""
+        if len(message) < CHUNK_HEADER.size:
+            return
+        kind, flags, raw_id, offset, crc = CHUNK_HEADER.unpack_from(message)
+        t = self.transfers.get(raw_id.hex())
+        if kind != MSG_FILE_CHUNK or t is None or t.direction != "receive" or t.state != "receiving":
+            return
+        payload = bytes(memoryview(message)[CHUNK_HEADER.size:])
+        if offset != t.next or zlib.crc32(payload) != crc or offset + len(payload) > t.size:
+            # Yo'qolgan/buzilgan bo'lak: bir marta nack, keyingilar kutilgan offsetgacha e'tiborsiz
+            if t.nacked != t.next:
+                t.nacked = t.next
+                self._send(type="file_nack", id=t.id, offset=t.next)
+            return
+        t.next = offset + len(payload)
+        t.nacked = None
+        end = t.next
+        future = asyncio.get_running_loop().run_in_executor(file_executor, _write_chunk, t.path, offset, payload)
+        future.add_done_callback(lambda f: self._written(t, end, f))
+
+    def _written(self, t: Transfer, end: int, future):
+        if t.state != "receiving":
+            return
+        if future.cancelled() or future.exception() is not None:
+            self._fail(t, f"write error: {future.exception() if not future.cancelled() else 'cancelled'}")
+            return
+        t.done_bytes = max(t.done_bytes, end)
+        if self.connected:
+            self._send(type="file_ack", id=t.id, offset=end)
+        self._event(t, force=False)
+
+    def _on_done(self, t: Transfer, digest: str):
+        """Barcha yozuvlardan keyin (file_executor tartibi) sha256 tekshiriladi va nom beriladi."""
+        t.state = "verifying"
+        self._event(t)
+        future = asyncio.get_running_loop().run_in_executor(
+            file_executor, _finish, t.path, t.name, self.download_dir, digest)
+
+        def finished(f):
+            if f.exception() is not None:
+                t.state, t.error = "failed", str(f.exception())
+                if self.connected:
+                    self._send(type="file_complete", id=t.id, ok=False, reason=t.error)
+                # Buzilgan qismdan davom etilmasin
+                try:
+                    os.remove(t.path)
+                except OSError:
+                    pass
+            else:
+                t.state, t.result = "done", f.result()
+                if self.connected:
+                    self._send(type="file_complete", id=t.id, ok=True)
+            self._event(t)
+        future.add_done_callback(finished)
+
+
+def describe(t: Transfer) -> str:
+    """GUI uchun qisqa holat matni."""
+    arrow = "⬆" if t.direction == "send" else "⬇"
+    if t.state in ("sending", "receiving"):
+        return f"{arrow} {t.name}: {100 * t.progress:.0f}%"
+    if t.state == "failed":
+        return f"{arrow} {t.name}: failed ({t.error})"
+    if t.state == "done" and t.result:
+        return f"{arrow} {t.name}: saved to {t.result}"
+    return f"{arrow} {t.name}: {t.state}"
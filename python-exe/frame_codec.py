@@ -0,0 +1,244 @@
+"""
+Kadrni kichraytirish va rasm (WebP/JPEG) kodlash: client_desktop va benchmark skriptlari uchun umumiy.
+
+Modul ataylab faqat numpy, PIL va (ixtiyoriy) OpenCV'ni import qiladi: EncoderPool ishchi
+jarayonlari (Windows'da spawn) shu modulni qayta import qiladi — GUI, capture va kiritish
+kutubxonalari (pyautogui, tkinter, mss, pynput, av) ishchilarga yuklanmaydi.
+"""
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+# OpenCV (tez encoder) ixtiyoriy
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except Exception:
+    CV2_AVAILABLE = False
+
+TARGET_WIDTH    = 1024    # 1152 ham mumkin; 1024 bilan FPS barqarorroq
+WEBP_QUALITY    = 80
+JPEG_QUALITY    = 80
+UNSHARP_ENABLED = False    # True qilsangiz matn biroz tiniqroq, lekin FPS pasayadi
+UNSHARP_RADIUS  = 0.6
+UNSHARP_PCT     = 90
+UNSHARP_TH      = 3
+
+# Ko'p yadroli kodlash: kadr yo'laklar/plitkalarga bo'linib, jarayonlar pulida parallel
+# kodlanadi (PIL WebP method=6 GIL ostida sekin). Piksellar shared memory orqali uzatiladi.
+# 0 — avtomatik (yadrolar soniga qarab; OpenCV bo'lsa o'chiq — u GIL'ni o'zi bo'shatadi),
+# 1 — o'chiq, N — N ta ishchi jarayon.
+ENCODER_WORKERS = int(os.environ.get("DESKWEB_ENCODER_WORKERS", 0))
+STRIPE_ALIGN    = 16       # yo'lak balandligi kodlovchi bloklariga karrali (JPEG MCU, WebP makroblok)
+
+
+def downscale_hq(img: Image.Image, target_width: int) -> Image.Image:
+    """
+    Pasaytirishni yuqori sifat bilan bajaradi; xohlasa Unsharp qo'yadi.
+    """
+    if img.width > target_width:
+        ratio = target_width / img.width
+        new_size = (target_width, max(1, int(img.height * ratio)))
+        img = img.resize(new_size, Image.Resampling.LANCZOS)
+        if UNSHARP_ENABLED:
+            img = img.filter(ImageFilter.UnsharpMask(radius=UNSHARP_RADIUS,
+                                                     percent=UNSHARP_PCT,
+                                                     threshold=UNSHARP_TH))
+    return img
+
+
+class FrameScaler:
+    """
+    Xom BGRA ekran buferini target_width gacha kichraytirib, BGR massivga aylantiradi.
+
+    OpenCV bo'lsa: bufer nusxalamasdan NumPy ko'rinishiga o'raladi, cv2.resize (INTER_AREA)
+    va BGRA->BGR oldindan ajratilgan buferlarga yoziladi — har kadrda yangi xotira
+    ajratilmaydi va kodlovchiga PIL'siz, to'g'ridan-to'g'ri BGR massiv beriladi.
+    OpenCV bo'lmasa: PIL (LANCZOS) orqali, natija yana BGR massiv ko'rinishida.
+    """
+
+    # Chiqish buferlari halqasi: bir vaqtda olinayotgan (N+1), kodlanayotgan (N) va
+    # plitkalar uchun taqqoslanayotgan (N-1) kadr — uchalasi ham band bo'lishi mumkin.
+    RING_SIZE = 3
+
+    def __init__(self, use_cv2: bool = CV2_AVAILABLE):
+        self.use_cv2 = use_cv2
+        self.resized = None
+        self.ring = []
+        self.ring_pos = 0
+
+    def scale(self, raw, width: int, height: int, target_width: int = TARGET_WIDTH) -> np.ndarray:
+        if self.use_cv2:
+            bgra = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+            return self._scale_cv2(bgra, target_width)
+        img = Image.frombytes('RGB', (width, height), raw, 'raw', 'BGRX')
+        return np.asarray(downscale_hq(img, target_width))[:, :, ::-1]  # RGB -> BGR (ko'rinish)
+
+    def _next_buffer(self, height: int, width: int) -> np.ndarray:
+        if not self.ring or self.ring[0].shape[:2] != (height, width):
+            self.ring = [np.empty((height, width, 3), dtype=np.uint8) for _ in range(self.RING_SIZE)]
+        buf = self.ring[self.ring_pos]
+        self.ring_pos = (self.ring_pos + 1) % self.RING_SIZE
+        return buf
+
+    def _scale_cv2(self, bgra: np.ndarray, target_width: int) -> np.ndarray:
+        height, width = bgra.shape[:2]
+        if width > target_width:
+            size = (target_width, max(1, int(height * target_width / width)))
+            if self.resized is None or self.resized.shape[:2] != (size[1], size[0]):
+                self.resized = np.empty((size[1], size[0], 4), dtype=np.uint8)
+            cv2.resize(bgra, size, dst=self.resized, interpolation=cv2.INTER_AREA)
+            bgra = self.resized
+        out = self._next_buffer(*bgra.shape[:2])
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=out)
+        if UNSHARP_ENABLED:
+            blurred = cv2.GaussianBlur(out, (0, 0), UNSHARP_RADIUS)
+            cv2.addWeighted(out, 1 + UNSHARP_PCT / 100, blurred, -UNSHARP_PCT / 100, 0, dst=out)
+        return out
+
+
+def _encode_image_sync_pil(frame: np.ndarray, prefer_webp: bool = True, quality: int = WEBP_QUALITY):
+    """
+    Tez va barqaror PIL encoder (fallback). frame — BGR massiv.
+    Qaytaradi: (bytes, "webp"|"jpeg")
+    """
+    pil_img = Image.fromarray(np.ascontiguousarray(frame[:, :, ::-1]))  # BGR -> RGB
+    buf = io.BytesIO()
+    if prefer_webp:
+        try:
+            pil_img.save(buf, format="WEBP", quality=quality, method=6)
+            return buf.getvalue(), "webp"
+        except Exception:
+            buf = io.BytesIO()
+    # JPEG fallback (subsampling=2 -> 4:2:0 — tez va kichik)
+    pil_img.save(buf, format="JPEG", quality=quality,
+                 optimize=True, subsampling=2, progressive=False)
+    return buf.getvalue(), "jpeg"
+
+
+# Ishchi jarayonda ochilgan umumiy xotira: nom -> (SharedMemory, ndarray ko'rinishi)
+_shared_frames = {}
+
+
+def _encode_shared_rect(name: str, shape, rect, prefer_webp: bool, quality: int):
+    """Ishchi jarayonda: umumiy xotiradagi kadrning to'rtburchagini (x, y, w, h) kodlaydi."""
+    entry = _shared_frames.get(name)
+    if entry is None:
+        # Kadr o'lchami o'zgargan — eski segment yopiladi (ko'rinishlar avval o'chiriladi)
+        while _shared_frames:
+            _, (old, view) = _shared_frames.popitem()
+            del view
+            old.close()
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+        entry = _shared_frames[name] = (shm, np.ndarray(shape, dtype=np.uint8, buffer=shm.buf))
+    x, y, w, h = rect
+    return _encode_image_sync_pil(entry[1][y:y + h, x:x + w], prefer_webp, quality)
+
+
+def encoder_workers() -> int:
+    """Kodlovchi jarayonlar soni (0 — pul ishlatilmaydi)."""
+    workers = ENCODER_WORKERS
+    if workers == 0:
+        # Capture, event loop va OS uchun ikki yadro qoldiriladi
+        workers = 0 if CV2_AVAILABLE else min(6, (os.cpu_count() or 1) - 2)
+    return workers if workers > 1 else 0
+
+
+class EncoderPool:
+    """
+    Kadr to'rtburchaklarini (yo'laklar yoki plitkalar) jarayonlar pulida parallel kodlaydi.
+    Kadr bir marta umumiy xotiraga ko'chiriladi, ishchilar uni nomi bo'yicha ochadi —
+    piksellar pickle qilinmaydi. Bir vaqtda bitta kadr: natijalar kutilmaguncha bufer qayta yozilmaydi.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.shm = None
+        self.frame = None
+
+    def _buffer(self, shape) -> np.ndarray:
+        if self.frame is None or self.frame.shape != shape:
+            self._release()
+            self.shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+            self.frame = np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf)
+        return self.frame
+
+    def stripes(self, height: int, width: int):
+        """Kadrni ishchilar soniga teng gorizontal yo'laklarga bo'ladi: [(x, y, w, h), ...]"""
+        step = -(-height // self.workers)
+        step = -(-step // STRIPE_ALIGN) * STRIPE_ALIGN
+        return [(0, y, width, min(step, height - y)) for y in range(0, height, step)]
+
+    def encode_rects(self, arr: np.ndarray, rects, quality: int):
+        """Qaytaradi: [(bytes, format), ...] — rects tartibida."""
+        np.copyto(self._buffer(arr.shape), arr)
+        futures = [self.pool.submit(_encode_shared_rect, self.shm.name, arr.shape, rect, True, quality)
+                   for rect in rects]
+        return [f.result() for f in futures]
+
+    def _release(self):
+        if self.shm is not None:
+            self.frame = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self._release()
+
+
+def _encode_image_sync_cv2(frame: np.ndarray, prefer_webp: bool = True, quality: int = WEBP_QUALITY):
+    """
+    OpenCV encoder — odatda PIL’dan ancha tez. frame — BGR massiv (nusxalanmaydi).
+    Qaytaradi: (bytes, "webp"|"jpeg")
+    """
+    if prefer_webp:
+        ok, buf = cv2.imencode('.webp', frame, [int(cv2.IMWRITE_WEBP_QUALITY), quality])
+        if ok:
+            return buf.tobytes(), 'webp'
+    # JPEG fallback
+    ok, buf = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), quality,
+                                           int(cv2.IMWRITE_JPEG_OPTIMIZE), 1])
+    if ok:
+        return buf.tobytes(), 'jpeg'
+    # Favqulodda fallback: PIL
+    return _encode_image_sync_pil(frame, prefer_webp=False, quality=quality)
+
+
+def encode_image_sync(frame: np.ndarray, prefer_webp: bool = True, quality: int = WEBP_QUALITY):
+    """OpenCV bo'lsa — undan, aks holda PIL bilan kodlaydi (fon oqimida chaqiriladi)."""
+    if CV2_AVAILABLE:
+        return _encode_image_sync_cv2(frame, prefer_webp, quality)
+    return _encode_image_sync_pil(frame, prefer_webp, quality)
+
+
+def changed_tile_rects(cur: np.ndarray, prev: np.ndarray, tile: int):
+    """
+    O'zgargan plitkalarni vektorli taqqoslash bilan topadi; bir qatordagi ketma-ket
+    plitkalar bitta to'rtburchakka birlashtiriladi (kamroq kodlash chaqiruvi).
+    Qaytaradi: ([(x, y, w, h), ...], o'zgargan plitkalar ulushi)
+    """
+    h, w = cur.shape[:2]
+    rows, cols = -(-h // tile), -(-w // tile)
+    diff = np.zeros((rows * tile, cols * tile), dtype=bool)
+    diff[:h, :w] = np.any(cur != prev, axis=2)
+    dirty = diff.reshape(rows, tile, cols, tile).any(axis=(1, 3))
+
+    rects = []
+    for ty, tx in zip(*np.nonzero(dirty)):
+        x, y = int(tx) * tile, int(ty) * tile
+        if rects and rects[-1][1] == y and rects[-1][0] + rects[-1][2] == x:
+            px, py, pw, ph = rects[-1]
+            rects[-1] = (px, py, pw + min(tile, w - x), ph)
+        else:
+            rects.append((x, y, min(tile, w - x), min(tile, h - y)))
+    return rects, float(dirty.mean())
@@ -2,24 +2,79 @@ import asyncio
 import websockets
 import json
 import ssl
+import struct
 import base64
 from PIL import Image, ImageTk
 import io
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import messagebox, filedialog
 import threading
 from pynput import keyboard
 import time
+import itertools
 from collections import deque
-from PIL import Image, ImageTk, ImageFilter, ImageFile
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk, ImageFilter, ImageFile, ImageDraw
+
+from file_transfer import FileTransfers, MSG_FILE_CHUNK, describe as describe_transfer
+from clipboard_sync import Clipboard, ClipboardSync, MSG_CLIPBOARD_CHUNK
 
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
+# PyAV (H.264/VP8 video dekoder) ixtiyoriy: bo'lmasa client rasmlar yuboradi
+try:
+    import av
+    AV_AVAILABLE = True
+except Exception:
+    AV_AVAILABLE = False
+
 # SSL (self-signed uchun)
 ssl_context = ssl.create_default_context()
 ssl_context.check_hostname = False
 ssl_context.verify_mode = ssl.CERT_NONE
 
+# Binary kadr protokoli (client_desktop.py bilan bir xil bo'lishi shart)
+# Sarlavha: kind(1) format(1) width(2) height(2) timestamp(8) — big-endian
+MSG_SCREEN     = 1
+FRAME_HEADER   = struct.Struct("!BBHHd")
+IMAGE_FORMATS  = ("webp", "jpeg")
+
+# Plitkali yangilanish: FRAME_HEADER(kind=MSG_TILES) + soni(2) + [x y w h uzunlik + rasm]...
+MSG_TILES      = 2
+TILE_COUNT     = struct.Struct("!H")
+TILE_HEADER    = struct.Struct("!HHHHI")
+
+# To'liq kadr yo'laklarda (client ko'p yadroda parallel kodlaganda): MSG_TILES tuzilmasi,
+# lekin yo'laklar butun kadrni qoplaydi — framebuffer'siz ham chiziladi (delta emas)
+MSG_SCREEN_STRIPES = 5
+
+# Inter-frame video: FRAME_HEADER(kind, format=VIDEO_CODECS indeksi) + kodlangan paket.
+# MSG_VIDEO — kalit kadr, MSG_VIDEO_DELTA — oldingi kadrlarga bog'liq (tashlanmaydi).
+MSG_VIDEO       = 3
+MSG_VIDEO_DELTA = 4
+VIDEO_CODECS    = ("h264", "vp8")
+VIDEO_DECODERS  = [c for c in VIDEO_CODECS if AV_AVAILABLE and c in av.codecs_available]
+KEYFRAME_REQUEST_GAP = 0.5   # dekoder zanjiri uzilganda kalit kadr so'rovlari oralig'i (soniya)
+
+# Motion-to-photon: kiritish buyruqlari "seq" va "t" (shu kompyuterning monotonic soati) bilan
+# yuboriladi. Client buyruq ta'siri tushgan kadrdan oldin "input_ack" (seq, t va o'z bosqichlari)
+# yuboradi, relay esa "relay_timing" (xabarlar relay'da turgan vaqt). Kadr chizilgach jami
+# kechikish = hozir - t; undan client, relay va dekodlash/chizish ayirilsa — tarmoq (ikki yo'nalish).
+INPUT_COMMANDS = frozenset({'mouse_move', 'mouse_click', 'mouse_down', 'mouse_up', 'scroll',
+                            'key_press', 'key_down', 'key_up', 'type_text', 'hotkey', 'paste'})
+LATENCY_STAGES = ('net', 'inject', 'wait', 'capture', 'encode', 'relay', 'decode')
+
+# pynput Shift tugmalari nomlari (Shift + sichqoncha — kattalashtirish sohasi)
+SHIFT_KEYS = ('shift', 'shift_l', 'shift_r')
+
+# Kursor kanali ("cursor" imkoniyati): client kursor holatini kadrlardan alohida, yuqori tezlikda
+# yuboradi ("cursor": x, y 0..1, visible, shape), shakllarni esa bir marta ("cursor_shape": id,
+# hotspot, base64 PNG). Kursor kanvas ustida alohida element sifatida chiziladi (kattalashtirilmaydi).
+# Shakl noma'lum bo'lsa — standart strelka.
+
+# Operator qo'llab-quvvatlaydigan imkoniyatlar (client'ga "hello" orqali yuboriladi)
+OPERATOR_CAPS  = ["binary", "tiles", "stripes", "cursor"] + VIDEO_DECODERS
+
 # Vizual sozlamalar
 LETTERBOX_BG   = (16, 16, 16)  # kanvas bilan uyg'un qoramtir fon
 UNSHARP_RADIUS = 0.5           # matn va chiziqlarni tiniqlash
@@ -27,6 +82,14 @@ UNSHARP_PCT    = 70
 UNSHARP_TH     = 2
 
 
+def default_cursor():
+    """Standart strelka (shakli kelmagan kursor uchun): oq, qora chegarali; hotspot — uchi."""
+    img = Image.new("RGBA", (12, 19), (0, 0, 0, 0))
+    ImageDraw.Draw(img).polygon([(0, 0), (0, 16), (4, 12), (7, 18), (9, 17), (6, 11), (11, 11)],
+                                fill=(255, 255, 255, 255), outline=(0, 0, 0, 255))
+    return img, (0, 0)
+
+
 def resize_to_canvas_hq(pil_img: Image.Image, canvas_w: int, canvas_h: int) -> Image.Image:
     """
     Rasmni kanvasga proportsiyani saqlagan holda sig'diradi (letterbox),
@@ -62,6 +125,93 @@ def resize_to_canvas_hq(pil_img: Image.Image, canvas_w: int, canvas_h: int) -> I
     return img
 
 
+class VideoDecoder:
+    """
+    Inter-frame video oqimini (PyAV/libav) dekodlaydi; holati ulanish davomida saqlanadi.
+    Zanjir uzilsa (kalit kadrsiz delta yoki dekodlash xatosi) deltalar kalit kadrgacha
+    tashlanadi va keyframe_wanted qo'yiladi — operator client'dan kalit kadr so'raydi.
+    """
+
+    def __init__(self):
+        self.codec = None
+        self.ctx = None
+        self.need_keyframe = True
+        self.keyframe_wanted = False
+
+    def decode(self, codec: str, data, keyframe: bool):
+        """Paketni dekodlaydi; ko'rsatishga tayyor av.VideoFrame yoki None qaytaradi."""
+        if keyframe and codec != self.codec:
+            self.ctx = av.CodecContext.create(codec, "r")
+            self.codec = codec
+        if self.ctx is None or codec != self.codec or (self.need_keyframe and not keyframe):
+            self.need_keyframe = self.keyframe_wanted = True
+            return None
+        try:
+            frames = self.ctx.decode(av.Packet(bytes(data)))
+        except av.error.FFmpegError:
+            self.need_keyframe = self.keyframe_wanted = True
+            return None
+        self.need_keyframe = False
+        if keyframe:
+            self.keyframe_wanted = False
+        return frames[-1] if frames else None
+
+
+def decode_frame(framebuffer, batch, canvas_w: int, canvas_h: int, video=None):
+    """
+    Kelgan kadrlarni tartib bilan to'liq kadr (framebuffer) ustiga qo'yadi va natijani
+    kanvasga moslaydi (fon oqimida chaqiriladi). To'liq kadr framebuffer'ni almashtiradi,
+    plitkalar esa uning ustiga chiziladi; framebuffer yo'q bo'lsa — to'liq kadr kutiladi.
+    Video paketlari (video — VideoDecoder) hammasi dekodlanadi, faqat oxirgisi rasmga aylanadi.
+    Qaytaradi: (framebuffer, display_img | None, draw_rect | None)
+    """
+    picture = None
+    for msg in batch:
+        codec = msg.get('video')
+        if codec is not None:
+            decoded = video.decode(codec, msg['data'], msg['keyframe']) if video is not None else None
+            if decoded is not None:
+                picture = decoded
+            continue
+        if picture is not None:
+            framebuffer, picture = picture.to_image(), None
+        tiles = msg.get('tiles')
+        if tiles is None:
+            img_data = msg.get('data')
+            if img_data is None or len(img_data) == 0:
+                continue
+            # Binary rejimda xom baytlar keladi; JSON rejimda — base64 satr
+            if isinstance(img_data, str):
+                img_data = base64.b64decode(img_data)
+            framebuffer = Image.open(io.BytesIO(img_data)).convert("RGB")
+        else:
+            if not msg.get('delta'):
+                # Yo'lakli to'liq kadr: yangi framebuffer
+                framebuffer = Image.new("RGB", (msg['width'], msg['height']))
+            if framebuffer is None or framebuffer.size != (msg['width'], msg['height']):
+                continue
+            for x, y, w, h, tile_data in tiles:
+                framebuffer.paste(Image.open(io.BytesIO(tile_data)), (x, y))
+    if picture is not None:
+        framebuffer = picture.to_image()
+
+    if framebuffer is None or canvas_w < 10 or canvas_h < 10:
+        return framebuffer, None, None
+
+    # Yuqori sifatli resize + letterbox (ko‘rinish uchun)
+    display_img = resize_to_canvas_hq(framebuffer, canvas_w, canvas_h)
+
+    # Chizilgan rasmning haqiqiy rect'ini hisoblaymiz (mapping uchun):
+    # Bu resize_to_canvas_hq ichidagi hisoblash bilan bir xil.
+    src_w, src_h = framebuffer.size
+    scale = min(canvas_w / src_w, canvas_h / src_h)
+    disp_w = max(1, int(src_w * scale))
+    disp_h = max(1, int(src_h * scale))
+    x0 = (canvas_w - disp_w) // 2
+    y0 = (canvas_h - disp_h) // 2
+    return framebuffer, display_img, (x0, y0, disp_w, disp_h)
+
+
 class OperatorApp:
     def __init__(self):
         self.ws = None
@@ -80,15 +230,69 @@ class OperatorApp:
         self.frame_count = 0
         self.fps = 0
         self.last_fps_time = time.time()
-        self.frame_queue = deque(maxlen=3)  # Buffer 3 frame
+        # Dekodlash alohida oqimda: u band bo'lsa kadrlar navbatda kutadi, event loop
+        # esa buyruqlarni kechiktirmasdan yuboradi. To'liq kadr kelsa, navbatdagi eskilari
+        # tashlanadi; plitkalar esa tashlanmaydi (ular to'liq kadr ustiga qo'yiladi).
+        self.frame_queue = deque()
+        self.decode_executor = ThreadPoolExecutor(max_workers=1)
+        self.decoding = False
+        self.framebuffer = None   # client ekranining oxirgi to'liq holati (plitkalar uchun)
+        self.video = None         # VideoDecoder (video rejimi uchun, har ulanishda yangi)
+        self.last_keyframe_request = 0.0
+
+        # Client'ga har soniyada "frame_stats" (qabul qilingan/chizilgan kadrlar, dekodlash vaqti)
+        self.received_frames = 0
+        self.decode_seconds = 0.0
+
+        # Kursor kanali: oxirgi "cursor" xabari, shakllar (id -> (PIL RGBA, hotspot)),
+        # kanvasdagi element va uning PhotoImage'i (id -> PhotoImage keshi)
+        self.cursor = None
+        self.cursor_shapes = {}
+        self.cursor_photos = {}
+        self.cursor_item = None
+
+        # Motion-to-photon: buyruqlar raqami, kadrni kutayotgan input_ack, relay_timing qiymatlari
+        # va joriy soniyadagi o'lchovlar (har soniyada latency_callback'ga o'rtachasi)
+        self.input_seq = itertools.count(1)
+        self.input_ack = None
+        self.relay_timing = {}
+        self.latency_samples = []
+        self.latency_callback = None
+
+        # Chiquvchi buyruqlar navbati (bitta yozuvchi task — tartib saqlanadi)
+        self.outbox = deque()
+        self.outbox_wakeup = None
+        # Fayl bo'laklari: buyruqlardan keyin (kiritish kechikmasin), bittadan
+        self.bulk_out = deque()
+
+        # Fayl uzatish (ikki tomonga; ko'ruvchida ishlatilmaydi); on_event GUI tomonidan
+        self.files = FileTransfers(self._enqueue_command, self._enqueue_bulk)
+        # Clipboard sinxronizatsiyasi (ikki tomonga); Ctrl+V client'da bitta joylashtirish bo'lib bajariladi
+        self.clipboard = ClipboardSync(Clipboard(), self._enqueue_command, self._enqueue_bulk)
+        self.clipboard_task = None
 
         # Keyboard
         self.pressed_keys = set()
         self.keyboard_listener = None
         self.keyboard_enabled = False
+        # Shift client'ga darhol yuborilmaydi — u kattalashtirish (Shift + sichqoncha) uchun ham
+        # ishlatiladi: keyingi tugma bilan birga ketadi, yolg'iz bosib qo'yilsa — hech narsa.
+        # Soha belgilanayotganda (zoom_drag) tugmalar umuman yuborilmaydi.
+        self.held_shift = set()
+        self.zoom_drag = False
 
         self.client_connected = False
 
+        # Ko'ruvchi rejimi: faqat ekranni ko'radi, buyruq yubormaydi
+        self.view_only = False
+
+        # Client monitorlari ("monitors" xabaridan) va oqimdagi monitor (0 — overview)
+        self.monitors = []
+        self.monitor = None
+        self.monitors_callback = None
+        # Kattalashtirilgan soha (monitor ichida, 0..1: x, y, w, h) yoki None — butun monitor
+        self.roi = None
+
         # Mouse throttle
         self.last_mouse_send = time.time()
         self.mouse_throttle = 0.016  # 60 FPS max
@@ -101,14 +305,22 @@ class OperatorApp:
         # (x0, y0, disp_w, disp_h)
         self.last_draw_rect = None
 
-    async def connect(self, room, canvas, status_callback, fps_callback, waiting_callback):
+    async def connect(self, room, canvas, status_callback, fps_callback, waiting_callback,
+                      view_only=False, monitors_callback=None, latency_callback=None):
         self.room = room
         self.canvas = canvas
         self.status_callback = status_callback
         self.fps_callback = fps_callback
         self.waiting_callback = waiting_callback
+        self.monitors_callback = monitors_callback
+        self.latency_callback = latency_callback
+        self.view_only = view_only
+        self.monitors = []
+        self.monitor = None
+        self.roi = None
 
-        uri = f"wss://deskweb.duckdns.org/ws/{room}/operator"
+        role = "viewer" if view_only else "operator"
+        uri = f"wss://deskweb.duckdns.org/ws/{room}/{role}"
 
         try:
             async with websockets.connect(
@@ -120,11 +332,33 @@ class OperatorApp:
             ) as ws:
                 self.ws = ws
                 self.running = True
+                self.outbox.clear()
+                self.bulk_out.clear()
+                self.outbox_wakeup = asyncio.Event()
+                self.frame_queue.clear()
+                self.framebuffer = None
+                self.input_ack = None
+                self.relay_timing = {}
+                self.latency_samples = []
+                self.cursor = None
+                self.cursor_shapes = {}
+                self.cursor_photos = {}
+                self.draw_cursor()
+                self.video = VideoDecoder() if VIDEO_DECODERS else None
+                writer = asyncio.create_task(self._command_writer())
                 self.status_callback("waiting_client")
                 self.waiting_callback(True)
 
-                self.start_keyboard_listener()
-                await self.receive_frames()
+                if not self.view_only:
+                    self.start_keyboard_listener()
+                try:
+                    await self.receive_frames()
+                finally:
+                    self.files.pause()
+                    if self.clipboard_task:
+                        self.clipboard_task.cancel()
+                        self.clipboard_task = None
+                    writer.cancel()
 
         except Exception as e:
             print(f"Connection error: {e}")
@@ -139,6 +373,8 @@ class OperatorApp:
         def on_press(key):
             if not self.keyboard_enabled or not self.running or not self.client_connected:
                 return
+            if self.zoom_drag:
+                return True
 
             try:
                 key_name = None
@@ -151,12 +387,21 @@ class OperatorApp:
 
                 if key_name and key_name not in self.pressed_keys:
                     self.pressed_keys.add(key_name)
+                    if key_name in SHIFT_KEYS:
+                        self.held_shift.add(key_name)
+                        return True
 
                     hotkey = self.detect_hotkey()
+                    if hotkey == ['ctrl', 'v'] and self.clipboard.enabled:
+                        self.paste_remote()
+                        return True
                     if hotkey:
                         self.send_command({'type': 'hotkey', 'keys': hotkey})
                         return True
 
+                    for shift in self.held_shift:
+                        self.send_command({'type': 'key_down', 'key': shift})
+                    self.held_shift.clear()
                     if len(key_name) == 1:
                         self.send_command({'type': 'type_text', 'text': key_name})
                     else:
@@ -183,7 +428,9 @@ class OperatorApp:
             #    if key_name:
                 if key_name:
                     self.pressed_keys.discard(key_name)
-                    if len(key_name) > 1:
+                    if key_name in self.held_shift:
+                        self.held_shift.discard(key_name)   # client'ga bosilmagan
+                    elif len(key_name) > 1:
                         self.send_command({'type': 'key_up', 'key': key_name})
 
                 return True
@@ -207,7 +454,7 @@ class OperatorApp:
         keys = list(self.pressed_keys)
 
         if 'ctrl_l' in keys or 'ctrl_r' in keys:
-            if 'shift' in keys or 'shift_l' in keys or 'shift_r' in keys:
+            if any(k in keys for k in SHIFT_KEYS):
                 if 'esc' in keys:
                     return ['ctrl', 'shift', 'esc']
 
@@ -236,24 +483,56 @@ class OperatorApp:
                     break
 
                 try:
-                    data = json.loads(message)
+                    if isinstance(message, bytes) and message[:1] == bytes([MSG_FILE_CHUNK]):
+                        if not self.view_only:
+                            self.files.handle_chunk(message)
+                        continue
+                    if isinstance(message, bytes) and message[:1] == bytes([MSG_CLIPBOARD_CHUNK]):
+                        if not self.view_only:
+                            self.clipboard.handle_chunk(message)
+                        continue
+                    if isinstance(message, bytes):
+                        data = self.parse_binary(message)
+                        if data is None:
+                            continue
+                    else:
+                        data = json.loads(message)
 
                     if data.get('type') == 'screen':
                         if not self.client_connected:
                             self.client_connected = True
-                            self.status_callback("connected")
+                            self.status_callback("viewing" if self.view_only else "connected")
                             self.waiting_callback(False)
 
                         # Client kadr o'lchamlarini eslab qolamiz (mapping uchun zarur)
                         self.client_width = int(data.get('width', self.client_width) or self.client_width)
                         self.client_height = int(data.get('height', self.client_height) or self.client_height)
 
-                        # Queue'ga qo'shamiz, keyin eng so'nggi kadrni chizamiz
-                        self.frame_queue.append(data)
-                        if len(self.frame_queue) > 0:
-                            latest_frame = self.frame_queue.pop()
-                            self.process_frame(latest_frame)
+                        # Dekoder band bo'lsa kadr navbatda kutadi (to'liq kadr eskilarini bekor qiladi,
+                        # deltalar — plitkalar va video — tashlanmaydi)
+                        self.received_frames += 1
+                        if self.input_ack is not None:
+                            # Bu kadr client tasdiqlagan buyruq ta'sirini ko'rsatadi
+                            self.input_ack['arrived'] = time.monotonic()
+                            data['ack'], self.input_ack = self.input_ack, None
+                        if not data.get('delta'):
+                            # Bekor qilinayotgan kadr kutgan o'lchov shu (yangiroq) kadrga o'tadi
+                            for old in self.frame_queue:
+                                if 'ack' in old and 'ack' not in data:
+                                    data['ack'] = old['ack']
                             self.frame_queue.clear()
+                        self.frame_queue.append(data)
+                        if not self.decoding:
+                            self.decoding = True
+                            asyncio.create_task(self._decode_frames())
+
+                    elif data.get('type', '').startswith('file_'):
+                        if not self.view_only:
+                            self.files.handle(data)
+
+                    elif data.get('type') == 'clipboard':
+                        if not self.view_only:
+                            self.clipboard.handle(data)
 
                     elif data.get('type') == 'peer_disconnected':
                         self.client_connected = False
@@ -264,8 +543,51 @@ class OperatorApp:
 
                     elif data.get('type') == 'peer_connected':
                         self.client_connected = True
-                        self.status_callback("connected")
+                        self.status_callback("viewing" if self.view_only else "connected")
                         self.waiting_callback(False)
+                        # Client'ga imkoniyatlarimizni bildiramiz (binary kadrlar)
+                        if not self.view_only:
+                            self._enqueue_command(json.dumps({'type': 'hello', 'caps': OPERATOR_CAPS}))
+                            self.files.resume()
+                            self.start_clipboard_sync()
+
+                    elif data.get('type') == 'cursor':
+                        self.cursor = data
+                        self.draw_cursor()
+
+                    elif data.get('type') == 'cursor_shape':
+                        png = base64.b64decode(data.get('data', ''))
+                        hotspot = tuple(data.get('hotspot') or (0, 0))
+                        self.cursor_shapes[data.get('id')] = (Image.open(io.BytesIO(png)).convert("RGBA"), hotspot)
+                        self.cursor_photos.pop(data.get('id'), None)
+
+                    elif data.get('type') == 'input_ack':
+                        # Faqat boshqaruvchi operator uchun: t — shu kompyuter soati
+                        if not self.view_only:
+                            self.input_ack = data
+
+                    elif data.get('type') == 'relay_timing':
+                        # Client/operator boshqa worker'larda bo'lsa qismlari alohida keladi
+                        for key in ('input_ms', 'frame_ms'):
+                            if data.get(key) is not None:
+                                self.relay_timing[key] = data[key]
+
+                    elif data.get('type') == 'monitors':
+                        # Client monitorlari va hozir oqimda ketayotgani (almashganda ham keladi)
+                        self.monitors = data.get('monitors', [])
+                        self.monitor = data.get('active')
+                        roi = data.get('roi')
+                        self.roi = tuple(roi) if roi else None
+                        if self.monitors_callback:
+                            self.monitors_callback(self.monitors, self.monitor)
+
+                    elif data.get('type') == 'connected':
+                        # Xonada boshqaruvchi bo'lsa, server bizni ko'ruvchi qilib qo'yadi
+                        if data.get('role') == 'viewer' and not self.view_only:
+                            self.view_only = True
+                            self.stop_keyboard_listener()
+                        if self.view_only:
+                            self.status_callback("viewing")
 
                 except json.JSONDecodeError:
                     pass
@@ -279,41 +601,80 @@ class OperatorApp:
             print(f"Receive error: {e}")
             self.running = False
 
-    def process_frame(self, msg):
-        """Canvas'ni FLICKER'siz yangilash (JSON dan kelgan kadrni chizish) va draw_rect saqlash."""
+    def parse_binary(self, message: bytes):
+        """Binary kadrni sarlavha + xom rasm baytlariga ajratadi (nusxalamasdan)."""
+        if len(message) < FRAME_HEADER.size:
+            return None
+        kind, fmt, width, height, ts = FRAME_HEADER.unpack_from(message)
+        if kind not in (MSG_SCREEN, MSG_TILES, MSG_SCREEN_STRIPES, MSG_VIDEO, MSG_VIDEO_DELTA):
+            return None
+        data = {
+            'type': 'screen',
+            'format': IMAGE_FORMATS[fmt] if fmt < len(IMAGE_FORMATS) else 'webp',
+            'width': width,
+            'height': height,
+            'timestamp': ts,
+        }
+        view = memoryview(message)
+        if kind == MSG_SCREEN:
+            data['data'] = view[FRAME_HEADER.size:]
+            return data
+        if kind in (MSG_VIDEO, MSG_VIDEO_DELTA):
+            if fmt >= len(VIDEO_CODECS):
+                return None
+            data['video'] = VIDEO_CODECS[fmt]
+            data['keyframe'] = kind == MSG_VIDEO
+            data['delta'] = kind == MSG_VIDEO_DELTA
+            data['data'] = view[FRAME_HEADER.size:]
+            return data
+
+        # Plitkalar: [(x, y, w, h, rasm baytlari), ...]
+        offset = FRAME_HEADER.size
+        (count,) = TILE_COUNT.unpack_from(message, offset)
+        offset += TILE_COUNT.size
+        tiles = []
+        for _ in range(count):
+            x, y, w, h, size = TILE_HEADER.unpack_from(message, offset)
+            offset += TILE_HEADER.size
+            tiles.append((x, y, w, h, view[offset:offset + size]))
+            offset += size
+        data['tiles'] = tiles
+        data['delta'] = kind == MSG_TILES
+        return data
+
+    async def _decode_frames(self):
+        """Navbatdagi eng yangi kadrni fon oqimida dekodlab, kanvasga chizadi."""
+        loop = asyncio.get_running_loop()
         try:
-            # msg — {'type':'screen','data': '...','width':..,'height':..}
-            if isinstance(msg, dict):
-                img_b64 = msg.get('data')
-                src_w = int(msg.get('width', self.client_width) or self.client_width)
-                src_h = int(msg.get('height', self.client_height) or self.client_height)
-            else:
-                img_b64 = msg
-                src_w, src_h = self.client_width, self.client_height
-
-            if not img_b64:
-                return
-
-            img_bytes = base64.b64decode(img_b64)
-            pil_img = Image.open(io.BytesIO(img_bytes))
-
-            # Canvas o‘lchami
-            canvas_w = self.canvas.winfo_width()
-            canvas_h = self.canvas.winfo_height()
-            if canvas_w < 10 or canvas_h < 10:
-                return
-
-            # Yuqori sifatli resize + letterbox (ko‘rinish uchun)
-            display_img = resize_to_canvas_hq(pil_img, canvas_w, canvas_h)
+            while self.frame_queue and self.running:
+                batch = list(self.frame_queue)
+                self.frame_queue.clear()
+
+                # Canvas o‘lchami
+                canvas_w = self.canvas.winfo_width()
+                canvas_h = self.canvas.winfo_height()
+
+                started = time.perf_counter()
+                self.framebuffer, display_img, draw_rect = await loop.run_in_executor(
+                    self.decode_executor, decode_frame, self.framebuffer, batch, canvas_w, canvas_h,
+                    self.video)
+                self.decode_seconds += time.perf_counter() - started
+                if self.video is not None and self.video.keyframe_wanted:
+                    self.request_keyframe()
+                if display_img is not None:
+                    self.process_frame(display_img, draw_rect, canvas_w, canvas_h)
+                    ack = next((m['ack'] for m in reversed(batch) if 'ack' in m), None)
+                    if ack is not None:
+                        self.record_latency(ack)
+        except Exception as e:
+            print(f"Canvas update error: {e}")
+        finally:
+            self.decoding = False
 
-            # Chizilgan rasmning haqiqiy rect'ini hisoblaymiz (mapping uchun):
-            # Bu resize_to_canvas_hq ichidagi hisoblash bilan bir xil.
-            scale = min(canvas_w / max(1, src_w), canvas_h / max(1, src_h))
-            disp_w = max(1, int(src_w * scale))
-            disp_h = max(1, int(src_h * scale))
-            x0 = (canvas_w - disp_w) // 2
-            y0 = (canvas_h - disp_h) // 2
-            self.last_draw_rect = (x0, y0, disp_w, disp_h)
+    def process_frame(self, display_img, draw_rect, canvas_w, canvas_h):
+        """Canvas'ni FLICKER'siz yangilash (dekodlangan kadrni chizish) va draw_rect saqlash."""
+        try:
+            self.last_draw_rect = draw_rect
 
             # Bir martalik image id: flicker bo‘lmasin
             if self.canvas_image_id is None:
@@ -327,10 +688,15 @@ class OperatorApp:
                 self.current_image = ImageTk.PhotoImage(display_img)
                 self.canvas.itemconfig(self.canvas_image_id, image=self.current_image)
 
+            # Kursor kadr o'lchami/joyi (letterbox) o'zgarsa ham to'g'ri joyda va kadr ustida qoladi
+            self.draw_cursor()
+
             # FPS hisoblash
             self.frame_count += 1
             now = time.time()
             if now - self.last_fps_time >= 1.0:
+                self.send_frame_stats(now - self.last_fps_time)
+                self.report_latency()
                 self.fps = self.frame_count
                 self.frame_count = 0
                 self.last_fps_time = now
@@ -340,32 +706,161 @@ class OperatorApp:
         except Exception as e:
             print(f"Canvas update error: {e}")
 
+    def draw_cursor(self):
+        """Client kursorini kanvasdagi chizilgan kadr ustiga qo'yadi (yoki yashiradi)."""
+        if self.canvas is None:
+            return
+        cursor = self.cursor
+        if not cursor or not cursor.get('visible') or not self.last_draw_rect:
+            if self.cursor_item is not None:
+                self.canvas.itemconfig(self.cursor_item, state='hidden')
+            return
+        shape = cursor.get('shape')
+        photo = self.cursor_photos.get(shape)
+        if photo is None:
+            img, hotspot = self.cursor_shapes.get(shape) or default_cursor()
+            photo = self.cursor_photos[shape] = (ImageTk.PhotoImage(img), hotspot)
+        image, (hx, hy) = photo
+        x0, y0, disp_w, disp_h = self.last_draw_rect
+        x = x0 + cursor['x'] * disp_w - hx
+        y = y0 + cursor['y'] * disp_h - hy
+        if self.cursor_item is None:
+            self.cursor_item = self.canvas.create_image(x, y, image=image, anchor='nw')
+        else:
+            self.canvas.coords(self.cursor_item, x, y)
+            self.canvas.itemconfig(self.cursor_item, image=image, state='normal')
+        self.canvas.tag_raise(self.cursor_item)
+
+    def record_latency(self, ack: dict):
+        """Buyruq ta'siri chizildi: jami kechikish va bosqichlari (ms)."""
+        if not isinstance(ack.get('t'), (int, float)):
+            return
+        now = time.monotonic()
+        total = 1000 * (now - ack['t'])
+        sample = {
+            'inject': ack.get('inject_ms', 0.0),
+            'wait': ack.get('wait_ms', 0.0),
+            'capture': ack.get('capture_ms', 0.0),
+            'encode': ack.get('encode_ms', 0.0),
+            'relay': self.relay_timing.get('input_ms', 0.0) + self.relay_timing.get('frame_ms', 0.0),
+            'decode': 1000 * (now - ack['arrived']),
+        }
+        # Qolgan qismi — tarmoq (operator -> relay -> client va qaytish, yuborish navbatlari bilan)
+        sample['net'] = max(0.0, total - sum(sample.values()))
+        sample['total'] = total
+        self.latency_samples.append(sample)
+
+    def report_latency(self):
+        """Oxirgi soniyadagi o'rtacha motion-to-photon va bosqichlari -> latency_callback."""
+        samples, self.latency_samples = self.latency_samples, []
+        if not samples or not self.latency_callback:
+            return
+        mean = {k: sum(s[k] for s in samples) / len(samples) for k in samples[0]}
+        self.latency_callback(mean)
+
+    def send_frame_stats(self, interval: float):
+        """Client kadr tezligini moslashi uchun: qancha kadr keldi, qanchasi chizildi."""
+        rendered = self.frame_count
+        if not self.view_only and self.ws and self.running:
+            self._enqueue_command(json.dumps({
+                'type': 'frame_stats',
+                'interval': interval,
+                'received': self.received_frames,
+                'rendered': rendered,
+                'decode_ms': round(1000 * self.decode_seconds / max(1, rendered), 2),
+            }))
+        self.received_frames = 0
+        self.decode_seconds = 0.0
+
+    def request_keyframe(self):
+        """Video zanjiri uzildi: client'dan kalit kadr so'raymiz (ko'ruvchi ham so'ray oladi)."""
+        now = time.monotonic()
+        if not self.ws or not self.running or now - self.last_keyframe_request < KEYFRAME_REQUEST_GAP:
+            return
+        self.video.keyframe_wanted = False
+        self.last_keyframe_request = now
+        self._enqueue_command(json.dumps({'type': 'keyframe_request'}))
+
     def send_command(self, cmd):
+        if self.view_only:
+            return
+        if cmd.get('type') in INPUT_COMMANDS:
+            cmd['seq'] = next(self.input_seq)
+            cmd['t'] = time.monotonic()
         if self.ws and self.running and self.client_connected:
             try:
-                asyncio.run_coroutine_threadsafe(
-                    self.ws.send(json.dumps(cmd)),
-                    self.loop
-                )
+                self.loop.call_soon_threadsafe(self._enqueue_command, json.dumps(cmd))
             except Exception as e:
                 print(f"Send error: {e}")
 
+    def start_clipboard_sync(self):
+        """Event loop ichida: client ulandi — joriy clipboard yuboriladi, keyin o'zgarishlar kuzatiladi."""
+        if self.clipboard_task:
+            self.clipboard_task.cancel()
+        self.clipboard.reset()
+        self.clipboard_task = asyncio.create_task(self.clipboard.run())
+
+    def paste_remote(self):
+        """Clipboard'ni (o'zgargan bo'lsa) yuborib, client'da bitta Ctrl+V so'raydi (istalgan oqimdan)."""
+        if self.view_only or not self.ws or not self.running or not self.client_connected:
+            return
+        if not self.clipboard.enabled:
+            self.send_command({'type': 'hotkey', 'keys': ['ctrl', 'v']})
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.clipboard.paste(self.send_command), self.loop)
+        except Exception as e:
+            print(f"Paste error: {e}")
+
+    def _enqueue_command(self, message: str):
+        """Event loop ichida chaqiriladi: buyruqni yozuvchi task navbatiga qo'yadi."""
+        self.outbox.append(message)
+        self.outbox_wakeup.set()
+
+    def _enqueue_bulk(self, chunk: bytes):
+        """Event loop ichida: fayl bo'lagini navbatga qo'yadi (hajmini uzatish oynasi cheklaydi)."""
+        self.bulk_out.append(chunk)
+        self.outbox_wakeup.set()
+
+    async def _command_writer(self):
+        """
+        Buyruqlarni kelish tartibida yuboradi; kadr dekodlash bu yo'lni band qilmaydi.
+        Fayl bo'laklari faqat buyruqlar navbati bo'sh bo'lganda, bittadan ketadi.
+        """
+        try:
+            while True:
+                await self.outbox_wakeup.wait()
+                self.outbox_wakeup.clear()
+                while self.outbox or self.bulk_out:
+                    if self.outbox:
+                        await self.ws.send(self.outbox.popleft())
+                    else:
+                        await self.ws.send(self.bulk_out.popleft())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Send error: {e}")
+
     # --- YANGI: canvas -> norm mapping (letterbox bilan aniq) ---
-    def _canvas_to_norm(self, mx: int, my: int):
+    def _canvas_to_norm(self, mx: int, my: int, clamp: bool = False):
         """
-        Canvas koordinatasini (mx,my) chizilgan rasmning ichidagi 0..1 oralig‘iga o'tkazadi.
-        Agar bosish letterbox hududida bo'lsa -> (None, None) qaytaradi.
+        Canvas koordinatasini (mx,my) client monitorining 0..1 oralig‘iga o'tkazadi: avval
+        chizilgan rasm ichidagi nuqta, so'ng (kattalashtirilgan bo'lsa) soha orqali monitorga.
+        Agar bosish letterbox hududida bo'lsa -> (None, None); clamp=True — chetga tortiladi.
         """
         if not self.last_draw_rect:
             return None, None
         x0, y0, disp_w, disp_h = self.last_draw_rect
-        if mx < x0 or my < y0 or mx > x0 + disp_w or my > y0 + disp_h:
+        if not clamp and (mx < x0 or my < y0 or mx > x0 + disp_w or my > y0 + disp_h):
             return None, None
         xn = (mx - x0) / max(1, disp_w)
         yn = (my - y0) / max(1, disp_h)
         # xavfsizlik
         xn = max(0.0, min(1.0, xn))
         yn = max(0.0, min(1.0, yn))
+        if self.roi:
+            rx, ry, rw, rh = self.roi
+            xn, yn = rx + xn * rw, ry + yn * rh
         return xn, yn
 
     def send_mouse(self, x, y, cmd_type='mouse_move'):
@@ -386,16 +881,40 @@ class OperatorApp:
                 # Letterboxga bosilgan — e'tiborsiz qoldiramiz.
                 return
 
+            # monitor — qaysi oqimdagi koordinata (client uni o'sha monitorga moslaydi)
             if cmd_type == 'mouse_move':
-                self.send_command({'type': 'mouse_move', 'x': xn, 'y': yn})
+                self.send_command({'type': 'mouse_move', 'x': xn, 'y': yn, 'monitor': self.monitor})
             elif cmd_type == 'mouse_click':
-                self.send_command({'type': 'mouse_click', 'x': xn, 'y': yn, 'button': 'left'})
+                self.send_command({'type': 'mouse_click', 'x': xn, 'y': yn, 'button': 'left',
+                                   'monitor': self.monitor})
             elif cmd_type == 'mouse_right':
-                self.send_command({'type': 'mouse_click', 'x': xn, 'y': yn, 'button': 'right'})
+                self.send_command({'type': 'mouse_click', 'x': xn, 'y': yn, 'button': 'right',
+                                   'monitor': self.monitor})
 
         except Exception as e:
             print(f"Mouse error: {e}")
 
+    def set_roi(self, x0: int, y0: int, x1: int, y1: int):
+        """
+        Canvas'da belgilangan to'rtburchakni kattalashtirishni so'raydi (joriy ko'rinish ichida
+        ham ishlaydi — koordinatalar monitorga o'tkaziladi). Juda kichik belgi e'tiborsiz.
+        """
+        ax, ay = self._canvas_to_norm(x0, y0, clamp=True)
+        bx, by = self._canvas_to_norm(x1, y1, clamp=True)
+        if ax is None:
+            return
+        w, h = abs(bx - ax), abs(by - ay)
+        if w < 0.005 or h < 0.005:
+            return
+        self.send_command({'type': 'set_roi', 'roi': [min(ax, bx), min(ay, by), w, h]})
+
+    def reset_roi(self):
+        self.send_command({'type': 'set_roi', 'roi': None})
+
+    def select_monitor(self, index: int):
+        """Client'dan boshqa monitorni (0 — barcha monitorlar, past tezlikda) so'raydi."""
+        self.send_command({'type': 'select_monitor', 'monitor': index})
+
     def disconnect(self):
         self.running = False
         self.client_connected = False
@@ -441,6 +960,12 @@ class OperatorGUI:
                   bg="#28a745", fg="white",
                   padx=40, pady=12, cursor="hand2").pack(pady=20)
 
+        self.view_only_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.login_frame, text="👁 View only (read-only viewer)",
+                       variable=self.view_only_var,
+                       font=("Arial", 11), fg="#8b949e", bg="#1a1a2e",
+                       selectcolor="#1a1a2e", activebackground="#1a1a2e").pack()
+
         room_entry.bind('<Return>', lambda e: self.on_connect())
 
         # Control
@@ -469,6 +994,52 @@ class OperatorGUI:
                                   fg="#58a6ff", bg="#161b22")
         self.fps_label.pack(side='left', pady=15)
 
+        # Motion-to-photon: jami kechikish (ms) va uning bosqichlari
+        tk.Label(toolbar, text="Latency:", font=("Arial", 10),
+                 fg="#8b949e", bg="#161b22").pack(side='left', padx=(20, 5), pady=15)
+
+        self.latency_label = tk.Label(toolbar, text="—", font=("Consolas", 11, "bold"),
+                                      fg="#58a6ff", bg="#161b22")
+        self.latency_label.pack(side='left', pady=15)
+
+        self.latency_detail = tk.Label(toolbar, text="", font=("Consolas", 8),
+                                       fg="#8b949e", bg="#161b22")
+        self.latency_detail.pack(side='left', padx=(5, 0), pady=15)
+
+        tk.Label(toolbar, text="Monitor:", font=("Arial", 10),
+                 fg="#8b949e", bg="#161b22").pack(side='left', padx=(20, 5), pady=15)
+
+        self.monitor_var = tk.StringVar(value="—")
+        self.monitor_menu = tk.OptionMenu(toolbar, self.monitor_var, "—")
+        self.monitor_menu.config(font=("Arial", 10), bg="#21262d", fg="white",
+                                 activebackground="#30363d", highlightthickness=0, bd=0)
+        self.monitor_menu.pack(side='left', pady=12)
+
+        # Fayl yuborish (client'ga); client yuborgan fayllar DOWNLOAD_DIR'ga tushadi
+        self.send_file_btn = tk.Button(toolbar, text="📁 Send file",
+                                       command=self.on_send_file,
+                                       font=("Arial", 10), bg="#21262d", fg="white",
+                                       padx=10, pady=4, cursor="hand2")
+        self.send_file_btn.pack(side='left', padx=(10, 0), pady=12)
+
+        self.file_label = tk.Label(toolbar, text="", font=("Arial", 9),
+                                   fg="#8b949e", bg="#161b22")
+        self.file_label.pack(side='left', padx=5, pady=15)
+        self.app.files.on_event = lambda t: self.root.after(0, self.update_transfer, t)
+        self.app.clipboard.clipboard.attach(self.root)
+
+        # Operator clipboard'ini client'ga qo'yib, bitta Ctrl+V (uzun matn ham bir zumda)
+        tk.Button(toolbar, text="📋 Paste",
+                  command=lambda: self.app.paste_remote(),
+                  font=("Arial", 10), bg="#21262d", fg="white",
+                  padx=10, pady=4, cursor="hand2").pack(side='left', padx=(10, 0), pady=12)
+
+        # Kattalashtirish: Shift + sichqoncha bilan soha belgilanadi; bu tugma — butun monitor
+        tk.Button(toolbar, text="🔍 Full view",
+                  command=lambda: self.app.reset_roi(),
+                  font=("Arial", 10), bg="#21262d", fg="white",
+                  padx=10, pady=4, cursor="hand2").pack(side='left', padx=10, pady=12)
+
         tk.Button(toolbar, text="❌ Disconnect",
                   command=self.on_disconnect,
                   font=("Arial", 10, "bold"),
@@ -493,6 +1064,14 @@ class OperatorGUI:
         self.canvas.bind('<Button-1>', self.on_mouse_click)
         self.canvas.bind('<Button-3>', self.on_right_click)
         self.canvas.bind('<MouseWheel>', self.on_scroll)
+        self.canvas.bind('<Shift-Button-1>', self.on_zoom_start)
+        self.canvas.bind('<Shift-B1-Motion>', self.on_zoom_drag)
+        self.canvas.bind('<Shift-ButtonRelease-1>', self.on_zoom_end)
+        # Shift sohani belgilash tugaguncha qo'yib yuborilsa ham — belgilash davom etadi
+        self.canvas.bind('<B1-Motion>', self.on_zoom_drag)
+        self.canvas.bind('<ButtonRelease-1>', self.on_zoom_end)
+        self.zoom_start = None
+        self.zoom_rect_id = None
 
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
@@ -506,6 +1085,7 @@ class OperatorGUI:
         self.login_frame.pack_forget()
         self.control_frame.pack(fill='both', expand=True)
         self.connected = True
+        view_only = self.view_only_var.get()
 
         def run():
             self.app.loop = asyncio.new_event_loop()
@@ -513,7 +1093,10 @@ class OperatorGUI:
             try:
                 self.app.loop.run_until_complete(
                     self.app.connect(room, self.canvas, self.update_status,
-                                     self.update_fps, self.update_waiting)
+                                     self.update_fps, self.update_waiting,
+                                     view_only=view_only,
+                                     monitors_callback=self.update_monitors,
+                                     latency_callback=self.update_latency)
                 )
             except Exception as e:
                 print(f"Error: {e}")
@@ -533,6 +1116,7 @@ class OperatorGUI:
         status_map = {
             "waiting_client": ("⏳ Waiting", "#ffc107"),
             "connected": ("🟢 Connected", "#28a745"),
+            "viewing": ("👁 Viewing", "#58a6ff"),
             "client_disconnected": ("⚠️ Client Left", "#dc3545"),
             "disconnected": ("🔴 Disconnected", "#dc3545"),
             "error": ("⚠️ Error", "#ffc107")
@@ -549,6 +1133,41 @@ class OperatorGUI:
     def update_fps(self, fps):
         self.fps_label.config(text=str(fps))
 
+    def on_send_file(self):
+        """Faylni client'ga yuborish (masalan o'rnatuvchi); uzilsa keyingi ulanishda davom etadi."""
+        if self.app.view_only:
+            messagebox.showinfo("View only", "Viewers cannot send files.")
+            return
+        path = filedialog.askopenfilename(title="Send file to client")
+        if path and self.app.loop and self.app.running:
+            self.app.loop.call_soon_threadsafe(self.app.files.send_file, path)
+
+    def update_transfer(self, transfer):
+        self.file_label.config(text=describe_transfer(transfer))
+
+    def update_latency(self, latency):
+        self.latency_label.config(text=f"{latency['total']:.0f} ms")
+        self.latency_detail.config(text=" · ".join(f"{k} {latency[k]:.0f}" for k in LATENCY_STAGES))
+
+    @staticmethod
+    def monitor_title(monitor) -> str:
+        if monitor['index'] == 0:
+            return "All (overview)"
+        return f"{monitor['index']}: {monitor['width']}x{monitor['height']}"
+
+    def update_monitors(self, monitors, active):
+        """Monitor menyusini client ro'yxati bilan yangilaydi; tanlov — oqimdagi monitor."""
+        menu = self.monitor_menu['menu']
+        menu.delete(0, 'end')
+        # Bitta monitor bo'lsa overview ortiqcha (u aynan o'sha monitor)
+        shown = monitors if len(monitors) > 2 else monitors[1:]
+        for m in shown:
+            menu.add_command(label=self.monitor_title(m),
+                             command=lambda i=m['index']: self.app.select_monitor(i))
+        current = next((m for m in monitors if m['index'] == active), None)
+        self.monitor_var.set(self.monitor_title(current) if current else "—")
+        self.monitor_menu.config(state='disabled' if self.app.view_only else 'normal')
+
     def on_mouse_move(self, event):
         if self.connected and self.app.client_connected:
             self.app.send_mouse(event.x, event.y, 'mouse_move')
@@ -561,6 +1180,25 @@ class OperatorGUI:
         if self.connected and self.app.client_connected:
             self.app.send_mouse(event.x, event.y, 'mouse_right')
 
+    def on_zoom_start(self, event):
+        self.zoom_start = (event.x, event.y)
+        self.app.zoom_drag = True
+        self.zoom_rect_id = self.canvas.create_rectangle(event.x, event.y, event.x, event.y,
+                                                         outline="#58a6ff", dash=(4, 2))
+
+    def on_zoom_drag(self, event):
+        if self.zoom_start and self.zoom_rect_id:
+            self.canvas.coords(self.zoom_rect_id, *self.zoom_start, event.x, event.y)
+
+    def on_zoom_end(self, event):
+        if self.zoom_rect_id:
+            self.canvas.delete(self.zoom_rect_id)
+            self.zoom_rect_id = None
+        if self.zoom_start and self.connected and self.app.client_connected:
+            self.app.set_roi(*self.zoom_start, event.x, event.y)
+        self.zoom_start = None
+        self.app.zoom_drag = False
+
     def on_scroll(self, event):
         if self.connected and self.app.client_connected:
             # Tkinterda event.delta odatda 120/-120 bo'ladi (Windows)
@@ -0,0 +1,84 @@
+"""
+Inter-frame video kodlash (PyAV/libav, CPU): client_desktop va benchmark skriptlari uchun umumiy.
+
+Modul faqat numpy va (ixtiyoriy) PyAV'ni import qiladi. Protokol (MSG_VIDEO / MSG_VIDEO_DELTA,
+format — VIDEO_CODECS indeksi) client_desktop.py'da tasvirlangan.
+"""
+import time
+from fractions import Fraction
+
+import numpy as np
+
+# PyAV (libav orqali H.264/VP8 video encoder) ixtiyoriy
+try:
+    import av
+    from av.video.frame import PictureType
+    AV_AVAILABLE = True
+except Exception:
+    AV_AVAILABLE = False
+
+VIDEO_CODECS   = ("h264", "vp8")
+VIDEO_ENCODERS = {"h264": "libx264", "vp8": "libvpx"}
+
+
+def encoder_available(codec: str) -> bool:
+    """Kodek uchun libav kodlovchisi bormi (PyAV o'rnatilgan va libx264/libvpx bilan yig'ilgan)."""
+    return AV_AVAILABLE and VIDEO_ENCODERS[codec] in av.codecs_available
+
+
+class VideoEncoder:
+    """
+    Inter-frame video kodlovchi (PyAV/libav, CPU). Bir vaqtda faqat bitta oqimdan chaqiriladi.
+    O'lcham o'zgarsa kodlovchi darhol qayta ochiladi; sifat o'zgarishi esa keyingi kalit
+    kadrda qo'llanadi (qayta ochish har doim kalit kadr — qimmat).
+    """
+
+    def __init__(self, codec: str, framerate: int = 30):
+        self.codec = codec
+        self.framerate = framerate
+        self.ctx = None
+        self.params = None        # (width, height, quality)
+        self.started = time.monotonic()
+        self.last_pts = -1
+
+    def _open(self, width: int, height: int, quality: int):
+        ctx = av.CodecContext.create(VIDEO_ENCODERS[self.codec], "w")
+        ctx.width, ctx.height = width, height
+        ctx.pix_fmt = "yuv420p"
+        ctx.time_base = Fraction(1, 1000)   # pts — millisekundlar
+        ctx.framerate = Fraction(self.framerate, 1)
+        ctx.gop_size = 1 << 20               # kalit kadrlarni o'zimiz belgilaymiz
+        ctx.max_b_frames = 0                 # B-kadrlar kechikish qo'shadi
+        # Sifat (QUALITY_STEPS: 40..90) -> CRF: kichik CRF — yuqori sifat
+        if self.codec == "h264":
+            ctx.options = {"preset": "ultrafast", "tune": "zerolatency",
+                           "crf": str(round(51 - 0.4 * quality))}
+        else:
+            ctx.bit_rate = 8_000_000         # libvpx CRF rejimida yuqori chegara
+            ctx.options = {"deadline": "realtime", "cpu-used": "8", "lag-in-frames": "0",
+                           "crf": str(round(63 - 0.55 * quality))}
+        self.ctx = ctx
+        self.params = (width, height, quality)
+
+    def encode(self, frame: np.ndarray, quality: int, keyframe: bool):
+        """
+        BGR kadrni kodlaydi. Qaytaradi: (paket baytlari | None, kalit kadrmi, width, height).
+        """
+        height, width = frame.shape[:2]
+        width, height = width & ~1, height & ~1   # yuv420p juft o'lcham talab qiladi
+        if frame.shape[:2] != (height, width):
+            frame = np.ascontiguousarray(frame[:height, :width])
+        params = self.params
+        if params is None or params[:2] != (width, height) or (keyframe and params[2] != quality):
+            self._open(width, height, quality)
+            keyframe = True
+
+        video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+        self.last_pts = max(self.last_pts + 1, int(1000 * (time.monotonic() - self.started)))
+        video_frame.pts = self.last_pts
+        if keyframe:
+            video_frame.pict_type = PictureType.I
+        packets = self.ctx.encode(video_frame)
+        if not packets:
+            return None, False, width, height
+        return b"".join(bytes(p) for p in packets), packets[0].is_keyframe, width, height